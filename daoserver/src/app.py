@@ -11,14 +11,36 @@ from flask import Flask, make_response
 
 from controllers.dao import APP
 from controllers.feedback import FEEDBACK
+from controllers.job import JOB
 from controllers.tournament import TOURNAMENT
 from controllers.tournament_entry import ENTRY
 from controllers.tournament_round import TOURNAMENT_ROUND
 from controllers.user import USER
 from models.authentication import PermissionDeniedException
 from models.dao.db_connection import db
+from models.dao.pool_monitor import engine_options
+from models.dao.query_profiler import profile_requests
 from models.permissions import set_up_permissions
 
+# pylint: disable=no-init
+class DatetimeHandler(jsonpickle.handlers.BaseHandler):
+    """Custom handler to get datetimes as ISO dates"""
+    def flatten(self, obj, data):   # pylint: disable=missing-docstring,W0613,R0201
+        return obj.isoformat()
+
+def register_handlers():
+    """Encode datetimes as ISO dates. Needed in every serving process"""
+    jsonpickle.handlers.registry.register(datetime.datetime, DatetimeHandler)
+    jsonpickle.handlers.registry.register(datetime.date, DatetimeHandler)
+
+def set_up(app):
+    """
+    Start up work that only needs doing once, however many processes serve the
+    app. The production server runs it in the master before forking workers.
+    """
+    with app.app_context():
+        set_up_permissions(commit=True)
+
 # pylint: disable=W0621
 def create_app():
     """Config for the app"""
@@ -33,11 +55,14 @@ def create_app():
             os.environ['DATABASE_PORT_5432_TCP_PORT'],
             os.environ['POSTGRES_DB'])
     app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options()
 
     db.init_app(app)
+    profile_requests(app, db)
 
     app.register_blueprint(APP)
     app.register_blueprint(FEEDBACK, url_prefix='/feedback')
+    app.register_blueprint(JOB, url_prefix='/jobs')
     app.register_blueprint(TOURNAMENT, url_prefix='/tournament')
     app.register_blueprint(TOURNAMENT_ROUND,
                            url_prefix='/tournament/<tournament_id>/rounds')
@@ -76,18 +101,10 @@ def create_app():
 # pylint: disable=invalid-name
 if __name__ == "__main__":
 
+    # The development server. See gunicorn_conf.py for production
     app = create_app()
+    register_handlers()
+    set_up(app)
     # Bind to PORT if defined, otherwise default to 5000.
     port = int(os.environ.get('PORT', 5000))
     app.run(host='0.0.0.0', port=port)
-
-    # pylint: disable=no-init
-    class DatetimeHandler(jsonpickle.handlers.BaseHandler):
-        """Custom handler to get datetimes as ISO dates"""
-        def flatten(self, obj, data):   # pylint: disable=missing-docstring,W0613,R0201
-            return obj.isoformat()
-
-    jsonpickle.handlers.registry.register(datetime.datetime, DatetimeHandler)
-    jsonpickle.handlers.registry.register(datetime.date, DatetimeHandler)
-
-    set_up_permissions(commit=True)
@@ -0,0 +1,5 @@
+"""
+Benchmarks for the draw, table allocation and ranking algorithms.
+
+These run against synthetic tournaments, so no db is needed. See run.py
+"""
@@ -0,0 +1,90 @@
+"""
+Synthetic tournaments for benchmarking
+
+The algorithms only read a few attributes of entries and score categories, so
+these are stood in for by plain objects. A tournament is played out for a
+number of rounds with random pairings and scores, giving each entry a score
+history, a table history and an OpponentHistory of who can't be re-matched.
+"""
+
+import random
+
+from models.opponent_history import OpponentHistory
+
+# pylint: disable=too-few-public-methods
+class SyntheticCategory(object):
+    """Stands in for a ScoreCategory"""
+
+    def __init__(self, name, percentage, max_val):
+        self.name = name
+        self.percentage = percentage
+        self.min_val = 0
+        self.max_val = max_val
+
+class SyntheticScore(object):
+    """Stands in for a Score"""
+
+    def __init__(self, category, value):
+        self.score_category = category
+        self.value = value
+
+class SyntheticEntry(object):
+    """Stands in for a TournamentEntry"""
+
+    def __init__(self, entry_id):
+        self.id = entry_id                  # pylint: disable=invalid-name
+        self.player_id = 'player_{}'.format(entry_id)
+        self.game_history = []
+        self.scores = []
+
+    def __repr__(self):
+        return self.player_id
+
+class SyntheticTournament(object):
+    """
+    A tournament of num_entries that has played rounds_played rounds.
+
+    Expects:
+        - num_entries - the size of the field
+        - rounds_played - how many rounds of history to generate
+        - seed - the same seed always gives the same tournament
+    """
+
+    def __init__(self, num_entries, rounds_played=5, seed=0):
+        self.random = random.Random(seed)
+        self.categories = [
+            SyntheticCategory('battle', 60, 20),
+            SyntheticCategory('sports', 20, 5),
+            SyntheticCategory('painting', 20, 10),
+        ]
+        self.entries = [SyntheticEntry(x + 1) for x in range(num_entries)]
+        self.history = OpponentHistory()
+        self.re_match = self.history.re_match
+        for _ in range(rounds_played):
+            self._play_round()
+
+    def _play_round(self):
+        """Random pairings on random tables, with a score for each entry"""
+        field = self.entries[:]
+        self.random.shuffle(field)
+        num_tables = (len(field) + 1) // 2
+        tables = range(1, num_tables + 1)
+        self.random.shuffle(tables)
+
+        for table, i in zip(tables, range(0, len(field), 2)):
+            game = field[i:i + 2]
+            self.history.add_game([x.id for x in game])
+            for entry in game:
+                entry.game_history.append(table)
+                entry.scores.extend(
+                    SyntheticScore(x, self.random.randint(0, x.max_val)) \
+                    for x in self.categories)
+
+    def get_score_categories(self):
+        """The score categories, as a RankingStrategy expects them"""
+        return self.categories
+
+    def totals(self):
+        """A dict of the summed score for each entry by id"""
+        return dict((x.id, sum(s.value for s in x.scores)) \
+            for x in self.entries)
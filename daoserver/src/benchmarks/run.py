@@ -0,0 +1,169 @@
+"""
+Benchmark the draw, table allocation and ranking algorithms
+
+Each algorithm is run against synthetic tournaments of increasing size. The
+best time of a few runs and the peak memory used are reported for each.
+
+Usage, from daoserver/src:
+    python -m benchmarks.run                    # report
+    python -m benchmarks.run --save             # record a new baseline
+    python -m benchmarks.run --compare          # check against the baseline
+
+--compare exits with status 1 if anything is slower, or uses more memory,
+than the baseline by more than the tolerance.
+
+Timings depend on the machine, so the baseline is local to each one and is
+not committed (see .gitignore). Record it with --save on a checkout without
+the change being measured, then --compare with it.
+"""
+
+import argparse
+import json
+from multiprocessing import Process, Queue
+import os
+import resource
+import sys
+import time
+
+from benchmarks.generators import SyntheticTournament
+from models.matching_strategy import RoundRobin, SwissChess
+from models.ranking_strategies import RankingStrategy
+from models.table_strategy import ProtestAvoidanceStrategy
+
+BASELINE = os.path.join(os.path.dirname(__file__), 'baseline.json')
+SIZES = [8, 16, 32, 64, 128, 256, 512, 1000]
+ROUNDS_PLAYED = 5
+
+# Runs of each case stop after this many seconds, or MAX_RUNS
+MIN_TIME = 0.5
+MAX_RUNS = 5
+
+def round_robin(tourn):
+    """RoundRobin.match for the next round"""
+    strategy = RoundRobin().set_round(ROUNDS_PLAYED + 1)
+    return lambda: strategy.match(tourn.entries)
+
+def swiss_chess(tourn):
+    """SwissChess.match, avoiding re-matches of earlier rounds"""
+    totals = tourn.totals()
+    strategy = SwissChess(rank=lambda entry: totals[entry.id],
+                          re_match=tourn.re_match)
+    return lambda: strategy.match(tourn.entries)
+
+def protest_avoidance(tourn):
+    """ProtestAvoidanceStrategy.determine_tables for a round of games"""
+    games = RoundRobin().set_round(ROUNDS_PLAYED + 1).match(tourn.entries)
+    strategy = ProtestAvoidanceStrategy()
+    return lambda: strategy.determine_tables(games)
+
+def overall_ranking(tourn):
+    """RankingStrategy.overall_ranking of the whole field"""
+    strategy = RankingStrategy('benchmark', tourn.get_score_categories)
+    return lambda: strategy.overall_ranking(tourn.entries[:])
+
+CASES = [round_robin, swiss_chess, protest_avoidance, overall_ranking]
+
+def _max_rss():
+    """Peak resident memory of this process in KB"""
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+def _measure(case, size, results):
+    """Run a single case in this (child) process and put the result"""
+    func = case(SyntheticTournament(size, ROUNDS_PLAYED))
+    rss_before = _max_rss()
+    times = []
+    while len(times) < MAX_RUNS and sum(times) < MIN_TIME:
+        start = time.time()
+        func()
+        times.append(time.time() - start)
+    results.put({
+        'time': min(times),
+        'memory': _max_rss() - rss_before,
+        'runs': len(times),
+    })
+
+def measure(case, size):
+    """
+    Time and peak memory for a case. Each is run in a fresh process so the
+    peak memory of one doesn't hide that of the next.
+    """
+    results = Queue()
+    proc = Process(target=_measure, args=(case, size, results))
+    proc.start()
+    result = results.get()
+    proc.join()
+    return result
+
+def run(names, sizes, out=sys.stdout):
+    """Measure every case at every size. Returns {case: {size: result}}"""
+    report = {}
+    for case in [x for x in CASES if x.__name__ in names]:
+        report[case.__name__] = {}
+        for size in sizes:
+            result = measure(case, size)
+            report[case.__name__][str(size)] = result
+            out.write('{:<20} {:>5} {:>10.4f}s {:>8}KB\n'.format(
+                case.__name__, size, result['time'], result['memory']))
+            out.flush()
+    return report
+
+def regressions(report, baseline, tolerance):
+    """
+    The measurements in report that are worse than those in baseline by more
+    than tolerance (a fraction). Very short times and small amounts of memory
+    are too noisy to compare so are ignored.
+    """
+    worse = []
+    for name, sizes in report.items():
+        for size, result in sizes.items():
+            base = baseline.get(name, {}).get(size)
+            if base is None:
+                continue
+            if result['time'] > 0.001 and \
+            result['time'] > base['time'] * (1 + tolerance):
+                worse.append('{} {}: {:.4f}s, was {:.4f}s'.format(
+                    name, size, result['time'], base['time']))
+            if result['memory'] > 1024 and \
+            result['memory'] > base['memory'] * (1 + tolerance):
+                worse.append('{} {}: {}KB, was {}KB'.format(
+                    name, size, result['memory'], base['memory']))
+    return worse
+
+def main():
+    """Entry point"""
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--case', action='append',
+                        choices=[x.__name__ for x in CASES],
+                        help='Only run this case. May be repeated')
+    parser.add_argument('--size', action='append', type=int,
+                        help='Only use this field size. May be repeated')
+    parser.add_argument('--save', action='store_true',
+                        help='Record the results as the baseline')
+    parser.add_argument('--compare', action='store_true',
+                        help='Compare the results with the baseline')
+    parser.add_argument('--tolerance', type=float, default=0.5,
+                        help='Allowed fraction worse than the baseline')
+    args = parser.parse_args()
+
+    if args.compare and not os.path.exists(BASELINE):
+        parser.error('no baseline on this machine, record one with --save')
+
+    report = run(args.case or [x.__name__ for x in CASES], args.size or SIZES)
+
+    if args.compare:
+        with open(BASELINE) as baseline_file:
+            worse = regressions(report, json.load(baseline_file),
+                                args.tolerance)
+        for line in worse:
+            print 'REGRESSION {}'.format(line)
+        if worse:
+            sys.exit(1)
+
+    if args.save:
+        with open(BASELINE, 'w') as baseline_file:
+            json.dump(report, baseline_file, indent=2, sort_keys=True,
+                      separators=(',', ': '))
+            baseline_file.write('\n')
+
+if __name__ == '__main__':
+    main()
@@ -7,7 +7,11 @@ should talk to this for functionality wherever possible.
 
 from flask import Blueprint
 
-from controllers.request_helpers import text_response
+from controllers.request_helpers import ensure_permission, json_response, \
+requires_auth, text_response
+from models.dao.db_connection import db
+from models.dao.pool_monitor import MONITOR, pool_settings
+from models.dao.query_profiler import PROFILER
 
 APP = Blueprint('APP', __name__, url_prefix='')
 
@@ -16,3 +20,27 @@ APP = Blueprint('APP', __name__, url_prefix='')
 def main():
     """Index page. Used to verify the server is running."""
     return 'daoserver'
+
+@APP.route("/instrumentation", methods=['GET'])
+@requires_auth
+@ensure_permission({'permission': 'MODIFY_TOURNAMENT'})
+@json_response
+def instrumentation():
+    """
+    Connection pool usage and queries per request since the server started.
+    Superusers only.
+    """
+    report = MONITOR.report(db.engine.pool)
+    report['settings'] = pool_settings()
+    return report
+
+@APP.route("/instrumentation/queries", methods=['GET'])
+@requires_auth
+@ensure_permission({'permission': 'MODIFY_TOURNAMENT'})
+@json_response
+def query_profile():
+    """
+    The statements run, time spent in the db and slowest statements for each
+    endpoint since the server started. Superusers only.
+    """
+    return PROFILER.report()
@@ -0,0 +1,29 @@
+"""
+Background jobs. See models.jobs
+"""
+from flask import Blueprint, request
+
+from controllers.request_helpers import json_response, requires_auth
+from models.authentication import PermissionDeniedException
+from models.jobs import get_job
+
+JOB = Blueprint('JOB', __name__)
+
+@JOB.route('/<int:job_id>', methods=['GET'])
+@requires_auth
+@json_response
+def job_status(job_id):
+    """
+    GET the status of a job queued by the user. Returns json:
+        {
+            id: 1, kind: 'update_tournament', tournament: 'some_tournie',
+            status: 'queued' | 'running' | 'done' | 'failed',
+            progress: {done: 2, total: 5},
+            result: 'Tournament some_tournie updated', error: null,
+            created: '2017-01-01T10:00:00+00:00', started: ..., finished: ...
+        }
+    """
+    job = get_job(job_id)
+    if job.username != request.authorization.username:
+        raise PermissionDeniedException('Job {} is not yours'.format(job_id))
+    return job.to_dict()
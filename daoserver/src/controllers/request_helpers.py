@@ -4,10 +4,33 @@ Basic decorator for enforcing request elements
 
 from functools import wraps
 from flask import g, Response, request
-import jsonpickle
+from controllers import serializer
 from models.authentication import check_auth
 from models.permissions import PERMISSIONS, PermissionsChecker
 
+def conditional_response(*vary):
+    """
+    A decorator that gives the Response an ETag, and replies 304 Not Modified
+    when the request's If-None-Match already has it. vary lists the request
+    headers, other than the URL, the response depends on.
+
+    Streamed responses are left alone.
+    """
+    def decorator(func):                # pylint: disable=missing-docstring
+        @wraps(func)
+        def wrapped(*args, **kwargs):   # pylint: disable=missing-docstring
+
+            response = func(*args, **kwargs)
+            if response.is_streamed or response.status_code != 200:
+                return response
+
+            for header in vary:
+                response.vary.add(header)
+            response.add_etag()
+            return response.make_conditional(request)
+        return wrapped
+    return decorator
+
 def enforce_request_variables(*vars_to_enforce):
     """ A decorator that requires var exists in the request"""
     def decorator(func):                # pylint: disable=missing-docstring
@@ -71,17 +94,31 @@ def ensure_permission(permission):
         return wrapped
     return decorator
 
+def job_accepted(job):
+    """A 202 Accepted Response for a queued job, pointing to its status"""
+    return Response(serializer.encode(job.to_dict()), 202,
+                    {'Location': '/jobs/{}'.format(job.id)},
+                    mimetype='application/json')
+
 def json_response(func):
-    """Wrap the return value of func with jsonpickle and return as Response"""
+    """Wrap the return value of func as JSON and return as Response"""
     @wraps(func)
     def wrapped(*args, **kwargs):       # pylint: disable=missing-docstring
 
         return Response(
-            jsonpickle.encode(func(*args, **kwargs), unpicklable=False),
+            serializer.encode_response(func(*args, **kwargs)),
             mimetype='application/json')
 
     return wrapped
 
+def prefers_async():
+    """
+    Whether the request has Prefer: respond-async, i.e. the client would
+    rather long running work was queued as a job (see models.jobs)
+    """
+    prefer = request.headers.get('Prefer', '')
+    return 'respond-async' in [x.strip() for x in prefer.split(',')]
+
 def requires_auth(func):
     """Checks the authorization of the request for a valid user password"""
     @wraps(func)
@@ -0,0 +1,102 @@
+"""
+JSON encoding for responses
+
+Responses were encoded with jsonpickle (unpicklable=False), which inspects
+every value it meets. Nearly every response is built from dicts, lists,
+strings, numbers and dates, so these are checked once and handed straight to
+the json module's C encoder. The output is byte for byte what jsonpickle
+produces:
+    - keys are sorted, with the default ', ' and ': ' separators
+    - dates, times and datetimes are isoformat strings
+    - tuples and sets are lists
+
+Anything else (e.g. an ORM object) is left to jsonpickle.
+"""
+
+import datetime
+import json
+
+import jsonpickle
+from jsonpickle import tags
+
+# Lists longer than this are streamed to the client an element at a time
+STREAM_THRESHOLD = 500
+
+_SCALARS = (unicode, int, long, float, bool, type(None))
+_DATES = (datetime.datetime, datetime.date, datetime.time)
+_ENCODER = None
+
+def _is_text(obj):
+    """A unicode string or a utf-8 bytestring"""
+    if type(obj) is unicode:
+        return True
+    if type(obj) is str:
+        try:
+            obj.decode('utf-8')
+            return True
+        except UnicodeDecodeError:
+            return False
+    return False
+
+def is_plain(obj):
+    """Whether obj can be encoded without jsonpickle"""
+    stack = [obj]
+    while stack:
+        item = stack.pop()
+        kind = type(item)
+        if kind in _SCALARS or kind in _DATES:
+            continue
+        elif kind is str:
+            if not _is_text(item):
+                return False
+        elif kind is dict:
+            for key, value in item.iteritems():
+                if not _is_text(key) or key in tags.RESERVED \
+                or callable(value):
+                    return False
+                stack.append(value)
+        elif kind in (list, tuple, set):
+            stack.extend(item)
+        else:
+            return False
+    return True
+
+def _default(obj):
+    """Encode the types the json module doesn't know"""
+    if type(obj) in _DATES:
+        return obj.isoformat()
+    if type(obj) is set:
+        return list(obj)
+    raise TypeError('{} is not JSON serializable'.format(repr(obj)))
+
+def _encoder():
+    """A shared encoder matching the options jsonpickle uses"""
+    global _ENCODER                     # pylint: disable=global-statement
+    if _ENCODER is None:
+        _ENCODER = json.JSONEncoder(sort_keys=True, default=_default)
+    return _ENCODER
+
+def encode(obj):
+    """Encode obj as JSON. Identical to jsonpickle's unpicklable output"""
+    if is_plain(obj):
+        return _encoder().encode(obj)
+    return jsonpickle.encode(obj, unpicklable=False)
+
+def encode_response(obj):
+    """
+    Encode obj for a Response. Long lists are returned as a generator of
+    chunks, encoded an element at a time, so the start of the response can be
+    sent before the rest is encoded. Everything else is a string.
+    """
+    if type(obj) is not list or len(obj) <= STREAM_THRESHOLD \
+    or not is_plain(obj):
+        return encode(obj)
+    return _stream(obj)
+
+def _stream(items):
+    """Encode a list of plain items as a generator of chunks"""
+    encoder = _encoder()
+    yield '['
+    for i, item in enumerate(items):
+        yield (', ' if i else '') + encoder.encode(item)
+    yield ']'
@@ -1,14 +1,17 @@
 """
 All tournament interactions.
 """
+from datetime import datetime
 from decimal import Decimal as Dec
 from flask import Blueprint, g, request
 
-from controllers.request_helpers import enforce_request_variables, \
-json_response, requires_auth, text_response, ensure_permission
+from controllers.request_helpers import conditional_response, \
+enforce_request_variables, job_accepted, json_response, prefers_async, \
+requires_auth, text_response, ensure_permission
 from models.dao.registration import TournamentRegistration
-from models.dao.tournament import Tournament as TournamentDAO
-from models.tournament import Tournament
+from models.jobs import enqueue, tournament_jobs
+from models.tournament import PROGRESS_EXCEPTION, Tournament, \
+tournament_listing
 
 TOURNAMENT = Blueprint('TOURNAMENT', __name__)
 
@@ -22,6 +25,16 @@ def get_tournament(endpoint, values):
 
     g.username = values.pop('username', None)
 
+def queue_job(kind, **args):
+    """
+    Queue a job for the tournament, which must exist and not be in progress.
+    Returns 202 Accepted
+    """
+    if g.tournament.check_exists().get_dao().in_progress:
+        raise PROGRESS_EXCEPTION
+    return job_accepted(enqueue(kind, request.authorization.username,
+                                g.tournament_id, **args))
+
 @TOURNAMENT.route('', methods=['POST'])
 @requires_auth
 @json_response
@@ -51,6 +64,14 @@ def start_tournament():
     g.tournament.set_in_progress()
     return 'Tournament {} now in progress'.format(g.tournament_id)
 
+@TOURNAMENT.route('/<tournament_id>/jobs', methods=['GET'])
+@requires_auth
+@ensure_permission({'permission': 'MODIFY_TOURNAMENT'})
+@json_response
+def list_jobs():
+    """GET the 20 most recent jobs for the tournament, newest first"""
+    return [x.to_dict() for x in tournament_jobs(g.tournament_id)]
+
 @TOURNAMENT.route('/<tournament_id>/missions', methods=['GET'])
 @json_response
 def list_missions():
@@ -67,24 +88,39 @@ def list_score_categories():
     return g.tournament.get_score_categories(serialized=True)
 
 @TOURNAMENT.route('/', methods=['GET'])
+@conditional_response('Authorization')
 @json_response
 def list_tournaments():
     """
-    GET a list of tournaments
-    Returns json. The only key is 'tournaments' and the value is a list of
-    dicts - {name: '', date, 'YY-MM-DD', rounds: 1}
+    GET a page of tournaments, ordered by name
+    Optional query parameters:
+        - page - starting at 1
+        - per_page - defaults to 50, at most 500. Without page or per_page
+        every tournament is listed
+        - from, to - YYYY-MM-DD, inclusive
+    Returns json:
+        {
+            tournaments: [{name: '', date, 'YY-MM-DD', rounds: 1, entries: 2,
+                          user_entered: false}],
+            page: 1, per_page: 50, total: 1
+        }
     """
-    user = getattr(request.authorization, 'username', None)
-    # pylint: disable=no-member
-    details = [{
-        'name': x.name,
-        'date': x.date,
-        'rounds': x.rounds.count(),
-        'entries': x.entries.count(),
-        'user_entered': x.entries.filter_by(player_id=user).count() == 1
-    } for x in TournamentDAO.query.all()]
-
-    return {'tournaments' : sorted(details, key=lambda to: to['name'])}
+    def parse_date(value):              # pylint: disable=missing-docstring
+        if value is None:
+            return None
+        try:
+            return datetime.strptime(value, Tournament.DATE_FORMAT).date()
+        except ValueError:
+            raise ValueError('Dates should be YYYY-MM-DD')
+
+    return tournament_listing(
+        username=getattr(request.authorization, 'username', None),
+        page=request.args.get('page', 1),
+        per_page=request.args.get(
+            'per_page',
+            50 if 'page' in request.args else None),
+        date_from=parse_date(request.args.get('from')),
+        date_to=parse_date(request.args.get('to')))
 
 @TOURNAMENT.route('/<tournament_id>/rankings', methods=['GET'])
 @json_response
@@ -113,8 +149,7 @@ def rank_entries():
             'scores' : x.score_info,
             'total_score' : str(Dec(x.total_score).quantize(Dec('1.00'))),
             'ranking': x.ranking
-        } for x in g.tournament.ranking_strategy.overall_ranking(
-            g.tournament.get_entries())
+        } for x in g.tournament.get_standings()
     ]
 
 @TOURNAMENT.route('/<tournament_id>/register/<username>', methods=['POST'])
@@ -124,12 +159,14 @@ def rank_entries():
 def register():
     """
     POST to apply for entry to a tournament.
+
+    The draws are not redone for each registration. They are brought up to
+    date when the tournament starts.
     """
     exists = g.tournament.details() # pylint: disable=unused-variable
     rego = TournamentRegistration(g.username, g.tournament_id)
     rego.add_to_db()
     g.tournament.confirm_entries()
-    g.tournament.get_draw().make_draws(g.tournament)
 
     return 'Application Submitted'
 
@@ -152,6 +189,12 @@ def tournament_details():
 @requires_auth
 @ensure_permission({'permission': 'MODIFY_TOURNAMENT'})
 def update():
-    """POST to update Tournament"""
+    """
+    POST to update Tournament. With Prefer: respond-async the update is
+    queued as a job and 202 Accepted returned with the job's status
+    """
+    if prefers_async():
+        return queue_job('update_tournament', details=request.get_json())
+
     g.tournament.update(request.get_json())
     return 'Tournament {} updated'.format(g.tournament_id)
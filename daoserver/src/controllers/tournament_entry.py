@@ -5,6 +5,7 @@ from flask import Blueprint, g, request
 
 from controllers.request_helpers import json_response, requires_auth, \
 text_response, ensure_permission
+from models.dao.account import Account
 from models.dao.tournament_entry import TournamentEntry as TournamentEntryDAO
 from models.tournament import Tournament
 from models.tournament_entry import TournamentEntry
@@ -29,8 +30,10 @@ def list_entries():
     """
     Tournament(g.tournament_id).check_exists()
     # pylint: disable=no-member
-    return [User(ent.player_id).get_display_name() for ent in \
-        TournamentEntryDAO.query.filter_by(tournament_id=g.tournament_id).all()]
+    return [User.display_name(acc) for acc in Account.query.\
+        join(TournamentEntryDAO).\
+        filter(TournamentEntryDAO.tournament_id == g.tournament_id).\
+        order_by(TournamentEntryDAO.id)]
 
 @ENTRY.route('/<username>/scoresentered', methods=['GET'])
 @requires_auth
@@ -1,9 +1,10 @@
 """
 Individual rounds in a tournament
 """
-from flask import Blueprint, g
+from flask import Blueprint, g, request
 
-from controllers.request_helpers import json_response
+from controllers.request_helpers import conditional_response, \
+ensure_permission, json_response, requires_auth, text_response
 from models.tournament import Tournament
 
 TOURNAMENT_ROUND = Blueprint('TOURNAMENT_ROUND', __name__)
@@ -16,10 +17,24 @@ def get_tournament(endpoint, values):
     g.tournament = Tournament(g.tournament_id).check_exists()
 
 @TOURNAMENT_ROUND.route('/<round_id>', methods=['GET'])
+@conditional_response()
 @json_response
 def get_round_info(round_id):
     """
-    GET draw and mission about a round
+    GET draw and mission about a round. Published draws are cached, and
+    If-None-Match is answered with 304 Not Modified while the draw is
+    unchanged
     """
-    return g.tournament.get_draw().set_round(g.tournament.get_round(round_id)).\
-        get_draw()
+    return g.tournament.get_published_draw(round_id)
+
+@TOURNAMENT_ROUND.route('/<round_id>/scores', methods=['POST'])
+@requires_auth
+@text_response
+@ensure_permission({'permission': 'MODIFY_TOURNAMENT'})
+def enter_scores(round_id):
+    """
+    POST the scores for many entries in a round at once. Either all are
+    entered or none are.
+    """
+    return g.tournament.set_round_scores(
+        round_id, request.get_json().get('scores', None))
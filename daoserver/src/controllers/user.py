@@ -2,7 +2,7 @@
 Users for the site. Note this is separate from an entry in a tournament.
 """
 
-from flask import Blueprint, g, request
+from flask import Blueprint, g, request, Response
 
 from controllers.request_helpers import enforce_request_variables, \
 json_response, requires_auth, text_response, ensure_permission
@@ -29,9 +29,16 @@ def available_actions():
 @text_response
 @enforce_request_variables('inputPassword')
 def login():
-    """POST to login"""
-    g.user.login(inputPassword)
-    return 'Login successful'
+    """
+    POST to login
+    If session tokens are enabled the token is returned in the X-Auth-Token
+    header. It can be used in place of the password.
+    """
+    token = g.user.login(inputPassword)
+    if token is None:
+        return 'Login successful'
+    return Response('Login successful', mimetype='text/html',
+                    headers={'X-Auth-Token': token})
 
 # pylint: disable=undefined-variable
 @USER.route('', methods=['POST'])
@@ -0,0 +1,104 @@
+"""
+Config for serving the DAO server with gunicorn
+
+A master process forks a pool of workers and restarts any that die. Each
+worker is threaded, so a slow request doesn't hold up the rest.
+
+Environment:
+    - PORT - to bind to. Defaults to 5000
+    - WEB_CONCURRENCY - number of workers. Defaults to 2 * CPUs + 1
+    - WORKER_CLASS - only gthread (the default) is supported
+    - WORKER_THREADS - threads per worker. Defaults to 4
+    - WORKER_TIMEOUT - seconds before a silent worker is restarted. Defaults
+    to 30
+    - MAX_REQUESTS - requests a worker serves before being replaced, 0 for
+    never. Defaults to 1000
+    - JOB_WORKERS - job workers (job_worker.py) to run queued jobs, see
+    models.jobs. Defaults to 1
+
+Send the master SIGHUP to reload. New workers, with the new code and config,
+are started and the old ones finish their requests before exiting. The job
+workers are replaced too, once they finish the job they are running.
+"""
+# pylint: disable=invalid-name,unused-argument
+
+import multiprocessing
+import os
+import subprocess
+import sys
+
+def worker_count(environ, cpus=None):
+    """The number of workers to run"""
+    if environ.get('WEB_CONCURRENCY'):
+        return max(1, int(environ['WEB_CONCURRENCY']))
+    return 2 * (cpus or multiprocessing.cpu_count()) + 1
+
+def worker_settings(environ):
+    """
+    The worker class along with its concurrency settings. Only threaded
+    workers are supported: the draw pool and job runner rely on real threads
+    and processes
+    """
+    worker_type = environ.get('WORKER_CLASS', 'gthread')
+    if worker_type != 'gthread':
+        raise ValueError('Unknown WORKER_CLASS: {}'.format(worker_type))
+    return {
+        'worker_class': 'gthread',
+        'threads': int(environ.get('WORKER_THREADS', 4)),
+    }
+
+def start_job_workers(count):
+    """Start count job workers. Returns their processes"""
+    here = os.path.dirname(os.path.abspath(__file__))
+    return [subprocess.Popen([sys.executable, 'job_worker.py'], cwd=here) \
+            for _ in range(count)]
+
+def stop_job_workers(processes, wait=True):
+    """Stop job workers once they finish the job they are running"""
+    for process in processes:
+        if process.poll() is None:
+            process.terminate()
+    for process in processes if wait else []:
+        process.wait()
+
+bind = '0.0.0.0:{}'.format(os.environ.get('PORT', 5000))
+workers = worker_count(os.environ)
+_worker = worker_settings(os.environ)
+worker_class = _worker['worker_class']
+threads = _worker['threads']
+timeout = int(os.environ.get('WORKER_TIMEOUT', 30))
+graceful_timeout = timeout
+max_requests = int(os.environ.get('MAX_REQUESTS', 1000))
+max_requests_jitter = max_requests / 10
+# Each worker loads the app itself so that SIGHUP picks up new code
+preload_app = False
+accesslog = '-'
+job_workers = max(0, int(os.environ.get('JOB_WORKERS', 1)))
+_job_processes = []
+
+def on_starting(server):
+    """Do the one off start up work in the master, before any workers fork"""
+    from app import create_app, set_up
+    from models.dao.db_connection import db
+
+    app = create_app()
+    set_up(app)
+    with app.app_context():
+        # Don't hand the master's connections down to the workers
+        db.engine.dispose()
+
+def when_ready(server):
+    """Start the job workers once the server is up"""
+    _job_processes[:] = start_job_workers(job_workers)
+
+def on_reload(server):
+    """
+    Replace the job workers, to pick up new code. The master doesn't wait
+    for the old ones to finish their jobs
+    """
+    stop_job_workers(_job_processes, wait=False)
+    _job_processes[:] = start_job_workers(job_workers)
+
+def on_exit(server):
+    """Stop the job workers with the server"""
+    stop_job_workers(_job_processes)
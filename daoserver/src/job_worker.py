@@ -0,0 +1,24 @@
+"""
+Runs queued jobs (see models.jobs), one at a time, until stopped. e.g.
+
+    python job_worker.py
+
+SIGTERM or SIGINT stop the worker once the job it is running is done. The
+production server starts JOB_WORKERS of these, see gunicorn_conf.py.
+"""
+
+import signal
+import threading
+
+from app import create_app, register_handlers
+from models.jobs import JobRunner
+
+if __name__ == '__main__':
+    STOP = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *args: STOP.set())
+    signal.signal(signal.SIGINT, lambda *args: STOP.set())
+
+    register_handlers()
+    APP = create_app()
+    with APP.app_context():
+        JobRunner().run_forever(STOP)
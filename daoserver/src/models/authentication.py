@@ -1,5 +1,13 @@
 """Module to enforce auth on requests coming from the client apps."""
 
+from collections import OrderedDict
+import hashlib
+import hmac
+import os
+import threading
+import time
+
+from itsdangerous import BadSignature, URLSafeTimedSerializer
 from passlib.hash import sha256_crypt
 
 from models.dao.account import AccountSecurity
@@ -8,19 +16,132 @@ class PermissionDeniedException(Exception):
     """No permissions for requested action"""
     pass
 
+def _as_bytes(text):
+    """Encode unicode so it can be digested"""
+    return text.encode('utf-8') if isinstance(text, unicode) else text
+
+class CredentialCache(object):
+    """
+    A cache of credentials that have already been verified against their
+    password hash, so that a user's requests don't pay the hash cost each time.
+
+    - Passwords are never kept. The key is the username and a keyed digest of
+    the password, with the key private to this process.
+    - Each credential remembers the hash it was verified against. If the
+    stored hash changes (the password was changed) the credential is no
+    longer valid and is dropped, so nothing needs to tell the cache about a
+    password change.
+    - Credentials expire after ttl seconds and the least recently used are
+    dropped once there are more than max_size.
+    """
+
+    def __init__(self, max_size=1024, ttl=300):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.secret = os.urandom(32)
+        self.credentials = OrderedDict()
+        self.lock = threading.Lock()
+
+    def _key(self, username, password):
+        """The cache key for a username and password"""
+        return (username, hmac.new(self.secret, _as_bytes(password),
+                                   hashlib.sha256).hexdigest())
+
+    def add(self, username, password, stored_hash):
+        """Remember a credential that has been verified against stored_hash"""
+        key = self._key(username, password)
+        with self.lock:
+            self.credentials.pop(key, None)
+            self.credentials[key] = (time.time() + self.ttl, stored_hash)
+            while len(self.credentials) > self.max_size:
+                self.credentials.popitem(last=False)
+
+    def check(self, username, password, stored_hash):
+        """Whether the credential was verified against stored_hash recently"""
+        key = self._key(username, password)
+        with self.lock:
+            cached = self.credentials.pop(key, None)
+            if cached is None:
+                return False
+            expiry, verified_hash = cached
+            if expiry < time.time() or verified_hash != stored_hash:
+                return False
+            self.credentials[key] = cached
+            return True
+
+    def clear(self):
+        """Forget everything"""
+        with self.lock:
+            self.credentials.clear()
+
+CREDENTIAL_CACHE = CredentialCache(
+    int(os.environ.get('AUTH_CACHE_SIZE', 1024)),
+    int(os.environ.get('AUTH_CACHE_TTL', 300)))
+
+def _token_serializer():
+    """
+    Session tokens are only available when AUTH_TOKEN_SECRET is set. Returns
+    None otherwise.
+    """
+    secret = os.environ.get('AUTH_TOKEN_SECRET')
+    if not secret:
+        return None
+    return URLSafeTimedSerializer(secret, salt='session-token')
+
+def _fingerprint(stored_hash):
+    """Ties a token to the password hash it was issued against"""
+    return hashlib.sha256(_as_bytes(stored_hash)).hexdigest()[:16]
+
+def _stored_hash(username):
+    """The password hash for username, or None"""
+    # pylint: disable=no-member
+    creds = AccountSecurity.query.filter_by(id=username).first()
+    return creds.password if creds is not None else None
+
+def issue_token(username):
+    """
+    Create a signed session token for username. The token can be used in
+    place of the password until it expires or the password changes.
+
+    Returns None if session tokens are not enabled.
+    """
+    serializer = _token_serializer()
+    stored_hash = _stored_hash(username)
+    if serializer is None or stored_hash is None:
+        return None
+    return serializer.dumps([username, _fingerprint(stored_hash)])
+
+def _check_token(username, token, stored_hash):
+    """Whether token is a valid session token for username"""
+    serializer = _token_serializer()
+    if serializer is None:
+        return False
+    try:
+        token_user, fingerprint = serializer.loads(
+            token, max_age=int(os.environ.get('AUTH_TOKEN_TTL', 86400)))
+    except (BadSignature, TypeError, ValueError):
+        return False
+    return token_user == username and fingerprint == _fingerprint(stored_hash)
+
 def check_auth(username, password):
     """This function is called to check if a username /
     password combination is valid.
+
+    The password may also be a session token from issue_token.
     """
     if not username or not password:
         return False
 
-    try:
-        # pylint: disable=no-member
-        creds = AccountSecurity.query.filter_by(id=username).first().password
-        if sha256_crypt.verify(password, creds):
-            return True
-    except AttributeError:
+    stored_hash = _stored_hash(username)
+    if stored_hash is None:
         return False
 
+    if CREDENTIAL_CACHE.check(username, password, stored_hash) \
+    or _check_token(username, password, stored_hash):
+        return True
+
+    if sha256_crypt.verify(password, stored_hash):
+        CREDENTIAL_CACHE.add(username, password, stored_hash)
+        return True
+
     return False
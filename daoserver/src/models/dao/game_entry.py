@@ -16,7 +16,8 @@ class GameEntrant(db.Model):
                         primary_key=True)
     entrant_id = db.Column(db.Integer,
                            db.ForeignKey(TournamentEntry.id),
-                           primary_key=True)
+                           primary_key=True,
+                           index=True)
 
     game = db.relationship(TournamentGame,
                            backref=db.backref('entrants', lazy='dynamic'))
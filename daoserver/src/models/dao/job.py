@@ -0,0 +1,82 @@
+"""
+ORM module for a background job. See models.jobs
+"""
+# pylint: disable=invalid-name
+
+import json
+
+from sqlalchemy import func
+
+from models.dao.db_connection import db
+
+# Session info key for the function reporting the progress of the job being
+# run, if any
+PROGRESS = 'job_progress'
+
+def report_progress(done, total):
+    """
+    Report that done of total steps of the operation are done. This only
+    does anything when the operation is being run as a job
+    """
+    report = db.session.info.get(PROGRESS)
+    if report is not None:
+        report(done, total)
+
+class Job(db.Model):
+    """A row in the job table"""
+
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+
+    __tablename__ = 'job'
+    __table_args__ = (
+        db.Index('job_status_idx', 'status', 'id'),
+        db.Index('job_tournament_name_idx', 'tournament_name', 'id'),
+    )
+    id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String, nullable=False)
+    tournament_name = db.Column(db.String)
+    args = db.Column(db.Text, nullable=False, default='{}')
+    username = db.Column(db.String, nullable=False)
+    status = db.Column(db.String, nullable=False, default=QUEUED)
+    done = db.Column(db.Integer)
+    total = db.Column(db.Integer)
+    result = db.Column(db.String)
+    error = db.Column(db.String)
+    worker = db.Column(db.String)
+    created = db.Column(db.DateTime(timezone=True), nullable=False,
+                        server_default=func.now())
+    started = db.Column(db.DateTime(timezone=True))
+    finished = db.Column(db.DateTime(timezone=True))
+    heartbeat = db.Column(db.DateTime(timezone=True))
+
+    def __init__(self, kind, username, tournament_name=None, args=None):
+        self.kind = kind
+        self.username = username
+        self.tournament_name = tournament_name
+        self.args = json.dumps(args or {})
+        self.status = self.QUEUED
+
+    def get_args(self):
+        """The arguments for the job, as a dict"""
+        return json.loads(self.args)
+
+    def to_dict(self):
+        """The status of the job"""
+        return {
+            'id': self.id,
+            'kind': self.kind,
+            'tournament': self.tournament_name,
+            'status': self.status,
+            'progress': {'done': self.done, 'total': self.total},
+            'result': self.result,
+            'error': self.error,
+            'created': self.created,
+            'started': self.started,
+            'finished': self.finished,
+        }
+
+    def __repr__(self):
+        return '<Job {} {} {}>'.format(self.id, self.kind, self.status)
@@ -0,0 +1,41 @@
+"""
+Finding DAOs without going back to the db
+
+Query.get finds a row by primary key in the session's identity map, so a row
+already loaded in the request isn't queried for again. filter_by(...).first()
+always queries, even when the row is already loaded. find_by gives lookups by
+any other unique key the same behaviour.
+
+The session lasts for the request and expires everything on commit, so rows
+are reloaded, with one query by primary key, after writes.
+"""
+
+from sqlalchemy import inspect
+
+from models.dao.db_connection import db
+
+# Session info key for the primary keys found by find_by
+FOUND = 'found_by_key'
+
+def find_by(model, **key):
+    """
+    The DAO of model with the unique key given, or None. Each row is queried
+    for at most once per request, unless it has been written to.
+    """
+    found = db.session.info.setdefault(FOUND, {})
+    lookup = (model, tuple(sorted(key.items())))
+
+    ident = found.get(lookup)
+    if ident is not None:
+        dao = model.query.get(ident)
+        # The row may have since been deleted or had its key changed
+        if dao is not None and \
+        all(getattr(dao, k) == v for k, v in key.iteritems()):
+            return dao
+
+    dao = model.query.filter_by(**key).first()
+    if dao is None:
+        found.pop(lookup, None)
+    else:
+        found[lookup] = inspect(dao).identity
+    return dao
@@ -0,0 +1,171 @@
+"""
+Connection pool settings and usage
+
+The pool is sized from the environment:
+    - DB_POOL_SIZE - connections kept open
+    - DB_MAX_OVERFLOW - connections opened beyond that under load
+    - DB_POOL_TIMEOUT - seconds to wait for a connection before failing
+    - DB_POOL_RECYCLE - seconds before a connection is replaced
+    - DB_POOL_PRE_PING - check connections are alive before use
+
+Anything not set uses the SQLAlchemy default.
+
+The PoolMonitor records how the pool is used: how many connections are
+checked out, how long requests wait for one, and how many queries each
+request runs. The queries are counted by the query profiler (see
+models.dao.query_profiler), which passes each request's count on.
+"""
+import os
+import threading
+import time
+
+from sqlalchemy import event
+from sqlalchemy.pool import QueuePool
+
+def _as_bool(value):
+    """Parse a boolean from the environment"""
+    return value.lower() in ('1', 'true', 'yes', 'on')
+
+POOL_SETTINGS = [
+    ('DB_POOL_SIZE', 'pool_size', int),
+    ('DB_MAX_OVERFLOW', 'max_overflow', int),
+    ('DB_POOL_TIMEOUT', 'pool_timeout', float),
+    ('DB_POOL_RECYCLE', 'pool_recycle', int),
+    ('DB_POOL_PRE_PING', 'pool_pre_ping', _as_bool),
+]
+
+def pool_settings(environ=None):
+    """The pool settings given in the environment"""
+    environ = os.environ if environ is None else environ
+    settings = {}
+    for var, option, parse in POOL_SETTINGS:
+        if environ.get(var):
+            try:
+                settings[option] = parse(environ[var])
+            except ValueError:
+                raise ValueError('{} must be a {}'.format(var,
+                                                          parse.__name__))
+    return settings
+
+def engine_options(environ=None):
+    """SQLALCHEMY_ENGINE_OPTIONS for a monitored pool"""
+    options = pool_settings(environ)
+    options['poolclass'] = MonitoredQueuePool
+    return options
+
+
+# pylint: disable=too-many-instance-attributes
+class PoolMonitor(object):
+    """Counts of pool and query activity. Safe to share between threads"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        """Start counting again"""
+        with self.lock:
+            self.checkouts = 0
+            self.checked_out = 0
+            self.max_checked_out = 0
+            self.connects = 0
+            self.waits = 0
+            self.wait_time = 0.0
+            self.max_wait = 0.0
+            self.requests = 0
+            self.queries = 0
+            self.max_queries = 0
+
+    def checkout(self):
+        """A connection was taken from the pool"""
+        with self.lock:
+            self.checkouts += 1
+            self.checked_out += 1
+            self.max_checked_out = max(self.max_checked_out, self.checked_out)
+
+    def checkin(self):
+        """A connection was returned to the pool"""
+        with self.lock:
+            self.checked_out = max(self.checked_out - 1, 0)
+
+    def connect(self):
+        """A new connection was opened"""
+        with self.lock:
+            self.connects += 1
+
+    def waited(self, seconds):
+        """Getting a connection from the pool took seconds"""
+        with self.lock:
+            self.waits += 1
+            self.wait_time += seconds
+            self.max_wait = max(self.max_wait, seconds)
+
+    def request_done(self, queries):
+        """A request that ran queries queries is done"""
+        with self.lock:
+            self.requests += 1
+            self.queries += queries
+            self.max_queries = max(self.max_queries, queries)
+
+    def report(self, pool=None):
+        """The counts so far, and the state of pool if given"""
+        with self.lock:
+            report = {
+                'connections': {
+                    'checkouts': self.checkouts,
+                    'checked_out': self.checked_out,
+                    'max_checked_out': self.max_checked_out,
+                    'opened': self.connects,
+                },
+                'wait': {
+                    'count': self.waits,
+                    'total': self.wait_time,
+                    'max': self.max_wait,
+                    'mean': self.wait_time / self.waits if self.waits else 0,
+                },
+                'requests': {
+                    'count': self.requests,
+                    'queries': self.queries,
+                    'max_queries': self.max_queries,
+                    'mean_queries': float(self.queries) / self.requests \
+                        if self.requests else 0,
+                },
+            }
+        if isinstance(pool, QueuePool):
+            report['pool'] = {
+                'size': pool.size(),
+                'checked_in': pool.checkedin(),
+                'checked_out': pool.checkedout(),
+                'overflow': pool.overflow(),
+                'timeout': pool.timeout(),
+            }
+        return report
+
+MONITOR = PoolMonitor()
+
+
+class MonitoredQueuePool(QueuePool):
+    """A QueuePool that records how long getting a connection takes"""
+
+    def connect(self):
+        start = time.time()
+        try:
+            return super(MonitoredQueuePool, self).connect()
+        finally:
+            MONITOR.waited(time.time() - start)
+
+# pylint: disable=unused-argument
+@event.listens_for(MonitoredQueuePool, 'checkout')
+def _checkout(dbapi_connection, connection_record, connection_proxy):
+    """Count checkouts"""
+    MONITOR.checkout()
+
+@event.listens_for(MonitoredQueuePool, 'checkin')
+def _checkin(dbapi_connection, connection_record):
+    """Count checkins"""
+    MONITOR.checkin()
+
+@event.listens_for(MonitoredQueuePool, 'connect')
+def _connect(dbapi_connection, connection_record):
+    """Count new connections"""
+    MONITOR.connect()
@@ -0,0 +1,198 @@
+"""
+Profiling the queries each endpoint runs
+
+Every statement run while handling a request is timed. For each endpoint the
+profiler keeps the number of requests, statements and the time spent in the
+db, along with the slowest statements seen.
+
+Statements slower than SLOW_QUERY_SECONDS, if it is set, are also logged as
+they happen.
+
+Query budgets cap the statements an endpoint may run, e.g. to catch a query
+per entry creeping in. They are set in app.config['QUERY_BUDGETS'] as a dict
+of endpoint to statements. An endpoint over budget is logged, and fails the
+request when testing. In tests a block of code can be held to a budget with
+PROFILER.budget.
+
+Each request's statement count is also passed to the pool monitor (see
+models.dao.pool_monitor), so statements are only counted in one place.
+"""
+from contextlib import contextmanager
+import heapq
+import os
+import threading
+import time
+
+from flask import request
+from sqlalchemy import event
+
+from models.dao.pool_monitor import MONITOR
+
+class QueryBudgetExceeded(AssertionError):
+    """More statements were run than the budget allows"""
+    pass
+
+class QueryProfiler(object):
+    """Statement counts and times by endpoint. Safe to share between threads"""
+
+    def __init__(self, slowest=5, slow_query_seconds=None):
+        self.slowest = slowest
+        self.slow_query_seconds = slow_query_seconds
+        self.lock = threading.Lock()
+        self.local = threading.local()
+        self.endpoints = {}
+
+    def reset(self):
+        """Forget everything recorded so far"""
+        with self.lock:
+            self.endpoints = {}
+
+    def _trackers(self):
+        """The requests and budgets currently counting in this thread"""
+        if not hasattr(self.local, 'trackers'):
+            self.local.trackers = []
+        return self.local.trackers
+
+    def executed(self, statement, seconds):
+        """A statement was run, taking seconds"""
+        if self.slow_query_seconds is not None \
+        and seconds >= self.slow_query_seconds:
+            print 'Slow query ({:.3f}s): {}'.format(seconds, statement)
+
+        for tracker in self._trackers():
+            tracker['statements'] += 1
+            tracker['time'] += seconds
+            if 'slowest' in tracker:
+                tracker['slowest'].append((seconds, statement))
+
+    def start_request(self):
+        """Start profiling a request in this thread"""
+        self.local.request = {'statements': 0, 'time': 0.0, 'slowest': []}
+        self._trackers().append(self.local.request)
+
+    def end_request(self, endpoint):
+        """
+        The request in this thread is done. Its profile is added to those for
+        the endpoint and returned.
+        """
+        profile = getattr(self.local, 'request', None)
+        if profile is None:
+            return None
+        self.local.request = None
+        self._trackers().remove(profile)
+
+        endpoint = endpoint or 'unknown'
+        with self.lock:
+            totals = self.endpoints.setdefault(endpoint, {
+                'requests': 0,
+                'statements': 0,
+                'max_statements': 0,
+                'time': 0.0,
+                'slowest': [],
+            })
+            totals['requests'] += 1
+            totals['statements'] += profile['statements']
+            totals['max_statements'] = max(totals['max_statements'],
+                                           profile['statements'])
+            totals['time'] += profile['time']
+            totals['slowest'] = heapq.nlargest(
+                self.slowest, totals['slowest'] + profile['slowest'])
+        return profile
+
+    def report(self):
+        """The profile of each endpoint"""
+        with self.lock:
+            return dict((endpoint, {
+                'requests': x['requests'],
+                'statements': x['statements'],
+                'mean_statements': float(x['statements']) / x['requests'],
+                'max_statements': x['max_statements'],
+                'time': x['time'],
+                'mean_time': x['time'] / x['requests'],
+                'slowest': [{'time': secs, 'statement': statement} \
+                    for secs, statement in x['slowest']],
+            }) for endpoint, x in self.endpoints.items())
+
+    @contextmanager
+    def counting(self):
+        """
+        Count the statements run by the block in this thread. Yields a dict
+        of the statements and time so far
+        """
+        tracker = {'statements': 0, 'time': 0.0}
+        self._trackers().append(tracker)
+        try:
+            yield tracker
+        finally:
+            self._trackers().remove(tracker)
+
+    @contextmanager
+    def budget(self, statements):
+        """
+        Raise QueryBudgetExceeded if the block runs more than statements
+        """
+        with self.counting() as tracker:
+            yield tracker
+        if tracker['statements'] > statements:
+            raise QueryBudgetExceeded(
+                '{} statements run. The budget is {}'.format(
+                    tracker['statements'], statements))
+
+def _slow_query_seconds():
+    """SLOW_QUERY_SECONDS from the environment"""
+    value = os.environ.get('SLOW_QUERY_SECONDS')
+    return float(value) if value else None
+
+PROFILER = QueryProfiler(slow_query_seconds=_slow_query_seconds())
+
+def profile_requests(app, database):
+    """Profile the statements run by each request to app"""
+    with app.app_context():
+        engine = database.get_engine(app)
+
+    # pylint: disable=unused-variable,unused-argument,too-many-arguments
+    @event.listens_for(engine, 'before_cursor_execute')
+    def before_execute(conn, cursor, statement, parameters, context,
+                       executemany):
+        """Start the clock"""
+        conn.info.setdefault('query_start', []).append(time.time())
+
+    @event.listens_for(engine, 'after_cursor_execute')
+    def after_execute(conn, cursor, statement, parameters, context,
+                      executemany):
+        """Stop the clock"""
+        PROFILER.executed(statement,
+                          time.time() - conn.info['query_start'].pop())
+
+    def finish_request():
+        """Stop profiling. Returns the profile, if it was still running"""
+        profile = PROFILER.end_request(request.endpoint)
+        if profile is not None:
+            MONITOR.request_done(profile['statements'])
+        return profile
+
+    @app.before_request
+    def start_request():
+        """Start profiling"""
+        PROFILER.start_request()
+
+    @app.after_request
+    def check_budget(response):
+        """Check the request kept to the budget for its endpoint"""
+        profile = finish_request()
+        budget = app.config.get('QUERY_BUDGETS', {}).get(request.endpoint)
+        if profile is None or budget is None \
+        or profile['statements'] <= budget:
+            return response
+
+        message = '{} ran {} statements. The budget is {}'.format(
+            request.endpoint, profile['statements'], budget)
+        if app.config.get('TESTING'):
+            raise QueryBudgetExceeded(message)
+        print message
+        return response
+
+    @app.teardown_request
+    def end_request(exc):
+        """Requests that failed haven't been recorded yet"""
+        finish_request()
@@ -0,0 +1,53 @@
+"""
+ORM module for the running totals of an entry's scores in a category
+"""
+# pylint: disable=invalid-name
+
+from sqlalchemy.dialects.postgresql import ARRAY
+
+from models.dao.db_connection import db
+from models.dao.score import ScoreCategory
+from models.dao.tournament_entry import TournamentEntry
+
+class Standing(db.Model):
+    """
+    The sum of an entry's scores in a category, and the sum of the max scores
+    they could have got. Kept up to date as scores are written.
+
+    The scores themselves are kept too, with their ids, in the order they
+    were entered, so that they can be shown without reading the scores.
+    """
+
+    __tablename__ = 'standing'
+    entry_id = db.Column(db.Integer,
+                         db.ForeignKey(TournamentEntry.id, ondelete='CASCADE'),
+                         primary_key=True)
+    score_category_id = db.Column(db.Integer,
+                                  db.ForeignKey(ScoreCategory.id,
+                                                ondelete='CASCADE'),
+                                  primary_key=True)
+    total = db.Column(db.Integer, nullable=False, default=0)
+    max_total = db.Column(db.Integer, nullable=False, default=0)
+    score_ids = db.Column(ARRAY(db.Integer), nullable=False,
+                          server_default='{}')
+    score_values = db.Column(ARRAY(db.Integer), nullable=False,
+                             server_default='{}')
+
+    score_category = db.relationship(ScoreCategory)
+
+    # pylint: disable=too-many-arguments
+    def __init__(self, entry_id, score_category_id, total=0, max_total=0,
+                 score_ids=None, score_values=None):
+        self.entry_id = entry_id
+        self.score_category_id = score_category_id
+        self.total = total
+        self.max_total = max_total
+        self.score_ids = score_ids or []
+        self.score_values = score_values or []
+
+    def __repr__(self):
+        return '<Standing ({}, {}, {}, {})>'.format(
+            self.entry_id,
+            self.score_category_id,
+            self.total,
+            self.max_total)
@@ -22,6 +22,10 @@ class Tournament(db.Model):
         db.ForeignKey(Account.username),
         nullable=False)
     in_progress = db.Column(db.Boolean, nullable=False, default=False)
+    # Changes whenever the configuration does. See models.tournament_config
+    config_version = db.Column(db.BigInteger,
+                               db.Sequence('tournament_config_version_seq'),
+                               nullable=False)
 
     protected_object = db.relationship(ProtectedObject)
     creator = db.relationship(Account)
@@ -22,19 +22,28 @@ class TournamentGame(db.Model):
     protected_object_id = db.Column(db.Integer,
                                     db.ForeignKey(ProtectedObject.id))
     score_entered = db.Column(db.Boolean)
+    # The number of per-game scores entered. Kept by Score.write
+    scores_entered = db.Column(db.Integer, nullable=False, default=0)
 
     protected_object = db.relationship(ProtectedObject)
     tournament_round = db.relationship(TournamentRound, \
         backref=db.backref('games', lazy='dynamic'))
 
-    def __init__(self, round_id, table_num):
+    def __init__(self, round_id, table_num, protected_object=None):
+        """
+        A ProtectedObject is created for the game unless one (already flushed)
+        is passed in.
+        """
         self.tournament_round_id = round_id
         self.table_num = table_num
-        self.protected_object = ProtectedObject()
-        db.session.add(self.protected_object)
-        db.session.flush()
-        self.protected_object_id = self.protected_object.id
+        if protected_object is None:
+            protected_object = ProtectedObject()
+            db.session.add(protected_object)
+            db.session.flush()
+        self.protected_object = protected_object
+        self.protected_object_id = protected_object.id
         self.score_entered = False
+        self.scores_entered = 0
 
     def __repr__(self):
         return '<TournamentGame {}, {}, {}>'.format(
@@ -0,0 +1,273 @@
+"""
+Draws made away from the web workers
+
+Matching entries (SwissChess) and allocating tables (ProtestAvoidanceStrategy)
+are both O(n3) and, for a large field, tie up the thread serving the request
+for a long time. Large draws are instead sent to a small pool of worker
+processes. Each draw has a deadline. If it passes the worker is killed,
+cancelling the draw, and a greedy draw is made in the request instead.
+
+Environment:
+    - DRAW_WORKERS - the number of worker processes, 0 to make every draw in
+    the request. Defaults to 2
+    - DRAW_DEADLINE - seconds a draw may take, including waiting for a free
+    worker. Defaults to 10
+    - DRAW_POOL_MIN_ENTRIES - draws with fewer entries than this are quick
+    enough to make in the request. Defaults to 32
+
+Workers are only started when first needed and are kept for later draws.
+They never touch the db.
+"""
+
+import multiprocessing
+import os
+import signal
+import threading
+import time
+
+from models.matching_strategy import RoundRobin, SwissChess
+from models.table_strategy import ProtestAvoidanceStrategy, Table
+
+class DrawTimeout(Exception):
+    """For when a draw cannot be made in a worker before its deadline"""
+    pass
+
+# pylint: disable=too-few-public-methods
+class _Entry(object):
+    """The parts of an entry a draw needs, with its index in the draw"""
+
+    def __init__(self, index, entry):
+        self.index = index
+        self.id = entry.id                      # pylint: disable=invalid-name
+        self.player_id = entry.player_id
+        self.game_history = entry.game_history
+
+
+class DrawJob(object):
+    """
+    A draw reduced to plain values, so that it can be sent to a worker:
+        - entries - an _Entry for each entry
+        - variation - of the ProtestAvoidanceStrategy
+        - round_num - for a RoundRobin draw, otherwise None
+        - scores, history and step_budget - the points of each entry, the
+        OpponentHistory and the step budget for a SwissChess draw, otherwise
+        None
+    """
+
+    def __init__(self, matching_strategy, table_strategy, entries):
+        self.entries = [_Entry(i, x) for i, x in enumerate(entries)]
+        self.variation = table_strategy.variation
+        if isinstance(matching_strategy, SwissChess):
+            self.round_num = None
+            self.scores = [matching_strategy.rank_func(x) for x in entries]
+            self.history = matching_strategy.history
+            self.step_budget = matching_strategy.step_budget
+        else:
+            self.round_num = matching_strategy.round_to_draw
+            self.scores = None
+            self.history = None
+            self.step_budget = None
+
+    @staticmethod
+    def can_run(matching_strategy, table_strategy):
+        """Whether a draw with these strategies can be made by a DrawJob"""
+        if type(table_strategy) is not ProtestAvoidanceStrategy:
+            return False
+        if type(matching_strategy) is RoundRobin:
+            return True
+        history = getattr(matching_strategy, 'history', None)
+        return type(matching_strategy) is SwissChess \
+            and history is not None \
+            and matching_strategy.re_match == history.re_match
+
+    def run(self):
+        """
+        Make the draw. Returns a dict of:
+            - tables - a list of (table number, entrants) with each entrant
+            an index into entries, or 'BYE'
+            - report - the SwissChess report, or None
+        """
+        if self.round_num is None:
+            scores = self.scores
+            match = SwissChess(rank=lambda x: scores[x.index],
+                               history=self.history,
+                               step_budget=self.step_budget)
+        else:
+            match = RoundRobin().set_round(self.round_num)
+
+        draw = ProtestAvoidanceStrategy(self.variation).determine_tables(
+            match.match(self.entries))
+        return {
+            'tables': [(t.table_number, [x if isinstance(x, str) else x.index \
+                                         for x in t.entrants]) \
+                       for t in draw],
+            'report': getattr(match, 'report', None),
+        }
+
+    @staticmethod
+    def tables(result, entries):
+        """The list of Table for the result of run"""
+        return [Table(num, [x if isinstance(x, str) else entries[x] \
+                            for x in entrants]) \
+                for num, entrants in result['tables']]
+
+
+def _serve(conn, parent_conn, parent_pid):
+    """Run jobs from conn until the pool, or the process it is in, goes"""
+    parent_conn.close()
+    # Don't run the web worker's handlers. The pool kills with SIGKILL anyway
+    for sig in (signal.SIGTERM, signal.SIGINT, signal.SIGQUIT, signal.SIGHUP,
+                signal.SIGUSR1, signal.SIGUSR2):
+        signal.signal(sig, signal.SIG_DFL)
+
+    while os.getppid() == parent_pid:
+        if not conn.poll(1):
+            continue
+        try:
+            job = conn.recv()
+        except EOFError:
+            return
+        try:
+            result = ('done', job.run())
+        except Exception as err:        # pylint: disable=broad-except
+            result = ('error', err)
+        conn.send(result)
+
+
+class _Worker(object):
+    """A worker process and the pipe to it"""
+
+    def __init__(self):
+        self.conn, child_conn = multiprocessing.Pipe()
+        self.process = multiprocessing.Process(
+            target=_serve, args=(child_conn, self.conn, os.getpid()))
+        self.process.daemon = True
+        self.process.start()
+        child_conn.close()
+
+    def run(self, job, timeout):
+        """
+        Run job, returning ('done', result) or ('error', exception). Raises
+        DrawTimeout if it takes longer than timeout seconds or the worker
+        dies.
+        """
+        try:
+            self.conn.send(job)
+            if not self.conn.poll(max(timeout, 0)):
+                raise DrawTimeout('The draw took too long')
+            return self.conn.recv()
+        except (EOFError, IOError, OSError) as err:
+            raise DrawTimeout('The draw worker failed: {}'.format(err))
+
+    def kill(self):
+        """Stop the worker, whatever it is doing"""
+        try:
+            os.kill(self.process.pid, signal.SIGKILL)
+        except OSError:
+            pass
+        self.process.join()
+        self.conn.close()
+
+
+class DrawPool(object):
+    """
+    Worker processes to make draws in. At most size draws are made at once.
+    The rest wait for a worker, which counts towards their deadline.
+    """
+
+    def __init__(self, size=2, deadline=10, min_entries=32):
+        self.size = size
+        self.deadline = deadline
+        self.min_entries = min_entries
+        self.idle = []
+        self.busy = 0
+        self.cond = threading.Condition()
+        self.pid = os.getpid()
+
+    def make_draw(self, matching_strategy, table_strategy, entries):
+        """
+        The draw for entries, a list of Table. If the draw misses its deadline
+        a greedy draw is made instead (see greedy_match and greedy_tables).
+        """
+        if self.size < 1 or len(entries) < self.min_entries \
+        or not DrawJob.can_run(matching_strategy, table_strategy):
+            return table_strategy.determine_tables(
+                matching_strategy.match(entries))
+
+        job = DrawJob(matching_strategy, table_strategy, entries)
+        try:
+            result = self.run(job)
+            if result['report'] is not None:
+                matching_strategy.report = result['report']
+            return job.tables(result, entries)
+        except DrawTimeout as err:
+            print 'DrawTimeout: {}. Making a greedy draw'.format(err)
+            return table_strategy.greedy_tables(
+                matching_strategy.greedy_match(entries))
+
+    def run(self, job, deadline=None):
+        """
+        Run job in a worker and return the result. Exceptions raised by the
+        job are raised here. Raises DrawTimeout, having killed the worker, if
+        the job isn't done within deadline seconds (the pool's deadline by
+        default).
+        """
+        deadline_at = time.time() + \
+            (self.deadline if deadline is None else deadline)
+        worker = self._take(deadline_at)
+
+        healthy = False
+        try:
+            status, result = worker.run(job, deadline_at - time.time())
+            healthy = True
+        finally:
+            self._give_back(worker, healthy)
+
+        if status == 'error':
+            raise result
+        return result
+
+    def close(self):
+        """Stop the idle workers"""
+        with self.cond:
+            workers, self.idle = self.idle, []
+        for worker in workers:
+            worker.kill()
+
+    def _take(self, deadline_at):
+        """A worker to use, once fewer than size are busy"""
+        with self.cond:
+            if self.pid != os.getpid():
+                # The workers belong to the process this was forked from
+                self.idle, self.busy, self.pid = [], 0, os.getpid()
+            while self.busy >= self.size:
+                remaining = deadline_at - time.time()
+                if remaining <= 0:
+                    raise DrawTimeout('No draw worker was free')
+                self.cond.wait(remaining)
+            self.busy += 1
+            worker = self.idle.pop() if self.idle else None
+
+        if worker is not None and worker.process.is_alive():
+            return worker
+        try:
+            if worker is not None:
+                worker.kill()
+            return _Worker()
+        except Exception:
+            self._give_back(None, False)
+            raise
+
+    def _give_back(self, worker, healthy):
+        """Finish with a worker. Unhealthy workers are killed"""
+        if worker is not None and not healthy:
+            worker.kill()
+        with self.cond:
+            self.busy -= 1
+            if worker is not None and healthy:
+                self.idle.append(worker)
+            self.cond.notify()
+
+DRAW_POOL = DrawPool(int(os.environ.get('DRAW_WORKERS', 2)),
+                     float(os.environ.get('DRAW_DEADLINE', 10)),
+                     int(os.environ.get('DRAW_POOL_MIN_ENTRIES', 32)))
@@ -0,0 +1,199 @@
+"""
+Background jobs
+
+Some tournament operations take too long to do in a request, e.g. changing
+the rounds (which redraws every round) or deleting a tournament. Instead they
+can be queued in the job table, run by a job worker (job_worker.py) and the
+job's status polled by the client.
+
+    - enqueue adds a job. Permissions are checked before this, in the request
+    - A JobRunner claims the oldest queued job whose tournament has no job
+    running, so a tournament's jobs run one at a time, in order
+    - Progress, where the operation reports it (see
+    models.dao.job.report_progress), is written as it happens on its own
+    connection, so it can be seen before the job is done
+    - A running job's heartbeat is updated regularly. A job whose heartbeat
+    stops, as its worker died, is marked failed rather than run again as a
+    part done operation may not be safe to repeat
+
+Environment:
+    - JOB_POLL_INTERVAL - seconds between checks for queued jobs. Defaults
+    to 1
+    - JOB_STALE_AFTER - seconds without a heartbeat before a running job is
+    failed. Defaults to 300
+"""
+
+from datetime import timedelta
+import os
+import socket
+import threading
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import aliased
+from sqlalchemy.sql.expression import and_, exists
+
+from models.dao.db_connection import db
+from models.dao.job import Job, PROGRESS
+from models.tournament import Tournament
+
+# Taken while claiming a job, so that two workers can't both find a
+# tournament has nothing running and start jobs for it
+CLAIM_LOCK = 7468002
+
+# The functions for each kind of job. Each takes the tournament name and the
+# job's args and returns a message for the result
+JOBS = {}
+
+def job_kind(kind):
+    """A decorator adding a function to JOBS"""
+    def decorator(func):                # pylint: disable=missing-docstring
+        JOBS[kind] = func
+        return func
+    return decorator
+
+@job_kind('update_tournament')
+def update_tournament(tournament_name, details):
+    """Tournament.update"""
+    Tournament(tournament_name).update(details)
+    return 'Tournament {} updated'.format(tournament_name)
+
+@job_kind('delete_tournament')
+def delete_tournament(tournament_name):
+    """Tournament.delete. There is no endpoint for this; it is only queued"""
+    Tournament(tournament_name).check_exists().delete()
+    return 'Tournament {} deleted'.format(tournament_name)
+
+def enqueue(kind, username, tournament_name=None, **args):
+    """Queue a job. args must be JSON serializable. Returns the Job"""
+    if kind not in JOBS:
+        raise ValueError('Unknown job: {}'.format(kind))
+    job = Job(kind, username, tournament_name, args)
+    db.session.add(job)
+    db.session.commit()
+    return job
+
+def get_job(job_id):
+    """The Job with job_id"""
+    job = Job.query.get(job_id)
+    if job is None:
+        raise ValueError('Job {} not found'.format(job_id))
+    return job
+
+def tournament_jobs(tournament_name, limit=20):
+    """The most recent jobs for a tournament, newest first"""
+    return Job.query.filter_by(tournament_name=tournament_name).\
+        order_by(Job.id.desc()).limit(limit).all()
+
+
+# pylint: disable=no-member
+class JobRunner(object):
+    """Claims queued jobs and runs them, one at a time"""
+
+    def __init__(self, name=None, poll_interval=None, stale_after=None,
+                 heartbeat_interval=10):
+        self.name = name or '{}:{}'.format(socket.gethostname(), os.getpid())
+        self.poll_interval = poll_interval if poll_interval is not None \
+            else float(os.environ.get('JOB_POLL_INTERVAL', 1))
+        self.stale_after = stale_after if stale_after is not None \
+            else int(os.environ.get('JOB_STALE_AFTER', 300))
+        self.heartbeat_interval = heartbeat_interval
+
+    def claim(self):
+        """Claim the next job to run. Returns the Job or None"""
+        db.session.execute(select([func.pg_advisory_xact_lock(CLAIM_LOCK)]))
+        self.fail_stale()
+
+        running = aliased(Job)
+        job = Job.query.filter(Job.status == Job.QUEUED).\
+            filter(~exists().where(and_(
+                running.tournament_name == Job.tournament_name,
+                running.status == Job.RUNNING))).\
+            order_by(Job.id).first()
+        if job is not None:
+            job.status = Job.RUNNING
+            job.worker = self.name
+            job.started = func.now()
+            job.heartbeat = func.now()
+        db.session.commit()
+        return job
+
+    def fail_stale(self):
+        """Fail running jobs whose heartbeat has stopped"""
+        Job.query.filter(
+            Job.status == Job.RUNNING,
+            Job.heartbeat < func.now() - timedelta(seconds=self.stale_after)).\
+            update({
+                Job.status: Job.FAILED,
+                Job.error: 'The job stopped unexpectedly',
+                Job.finished: func.now()}, synchronize_session=False)
+
+    def run(self, job):
+        """Run a claimed job, recording the outcome"""
+        engine = db.engine
+        stop = threading.Event()
+        heartbeat = threading.Thread(target=self._beat,
+                                     args=(engine, job.id, stop))
+        heartbeat.daemon = True
+        heartbeat.start()
+
+        def progress(done, total):      # pylint: disable=missing-docstring
+            self._update(engine, job.id, done=done, total=total)
+        db.session.info[PROGRESS] = progress
+
+        outcome = {'status': Job.DONE}
+        try:
+            if job.kind not in JOBS:
+                raise ValueError('Unknown job: {}'.format(job.kind))
+            outcome['result'] = JOBS[job.kind](job.tournament_name,
+                                               **job.get_args())
+        except Exception as err:        # pylint: disable=broad-except
+            db.session.rollback()
+            print 'Job {} failed. {}: {}'.format(job.id, type(err).__name__,
+                                                 err)
+            outcome = {'status': Job.FAILED,
+                       'error': '{}: {}'.format(type(err).__name__, err)}
+        finally:
+            db.session.info.pop(PROGRESS, None)
+            stop.set()
+            heartbeat.join()
+
+        self._update(engine, job.id, finished=func.now(), **outcome)
+        db.session.expire_all()
+
+    def run_next(self):
+        """Run the next job, if there is one. Returns whether there was"""
+        job = self.claim()
+        if job is None:
+            return False
+        self.run(job)
+        return True
+
+    def run_forever(self, stop=None):
+        """
+        Run jobs as they are queued until stop, a threading.Event, is set.
+        The job being run when it is set is finished first
+        """
+        stop = stop or threading.Event()
+        while not stop.is_set():
+            try:
+                ran = self.run_next()
+            except Exception as err:    # pylint: disable=broad-except
+                # e.g. the db is down. Try again after a while
+                print 'Job worker {}: {}'.format(type(err).__name__, err)
+                ran = False
+            finally:
+                db.session.remove()
+            if not ran:
+                stop.wait(self.poll_interval)
+
+    def _beat(self, engine, job_id, stop):
+        """Update the heartbeat of job_id until stop is set"""
+        while not stop.wait(self.heartbeat_interval):
+            self._update(engine, job_id, heartbeat=func.now())
+
+    @staticmethod
+    def _update(engine, job_id, **values):
+        """Update the job, committing straight away on its own connection"""
+        with engine.begin() as conn:
+            conn.execute(Job.__table__.update().\
+                where(Job.__table__.c.id == job_id).values(**values))
@@ -0,0 +1,74 @@
+"""
+Minimum cost assignment
+
+The Hungarian method in its shortest augmenting path form (as used by
+Jonker and Volgenant). Each row is added in turn and assigned along the
+cheapest alternating path, keeping a feasible dual for every row and column.
+It runs in O(n3) time for an n by n cost matrix and is used to allocate games
+to tables without trying every possible layout.
+"""
+
+def minimum_cost_assignment(costs):
+    """
+    Assign every row of a square cost matrix to a distinct column such that
+    the total cost is the minimum possible.
+
+    Expects:
+        A list of n lists, each of n numbers. costs[i][j] is the cost of
+        assigning row i to column j.
+    Returns:
+        A list of n column indices. The value at i is the column for row i.
+    """
+    num = len(costs)
+    if any(len(row) != num for row in costs):
+        raise ValueError('The cost matrix must be square')
+
+    infinity = float('inf')
+    # Index 0 is a sentinel column (and row) so the real ones are 1..n
+    row_dual = (num + 1) * [0]
+    col_dual = (num + 1) * [0]
+    col_owner = (num + 1) * [0]
+    previous = (num + 1) * [0]
+
+    for row in range(1, num + 1):
+        col_owner[0] = row
+        current = 0
+        min_slack = (num + 1) * [infinity]
+        used = (num + 1) * [False]
+
+        while col_owner[current] != 0:
+            used[current] = True
+            owner = col_owner[current]
+            owner_costs = costs[owner - 1]
+            owner_dual = row_dual[owner]
+            delta = infinity
+            nearest = 0
+            for col in range(1, num + 1):
+                if used[col]:
+                    continue
+                slack = owner_costs[col - 1] - owner_dual - col_dual[col]
+                if slack < min_slack[col]:
+                    min_slack[col] = slack
+                    previous[col] = current
+                if min_slack[col] < delta:
+                    delta = min_slack[col]
+                    nearest = col
+
+            for col in range(num + 1):
+                if used[col]:
+                    row_dual[col_owner[col]] += delta
+                    col_dual[col] -= delta
+                else:
+                    min_slack[col] -= delta
+            current = nearest
+
+        # Flip the alternating path back to the sentinel
+        while current != 0:
+            before = previous[current]
+            col_owner[current] = col_owner[before]
+            current = before
+
+    assignment = num * [-1]
+    for col in range(1, num + 1):
+        assignment[col_owner[col] - 1] = col - 1
+    return assignment
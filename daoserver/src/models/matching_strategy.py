@@ -2,8 +2,16 @@
 Module to make draws for tournaments
 """
 
-from collections import deque
-import itertools
+import os
+import random
+
+from models.weighted_matching import WeightedMatching
+
+# The steps SwissChess may spend on a draw, in anytime mode, unless told
+# otherwise (see _SwissDraw.improve). None (SWISS_STEP_BUDGET unset) for the
+# cheapest draw however long it takes
+STEP_BUDGET = int(os.environ['SWISS_STEP_BUDGET']) \
+    if os.environ.get('SWISS_STEP_BUDGET') else None
 
 class MatchingStrategy(object):
     """
@@ -16,13 +24,108 @@ class MatchingStrategy(object):
         """Do the draw"""
         raise NotImplementedError()
 
+    def greedy_match(self, entry_list):
+        """
+        A quick, if not as good, draw for when match takes too long. By
+        default this is just match
+        """
+        return self.match(entry_list)
+
+    def draw_inputs(self, entry_list):            # pylint: disable=W0613
+        """
+        Everything besides the entries themselves that match depends on, as
+        a value whose repr changes whenever the draw might. None if this
+        isn't known, in which case the draw is always made again
+        """
+        return None
+
+class RoundRobinSchedule(object):
+    """
+    The circle method schedule for num_entries entries, by index.
+
+    With an odd number of entries, one entry sits at the centre of the circle
+    each round and has the bye. The others play the entry opposite them,
+    i.e. the same distance the other side of the centre. The centre moves back
+    one place each round: entry 2 of 5 in round 1, entry 1 in round 2, etc.
+    The games are ordered from the outside in, so round 1 of 5 entries is
+    (0, 4), (1, 3), (2, BYE).
+
+    With an even number of entries, the last entry sits out of the circle and
+    plays whoever is at the centre. The centre starts at entry 0, and the
+    games are ordered from the centre out, so round 1 of 6 entries is
+    (0, 5), (1, 4), (2, 3).
+
+    Every entry plays every other entry once in rounds_in_cycle rounds, after
+    which the schedule repeats. Any one entry's game is worked out in
+    constant time, without the rest of the round.
+    """
+
+    def __init__(self, num_entries):
+        self.num_entries = num_entries
+        self.even = num_entries % 2 == 0
+        # The number of entries in the circle, and how far from the centre
+        # the furthest are
+        self.circle = num_entries - 1 if self.even else num_entries
+        self.reach = (self.circle - 1) / 2
+
+    @property
+    def rounds_in_cycle(self):
+        """The number of rounds before the schedule repeats"""
+        return max(self.circle, 1)
+
+    def centre(self, round_num):
+        """The entry at the centre of the circle in round_num"""
+        first = 0 if self.even else self.reach
+        return (first - round_num + 1) % self.circle
+
+    def opponent(self, index, round_num):
+        """The index of the entry that index plays in round_num or None for a
+        bye"""
+        centre = self.centre(round_num)
+        if self.even and index == self.circle:
+            return centre
+        if index == centre:
+            return self.circle if self.even else None
+        return (2 * centre - index) % self.circle
+
+    def game(self, index, round_num):
+        """The number, from 0, of the game index plays in round_num"""
+        if self.even and index == self.circle:
+            return 0
+        distance = (index - self.centre(round_num)) % self.circle
+        distance = min(distance, self.circle - distance)
+        return distance if self.even else self.reach - distance
+
+    def round(self, round_num):
+        """
+        The games for round_num, in order. A list of (index, index) with
+        None for a bye
+        """
+        if self.num_entries == 0:
+            return []
+        centre = self.centre(round_num)
+        if self.even:
+            return [(centre, self.circle)] + \
+                [((centre + x) % self.circle, (centre - x) % self.circle) \
+                 for x in range(1, self.reach + 1)]
+        return [((centre - x) % self.circle, (centre + x) % self.circle) \
+                for x in range(self.reach, 0, -1)] + [(centre, None)]
+
+    def rounds(self, num_rounds):
+        """The games for rounds 1 to num_rounds"""
+        return [self.round(x) for x in range(1, num_rounds + 1)]
+
+
 class RoundRobin(MatchingStrategy):
     """
     Each entry plays each other entry.
 
-    Assuming a list of entries, ordered by id, each entry will play the next
-    entry in the list for the forst round. Each round the entry will play the
-    following entry, etc.
+    Assuming a list of entries, ordered by id, the rounds are drawn with the
+    circle method. With an odd number of entries the entries are placed
+    around a circle and play the entry opposite them, with the entry at the
+    centre having the bye. With an even number the last entry stays out of
+    the circle and plays the entry at the centre. The circle turns one place
+    each round. See RoundRobinSchedule.
     """
 
     draw_for_all_rounds = True
@@ -33,74 +136,171 @@ class RoundRobin(MatchingStrategy):
         self.round_to_draw = int(round_num)
         return self
 
+    def draw_inputs(self, entry_list):            # pylint: disable=W0613
+        """The draw depends only on the entries and the round"""
+        return self.round_to_draw
+
     def match(self, entry_list):
         """
         Match the entrants into pairs.
 
         Returns: A list of Tuples - each is a pair of entrants.
         """
-        entry_list = deque(entry_list)
-        entry_list.rotate(self.round_to_draw - 1)
-        return self._determine_matchup(list(entry_list), [])
-
-    def _determine_matchup(self, singles, pairs):
-        """
-        Determine match ups for a round robin tournie
-        Algorithm:
-            - The first and last in the list play each other.
-            - The person in the middle is the bye, if they exist
-            - The list should be rotated in subsequent rounds.
-        Expects:
-            - singles is a list of all singles yet to be pairs
-            - pairs is a list of pairings:
-                ({entry from singles} or 'BYE', {entry from singles} or 'BYE')
-        Returns:
-            - A list of Tuples of entry_db.Entry from singles
-        """
-        if len(singles) == 0:
-            return pairs
-        elif len(singles) == 1:
-            pairs.append((singles[0], 'BYE'))
-            return pairs
-        else:
-            pairs.append((singles[0], singles[-1]))
-            return self._determine_matchup(singles[1:-1], pairs)
+        entry_list = list(entry_list)
+        games = RoundRobinSchedule(len(entry_list)).round(self.round_to_draw)
+        return [(entry_list[x], entry_list[y] if y is not None else 'BYE') \
+            for x, y in games]
 
 
 class SwissChess(MatchingStrategy):
     """
     Entries are ranked and paired off.
 
-    Each potential draw is checked for the difference in points. The
-    permutation with the lowest difference is used.
+    The draw with the lowest total squared difference in points is used. This
+    is a minimum-weight perfect matching so it is found with the blossom
+    algorithm rather than by checking every possible draw. On the benchmark
+    fields (see benchmarks.run) this was measured at 0.7s to 1.3s for 512
+    entries and 3.5s to 5.7s for 1000, depending on the machine. That is
+    inside the 10s DRAW_DEADLINE of models.draw_pool but not quick. Time
+    grows faster than the field, so much larger fields need a step_budget.
+
+    With a step_budget the draw is found in anytime mode instead. This
+    starts from a greedy draw and improves it a few games at a time until
+    the steps are used up (see _SwissDraw.improve). The draw may not be the
+    cheapest, but a good one is ready quickly for large fields. The budget
+    is counted in steps rather than seconds so that the same field always
+    gets the same draw, however busy the machine.
+
+    After each match, report has:
+        - objective - the total squared difference in points of the draw
+        - lower_bound - the objective of pairing entries in order of points,
+        ignoring re-matches. No draw can do better
+        - gap - objective - lower_bound
+        - re_matches - games in the draw that are re-matches. Only anytime
+        mode resorts to these, when it finds no better draw in time
+        - optimal - whether the draw is known to be the cheapest
+        - improvements and steps - spent improving the draw
+    greedy_match reports the same way.
+
+    The two modes differ when re-matches can't all be avoided. Exact mode
+    returns no draw ([]) when no draw is free of re-matches, but anytime
+    mode always returns a draw and leaves the re-matches it couldn't remove
+    in it. Check re_matches in the report before using an anytime draw.
 
     Players cannot play each other more than once
-    No BYEs are allowed currently
+    With an odd number of entries the BYE is paired like an entry on 0 points
     """
 
+    # How many neighbours (by score) each entry is initially considered
+    # against. The window grows if no legal draw can be found within it.
+    candidate_window = 16
+
     def __init__(self, **args):
         super(SwissChess, self)
         self.rank_func = args.get('rank')
+        # An OpponentHistory, which can stand in for re_match. Unlike
+        # re_match it can be sent to another process (see models.draw_pool)
+        self.history = args.get('history')
         self.re_match = args.get('re_match')
+        # The history of the whole tournament, when history is used, from
+        # which set_round takes the history before the round
+        self.tournament_history = None
+        if self.re_match is None and self.history is not None:
+            self.tournament_history = self.history
+            self.re_match = self.history.re_match
+        self.step_budget = args.get('step_budget', STEP_BUDGET)
+        self.report = None
 
-    # pylint: disable=unused-argument
     def set_round(self, round_num):
-        """We don't care what the round is"""
+        """
+        Only games before round_num are re-matches, so a round that is
+        redrawn isn't kept from its own games. Returns self
+        """
+        if self.tournament_history is not None:
+            self.history = self.tournament_history.before(int(round_num))
+            self.re_match = self.history.re_match
         return self
 
+    def draw_inputs(self, entry_list):
+        """
+        The rank of each entry, the games played and the step budget. Only
+        known when the re-matches come from an OpponentHistory
+        """
+        if self.tournament_history is None:
+            return None
+        return ([self.rank_func(x) for x in entry_list], self.history.games,
+                self.step_budget)
+
     def match(self, entry_list):
         """
         Match the entrants into pairs.
 
         Algorithm:
-            - All permutations of the player base are made
-            - All pairs are checked for repeat matchups
-                - a repeat discards the entire draw
-            - The difference in points is calculated for each pair
-            - The permutation with the lowest total difference is chosen
+            - Each pair costs the square of the difference in points. Ties
+              are broken in favour of entries adjacent in entry_list.
+            - Only pairs close in the rankings are considered at first. Pairs
+              that are re-matches are excluded.
+            - The cheapest perfect matching of those pairs is found.
+            - The duals of that matching are checked against all the other
+              pairs. Any pair that could improve the draw is added to the
+              matching, which carries on from where it finished. Otherwise
+              the draw is optimal.
+            - If there is no perfect matching the window of candidate pairs
+              is widened.
+
+        In anytime mode see _SwissDraw.improve instead.
+
+        Returns: A list of Tuples - each is a pair of entrants.
+        """
+        entry_list = self._entry_dicts(entry_list)
+        self.report = None
+        if len(entry_list) == 0:
+            return []
+
+        draw = _SwissDraw(entry_list, self.re_match)
+        if self.step_budget is not None:
+            pairs, improvements, optimal = draw.improve(draw.greedy(),
+                                                        self.step_budget)
+            pairs = sorted(tuple(sorted(x)) for x in pairs)
+            self.report = draw.report(pairs, optimal, improvements)
+            return self._games(entry_list, pairs)
+
+        window = self.candidate_window
+        while True:
+            mate = draw.solve(window)
+            if mate is not None:
+                break
+            if window >= len(entry_list):
+                return []
+            window *= 2
+
+        pairs = [(i, j) for i, j in enumerate(mate) if i < j]
+        self.report = draw.report(pairs, True, 0)
+        return self._games(entry_list, pairs)
+
+    def greedy_match(self, entry_list):
+        """
+        Match the entrants into pairs quickly, for when match takes too long.
+
+        Entries are taken from the most points down. Each is paired with the
+        next entry down that it hasn't played, or failing that the next entry
+        down. The draw isn't the cheapest and may contain a re-match but it
+        takes O(n2) time at worst.
 
         Returns: A list of Tuples - each is a pair of entrants.
         """
+        entry_list = self._entry_dicts(entry_list)
+        self.report = None
+        if len(entry_list) == 0:
+            return []
+
+        draw = _SwissDraw(entry_list, self.re_match)
+        pairs = draw.greedy()
+        self.report = draw.report(pairs, False, 0)
+        return self._games(entry_list, pairs)
+
+    def _entry_dicts(self, entry_list):
+        """The entries as dicts for _SwissDraw, with a BYE if needed"""
         entry_list = [{
             'match_score': self.rank_func(x),
             'name': x.player_id,
@@ -108,41 +308,303 @@ class SwissChess(MatchingStrategy):
             } for x in entry_list]
         if len(entry_list) % 2 == 1:
             entry_list.append({'match_score': 0, 'name': 'BYE', 'entry': 'BYE'})
+        return entry_list
 
-        possible_games = itertools.combinations(entry_list, 2)
+    @staticmethod
+    def _games(entry_list, pairs):
+        """The games for pairs of indices into entry_list. BYEs go second"""
+        games = []
+        for i, j in pairs:
+            if entry_list[i]['name'] == 'BYE':
+                i, j = j, i
+            games.append((entry_list[i]['entry'], entry_list[j]['entry']))
+        return games
 
-        possible_games = [x for x in possible_games if not self.re_match(x)]
-        if len(possible_games) == 0:
-            return []
 
-        possible_games = [x + \
-            (abs(int(x[0]['match_score']) - int(x[1]['match_score']))**2,) \
-            for x in possible_games]
-        possible_draws = itertools.combinations(possible_games,
-                                                len(entry_list) / 2)
+class _SwissDraw(object):
+    """
+    The matching problem for a single SwissChess draw.
+
+    Costs are integers: the squared points difference is scaled so that it
+    always outweighs the tie-break on position in the entry list.
+    """
+
+    def __init__(self, entry_list, re_match):
+        self.entry_list = entry_list
+        self.re_match = re_match
+        self.scores = [int(x['match_score']) for x in entry_list]
+        self.order = sorted(range(len(entry_list)),
+                            key=lambda i: self.scores[i])
+        self.scale = len(entry_list) ** 3 + 1
+        self.max_cost = self.cost(self.order[0], self.order[-1]) + \
+            (len(entry_list) - 1) ** 2
+        self.legal = {}
+        self.extra_pairs = set()
+        # Added to the cost of a re-match. More than any draw without one
+        self.penalty = self.max_cost * len(entry_list) + 1
+        # The steps improve has left, and has spent
+        self.steps_left = 0
+        self.steps = 0
 
-        legal_draws = [x for x in possible_draws if self._check_legal_draw(x)]
-        best_draw = sorted(legal_draws, cmp=lambda x, y: \
-            cmp(sum([i[2] for i in x]), sum([i[2] for i in y])))[0]
+    def cost(self, i, j):
+        """The cost of entry i playing entry j"""
+        return (self.scores[i] - self.scores[j]) ** 2 * self.scale + \
+            (i - j) ** 2
 
-        return [(game[0]['entry'], game[1]['entry']) for game in best_draw]
+    def is_legal(self, i, j):
+        """Pair (i, j) is not a re-match. Each pair is only checked once"""
+        pair = (i, j) if i < j else (j, i)
+        if pair not in self.legal:
+            self.legal[pair] = not self.re_match(
+                (self.entry_list[pair[0]], self.entry_list[pair[1]]))
+        return self.legal[pair]
 
-    def pair_entries(self, singles, pairs):
+    def candidate_pairs(self, window):
         """
-        Build a list of pairs from a list of entries.
+        Legal pairs within window places of each other by score. Entries on
+        the same score as the last of those places are included too.
         """
-        if len(singles) == 0:
-            return pairs
-        elif len(singles) == 1:
-            pairs.append((singles[0]))
-            return pairs
-        else:
-            pairs.append((singles[0], singles[1]))
-            return self.pair_entries(singles[2:], pairs)
+        pairs = set()
+        last = len(self.order) - 1
+        for pos, i in enumerate(self.order):
+            limit = self.scores[self.order[min(pos + window, last)]]
+            for j in self.order[pos + 1:]:
+                if self.scores[j] > limit:
+                    break
+                pair = (i, j) if i < j else (j, i)
+                if self.is_legal(*pair):
+                    pairs.add(pair)
+        return pairs | self.extra_pairs
 
-    @staticmethod
-    def _check_legal_draw(draw):
-        """set of all players should equal num_games *2"""
-        ids = set([x[0]['name'] for x in draw])
-        ids = ids.union(set([x[1]['name'] for x in draw]))
-        return len(ids) == len(draw) * 2
+    def solve(self, window):
+        """
+        Find the cheapest perfect matching. Returns a list of mates, or None
+        if there is no perfect matching using pairs in window.
+        """
+        pairs = self.candidate_pairs(window)
+        matching = WeightedMatching(self.weighted(pairs),
+                                    len(self.entry_list))
+        while True:
+            mate = matching.perfect_matching()
+            if mate is None:
+                return None
+
+            # The improving pairs are added to the solved matching, which is
+            # much faster than solving again with them
+            improving = self.improving_pairs(matching, pairs)
+            if not improving:
+                return mate
+            self.extra_pairs.update(improving)
+            pairs.update(improving)
+            matching.add_edges(self.weighted(improving))
+
+    def weighted(self, pairs):
+        """Edges for WeightedMatching, heaviest for the cheapest pairs"""
+        return [(i, j, self.max_cost - self.cost(i, j)) \
+            for i, j in sorted(pairs)]
+
+    def improving_pairs(self, matching, pairs):
+        """
+        Legal pairs, not in pairs, whose reduced cost against the solved
+        matching is negative.
+
+        Pairs are checked outwards from each entry in score order. The cost of
+        a pair only grows with the difference in score, so once even the
+        smallest dual cannot make a pair improving no further pairs need to be
+        checked for that entry.
+        """
+        duals = [matching.dual(x) for x in range(len(self.entry_list))]
+        min_dual = min(duals)
+        improving = []
+        for pos, i in enumerate(self.order):
+            for j in self.order[pos + 1:]:
+                diff = (self.scores[j] - self.scores[i]) ** 2 * self.scale
+                if duals[i] + min_dual >= 4 * (self.max_cost - diff):
+                    break
+                # Blossom duals only add to the reduced cost, so most pairs
+                # are ruled out by the duals of their entries alone
+                if duals[i] + duals[j] >= 4 * (self.max_cost - diff):
+                    continue
+                weight = self.max_cost - self.cost(i, j)
+                pair = (i, j) if i < j else (j, i)
+                if pair not in pairs \
+                and matching.reduced_cost(i, j, weight) < 0 \
+                and self.is_legal(*pair):
+                    improving.append(pair)
+        return improving
+
+    def greedy(self):
+        """
+        Pairs for a greedy draw. Entries are taken from the most points down
+        and each plays the next entry down it hasn't played, or failing that
+        the next entry down.
+        """
+        unpaired = sorted(range(len(self.entry_list)),
+                          key=lambda i: (-self.scores[i], i))
+        pairs = []
+        while unpaired:
+            first = unpaired.pop(0)
+            pick = next((k for k, j in enumerate(unpaired) \
+                if self.is_legal(first, j)), 0)
+            pairs.append((first, unpaired.pop(pick)))
+        return pairs
+
+    def penalised_cost(self, i, j):
+        """The cost of a pair, with the penalty if it is a re-match"""
+        return self.cost(i, j) + (0 if self.is_legal(i, j) else self.penalty)
+
+    def improve(self, pairs, budget):
+        """
+        Improve a draw until budget steps are used up. Returns the best pairs
+        found, the number of improvements made and whether the draw is known
+        to be the cheapest. A step is a pair of games compared (see descend)
+        or a pair of entries costed for a redraw (see redraw), so a draw
+        takes time in proportion to the budget and the same draw is always
+        found for the same entries.
+
+        Games are put in order of points. First opponents are swapped between
+        nearby games while it helps (see descend). Then runs of nearby games
+        are redrawn, each the cheapest draw of its entries (see redraw). The
+        runs overlap, so entries can move further than one run, and they
+        double in length whenever a pass over the draw finds nothing better.
+        A small draw ends up redrawn whole, which makes it the cheapest. In a
+        larger one, once runs of max_run games find nothing, runs starting at
+        (seeded) random are tried until the steps are used up or the draw
+        meets the lower bound.
+        Re-matches cost more than any draw without one, so they are removed
+        where they can be.
+        """
+        games = sorted(pairs, key=lambda x: (
+            -max(self.scores[x[0]], self.scores[x[1]]), min(x)))
+        costs = [self.penalised_cost(*x) for x in games]
+        self.steps_left = budget
+        improvements, finished = self.descend(games, costs, 16)
+        if len(games) < 2:
+            return games, improvements, True
+
+        run = 8
+        max_run = 24
+        pick = random.Random(len(games))
+        while finished and self.steps_left > 0 \
+        and not self.meets_lower_bound(games):
+            if run > max_run:
+                improvements += self.redraw(
+                    games, costs, pick.randrange(len(games) - 1), max_run)
+                continue
+
+            improved = False
+            for start in range(0, max(len(games) - run // 2, 1), run // 2):
+                if self.steps_left <= 0:
+                    break
+                changed = self.redraw(games, costs, start, run)
+                improvements += changed
+                improved = improved or changed
+            if not improved:
+                if run >= len(games):
+                    # The whole draw was redrawn at its cheapest
+                    return games, improvements, True
+                run = len(games) if run * 2 >= len(games) <= max_run \
+                    else run * 2
+        return games, improvements, self.meets_lower_bound(games)
+
+    def redraw(self, games, costs, start, run):
+        """
+        Replace run games from start, in place, with the cheapest draw of
+        their entries if that is cheaper. Returns whether it was
+        """
+        old = games[start:start + run]
+        entries = [x for game in old for x in game]
+        penalised = dict(
+            ((a, b), self.penalised_cost(entries[a], entries[b])) \
+            for a in range(len(entries)) for b in range(a + 1, len(entries)))
+        self.spend(len(penalised))
+        top = max(penalised.values()) + 1
+        mate = WeightedMatching(
+            [(a, b, top - cost) for (a, b), cost in sorted(penalised.items())],
+            len(entries)).perfect_matching()
+        if mate is None:
+            return False
+        new = [(entries[a], entries[b]) for a, b in enumerate(mate) if a < b]
+        new_costs = [penalised[(a, b)] for a, b in enumerate(mate) if a < b]
+        if sum(new_costs) >= sum(costs[start:start + run]):
+            return False
+
+        # Keep the games in order of points
+        order = sorted(range(len(new)), key=lambda x: (
+            -max(self.scores[new[x][0]], self.scores[new[x][1]]),
+            min(new[x])))
+        games[start:start + run] = [new[x] for x in order]
+        costs[start:start + run] = [new_costs[x] for x in order]
+        return True
+
+    def descend(self, games, costs, max_window):
+        """
+        Swap opponents between games, in place, while it makes the draw
+        cheaper. Returns the number of swaps made and whether no swap is left
+        that helps, rather than the steps having run out.
+
+        Each game is compared with the next few games (the window) and
+        opponents swapped whichever way makes the two games cheaper. When a
+        pass over the draw finds nothing the window doubles, up to max_window.
+        """
+        window = min(4, max_window)
+        swaps = 0
+        while True:
+            improved = False
+            for first in range(len(games)):
+                for second in range(first + 1,
+                                    min(first + 1 + window, len(games))):
+                    if self.steps_left <= 0:
+                        return swaps, False
+                    self.spend(1)
+                    (i, j), (k, l) = games[first], games[second]
+                    current = costs[first] + costs[second]
+                    for one, other in (((i, k), (j, l)), ((i, l), (j, k))):
+                        one_cost = self.penalised_cost(*one)
+                        other_cost = self.penalised_cost(*other)
+                        if one_cost + other_cost < current:
+                            games[first], games[second] = one, other
+                            costs[first], costs[second] = one_cost, other_cost
+                            swaps += 1
+                            improved = True
+                            break
+            if not improved:
+                if window >= min(max_window, len(games)):
+                    return swaps, True
+                window *= 2
+
+    def spend(self, steps):
+        """Use up steps of the budget for improve"""
+        self.steps_left -= steps
+        self.steps += steps
+
+    def objective(self, pairs):
+        """The total squared difference in points of the draw made of pairs"""
+        return sum((self.scores[i] - self.scores[j]) ** 2 for i, j in pairs)
+
+    def lower_bound(self):
+        """
+        The objective of pairing entries in order of points. Squared
+        differences are convex so, ignoring re-matches, no draw does better
+        """
+        ranked = sorted(self.scores)
+        return sum((x - y) ** 2 for x, y in zip(ranked[::2], ranked[1::2]))
+
+    def meets_lower_bound(self, pairs):
+        """Whether the draw made of pairs is as good as any can be"""
+        return self.objective(pairs) == self.lower_bound() \
+            and all(self.is_legal(*x) for x in pairs)
+
+    def report(self, pairs, optimal, improvements):
+        """How good the draw made of pairs is. See SwissChess"""
+        objective = self.objective(pairs)
+        lower_bound = self.lower_bound()
+        return {
+            'objective': objective,
+            'lower_bound': lower_bound,
+            'gap': objective - lower_bound,
+            're_matches': len([x for x in pairs if not self.is_legal(*x)]),
+            'optimal': optimal or self.meets_lower_bound(pairs),
+            'improvements': improvements,
+            'steps': self.steps,
+        }
@@ -0,0 +1,90 @@
+"""
+Who has played whom in a tournament
+
+SwissChess must not pair entries that have already played each other. Checking
+a pair against the db costs queries for every candidate pair in the draw, so
+the history for the whole tournament is loaded once and checked in memory.
+
+A round is drawn against the games of the rounds before it (see before). Its
+own games, from when it was drawn last, and those of later rounds don't count,
+so redrawing a round gives the same draw.
+"""
+from collections import defaultdict
+
+from models.dao.db_connection import db
+from models.dao.game_entry import GameEntrant
+from models.dao.tournament_game import TournamentGame
+from models.dao.tournament_round import TournamentRound
+
+class OpponentHistory(object):
+    """
+    The previous opponents of each entry, by entry id, and the entries that
+    have had a BYE (a game with no other entrant). The games are kept, with
+    their round if known, in games.
+    """
+
+    def __init__(self, games=None):
+        self.opponents = defaultdict(set)
+        self.byes = set()
+        self.games = []
+        for game in games or []:
+            self.add_game(game)
+
+    @classmethod
+    def for_tournament(cls, tournament_id):
+        """The history of every game in the tournament, in a single query"""
+        # pylint: disable=no-member
+        games = defaultdict(list)
+        rounds = {}
+        for game_id, round_num, entrant_id in db.session.query(
+                GameEntrant.game_id, TournamentRound.ordering,
+                GameEntrant.entrant_id).select_from(GameEntrant).\
+                join(TournamentGame).join(TournamentRound).\
+                filter(TournamentRound.tournament_name == tournament_id).\
+                order_by(TournamentRound.ordering, GameEntrant.game_id):
+            games[game_id].append(entrant_id)
+            rounds[game_id] = round_num
+
+        history = cls()
+        for game_id in sorted(games, key=lambda x: (rounds[x], x)):
+            history.add_game(games[game_id], rounds[game_id])
+        return history
+
+    def before(self, round_num):
+        """
+        The history of the games played in the rounds before round_num.
+        Games without a round are kept.
+        """
+        history = OpponentHistory()
+        for game_round, entrant_ids in self.games:
+            if game_round is None or game_round < round_num:
+                history.add_game(entrant_ids, game_round)
+        return history
+
+    def add_game(self, entrant_ids, round_num=None):
+        """Record a game, in round_num if known, between the entrant_ids"""
+        self.games.append((round_num, list(entrant_ids)))
+        if len(entrant_ids) == 1:
+            self.byes.add(entrant_ids[0])
+        for entrant in entrant_ids:
+            self.opponents[entrant].update(
+                x for x in entrant_ids if x != entrant)
+
+    def have_played(self, entry_id, opponent_id):
+        """Whether two entries have played each other"""
+        return opponent_id in self.opponents.get(entry_id, ())
+
+    def had_bye(self, entry_id):
+        """Whether an entry has had a BYE"""
+        return entry_id in self.byes
+
+    def re_match(self, game):
+        """
+        Check whether game is a re-match. This is the re_match function for
+        SwissChess. The game is a pair of dicts, each with the 'name' and the
+        'entry', either of which may be the BYE.
+        """
+        game = [g for g in game if g['name'] != 'BYE']
+        if len(game) == 1:
+            return self.had_bye(game[0]['entry'].id)
+        return self.have_played(game[0]['entry'].id, game[1]['entry'].id)
@@ -3,6 +3,7 @@ Module to handle permissions for accounts trying to modify a tournament.
 """
 # pylint: disable=no-member
 
+from sqlalchemy import func, select
 from sqlalchemy.sql.expression import and_
 
 from models.authentication import PermissionDeniedException
@@ -20,11 +21,19 @@ PERMISSIONS = {
     'USER_DETAILS'       : 'user_details'
 }
 
+# Held while the permissions are set up so only one process adds them
+SET_UP_LOCK = 7468001
+
 def set_up_permissions(commit=False):
     """
     Add all the permissions listed in PERMISSIONS to the db
     These are all the action you can take.
+
+    Safe to run from several processes at once. The check and insert happen
+    under a transaction level advisory lock, so the actions are only added
+    once.
     """
+    db.session.execute(select([func.pg_advisory_xact_lock(SET_UP_LOCK)]))
     # pylint: disable=unused-variable
     for key, value in PERMISSIONS.iteritems():
         if ProtObjAction.query.filter_by(description=value).first() is None:
@@ -33,6 +42,49 @@ def set_up_permissions(commit=False):
     if commit:
         db.session.commit()
 
+class Grants(object):
+    """
+    Everything that gives a user permissions. Each is loaded by a query the
+    first time a check needs it and is then answered from memory, so a
+    superuser costs one query and an organiser two:
+        - is_superuser
+        - organised - names of tournaments they organise
+        - entered - names of tournaments they have entered
+    """
+
+    def __init__(self, username):
+        self.username = username
+        self._is_superuser = None
+        self._organised = None
+        self._entered = None
+
+    @property
+    def is_superuser(self):
+        """The user is a superuser"""
+        if self._is_superuser is None:
+            self._is_superuser = db.session.query(Account.username).\
+                filter_by(username=self.username, is_superuser=True).\
+                first() is not None
+        return self._is_superuser
+
+    @property
+    def organised(self):
+        """Names of the tournaments the user organises"""
+        if self._organised is None:
+            self._organised = set(x for (x,) in \
+                db.session.query(Tournament.name).\
+                filter_by(to_username=self.username))
+        return self._organised
+
+    @property
+    def entered(self):
+        """Names of the tournaments the user has entered"""
+        if self._entered is None:
+            self._entered = set(x for (x,) in \
+                db.session.query(TournamentEntry.tournament_id).\
+                filter_by(player_id=self.username))
+        return self._entered
+
 # pylint: disable=E0602
 class PermissionsChecker(object):
     """
@@ -41,8 +93,21 @@ class PermissionsChecker(object):
     add scores.
     Organisers and admins can modify scores.
     Etc.
+
+    The Grants for each user are loaded the first time they are needed and
+    then kept for the life of the checker, so a checker should live no longer
+    than a request.
     """
 
+    def __init__(self):
+        self.grants = {}
+
+    def get_grants(self, user):
+        """The Grants for user, loading them if needed"""
+        if user not in self.grants:
+            self.grants[user] = Grants(user)
+        return self.grants[user]
+
 
     @staticmethod
     def check_action_valid(action):
@@ -79,6 +144,7 @@ class PermissionsChecker(object):
 
         db.session.add(AccountProtectedObjectPermission(user, permission.id))
         db.session.commit()
+        self.grants.pop(user, None)
 
     def check_permission(self, action, user, for_user, tournament):
         """
@@ -95,10 +161,10 @@ class PermissionsChecker(object):
                 'Permission denied for {} to perform {} on tournament {}'.\
                 format(user, action, tournament))
 
-        if Account.query.filter_by(username=user, is_superuser=True).\
-                first() is not None:
+        grants = self.get_grants(user)
+        if grants.is_superuser:
             return True
-        if tournament is not None and self.is_organiser(user, tournament):
+        if tournament is not None and tournament in grants.organised:
             return True
 
         if action == PERMISSIONS['USER_DETAILS'] and user == for_user:
@@ -109,9 +175,7 @@ class PermissionsChecker(object):
             if user != for_user:
                 raise perm_denied
 
-            if TournamentEntry.query.\
-                    filter_by(tournament_id=tournament, player_id=user).first()\
-                    is not None:
+            if tournament in grants.entered:
                 return True
 
         raise perm_denied
@@ -139,8 +203,8 @@ class PermissionsChecker(object):
                       protected_object_permission_id=permission_id).delete()
 
         db.session.commit()
+        self.grants.pop(user, None)
 
     def is_organiser(self, user, tournament):
         """user is an organiser of tournament"""
-        return Tournament.query.filter_by(name=tournament, to_username=user).\
-            count() > 0
+        return tournament in self.get_grants(user).organised
@@ -9,53 +9,117 @@ return lists in the order they were handed in and will pick the first db entry
 as the winner of any given category.
 """
 
+class ScoreMatrix(object):
+    """
+    The scores for some entries as an entries x categories matrix. Each entry
+    is a row and each score category a column. It is built in a single pass
+    over the scores so everything derived from it is a cheap walk of lists.
+
+    Expects:
+        - entries - TournamentEntry with their scores
+        - categories - ScoreCategory for the tournament
+    """
+
+    def __init__(self, entries, categories):
+        self.entries = entries
+        self.categories = categories
+
+        columns = dict((cat.name, j) for j, cat in enumerate(categories))
+        width = len(categories)
+        # The sum of the scores and of the max scores for each row & column
+        self.sums = [width * [0] for _ in entries]
+        self.max_totals = [width * [0] for _ in entries]
+
+        for i, entry in enumerate(entries):
+            for score in entry.scores:
+                j = columns.get(score.score_category.name)
+                if j is None:
+                    continue
+                if score.value is not None:
+                    self.sums[i][j] += score.value
+                self.max_totals[i][j] += score.score_category.max_val
+
+    @classmethod
+    def from_sums(cls, entries, categories, sums, max_totals):
+        """A matrix from sums and max totals that are already known"""
+        matrix = cls([], categories)
+        matrix.entries = entries
+        matrix.sums = sums
+        matrix.max_totals = max_totals
+        return matrix
+
+    def column(self, category_name):
+        """The summed scores for a single category, one per entry"""
+        j = [x.name for x in self.categories].index(category_name)
+        return [row[j] for row in self.sums]
+
+    def percentages(self):
+        """
+        The weighted percentage each entry got in each category. An entry
+        without a max total for a category gets 0.
+        """
+        weights = [int(x.percentage) for x in self.categories]
+        return [
+            [float(score) / total * weight if total else 0 \
+                for score, total, weight in zip(sums, max_totals, weights)] \
+            for sums, max_totals in zip(self.sums, self.max_totals)]
+
+    def totals(self):
+        """The total score for each entry"""
+        return [sum(row) for row in self.percentages()]
+
+
 class RankingStrategy(object):
     """
     A default RankingStrategy will return a list of entries in the order they
     are output from the db.
+
+    tie_breaks is an optional list of category names. Entries with the same
+    total are ordered by their summed scores in these categories, in turn.
     """
 
-    def __init__(self, tournament_id, score_categories_func):
+    def __init__(self, tournament_id, score_categories_func, tie_breaks=None):
         self.tournament_id = tournament_id
         self.score_categories = score_categories_func
+        self.tie_breaks = tie_breaks if tie_breaks is not None else []
 
     def total_score(self, entry):
         """
         Calculate the total score for the entry
         entry should be a TournamentEntry
         """
+        return ScoreMatrix([entry], self.score_categories()).totals()[0]
 
-        categories = self.score_categories()
-        scores = entry.scores
-        for cat in categories:
-            agg_score = sum(
-                [x.value for x in scores \
-                if x.score_category.name == cat.name \
-                and x.value is not None])
-            agg_total = sum(
-                [x.score_category.max_val for x in scores \
-                if x.score_category.name == cat.name])
-            try:
-                agg_score = float(agg_score)
-                agg_total = float(agg_total)
-                percentage = int(cat.percentage)
-                cat.total_score = agg_score / agg_total * percentage
-            except ZeroDivisionError:
-                cat.total_score = 0
-
-        return sum([x.total_score for x in categories])
-
-    def overall_ranking(self, entries, error_on_incomplete=False): # pylint: disable=W0613
+    def total_scores(self, entries):
+        """
+        Calculate the total scores for many entries at once.
+        Returns a dict of entry id to total score
+        """
+        totals = ScoreMatrix(entries, self.score_categories()).totals()
+        return dict((x.id, total) for x, total in zip(entries, totals))
+
+    # pylint: disable=unused-argument
+    def overall_ranking(self, entries, error_on_incomplete=False, matrix=None):
         """
         Combines all scores for an overall ranking of entries.
 
         error_on_incomplete: when true this will raise a RuntimeError if any
             of the entrants have incopmlete scores.
+        matrix: the ScoreMatrix for entries, if it is already known e.g. from
+            the Standings
         """
-        for entry in entries:
-            entry.total_score = self.total_score(entry)
+        if matrix is None:
+            matrix = ScoreMatrix(entries, self.score_categories())
+        keys = [matrix.totals()] + \
+            [matrix.column(x) for x in self.tie_breaks]
+
+        for i, entry in enumerate(entries):
+            entry.total_score = keys[0][i]
 
-        entries.sort(key=lambda entry: entry.total_score, reverse=True)
+        order = sorted(range(len(entries)),
+                       key=lambda i: tuple(x[i] for x in keys),
+                       reverse=True)
+        entries[:] = [entries[i] for i in order]
 
         for i, entry in enumerate(entries):
             entry.ranking = i + 1
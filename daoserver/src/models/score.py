@@ -1,15 +1,22 @@
 """
 Logic for scores goes here
 """
+from collections import OrderedDict
+
+from sqlalchemy import func
 from sqlalchemy.exc import DataError, IntegrityError
-from sqlalchemy.sql.expression import and_
+from sqlalchemy.sql.expression import and_, or_
 
 from models.dao.db_connection import db
 from models.dao.game_entry import GameEntrant
+from models.dao.lookup import find_by
 from models.dao.score import Score as DAO, ScoreCategory, TournamentScore, \
 GameScore
+from models.dao.tournament import Tournament
 from models.dao.tournament_entry import TournamentEntry
 from models.dao.tournament_game import TournamentGame
+from models.dao.tournament_round import TournamentRound
+from models.standings import record_scores
 
 class Score(object):
     """Model for a score in a tournament or game"""
@@ -77,29 +84,84 @@ class Score(object):
     @staticmethod
     def is_score_entered(game_dao):
         """
-        Determine if all the scores have been entered for this game.
-        Note that, if false, the result will be double checked and possibly
-        updated
+        Determine if all the scores have been entered for this game. This is
+        kept on the game as scores are written so it is just a read.
         """
         if game_dao is not None and game_dao.score_entered:
             return True
 
-        per_game_scores = len(game_dao.tournament_round.tournament.\
-            score_categories.filter_by(per_tournament=False).all())
-        if per_game_scores <= 0:
+        if game_dao.tournament_round.tournament.score_categories.\
+        filter_by(per_tournament=False).first() is None:
             raise AttributeError(
                 '{} does not have any scores associated with it'.\
                 format(game_dao.tournament_round.tournament.name))
 
-        scores_expected = per_game_scores * len(game_dao.entrants.all())
+        return False
 
-        if len(game_dao.game_scores.all()) == scores_expected:
-            game_dao.score_entered = True
-            db.session.add(game_dao)
-            db.session.commit()
-            return True
+    @staticmethod
+    def _per_game_categories(tournament_id):
+        """The number of per-game score categories in the tournament"""
+        # pylint: disable=no-member
+        return ScoreCategory.query.filter_by(tournament_id=tournament_id,
+                                             per_tournament=False).count()
 
-        return False
+    @staticmethod
+    def _is_complete(scores, entrants, per_game):
+        """
+        Whether a game with entrants, of which scores have been entered, is
+        complete. Byes, with fewer than two entrants, need no scores. Other
+        games need a score from every entrant in every per-game category.
+
+        This is the one rule for games counted as scores are written, games
+        recounted, and games counted by the schema (database/setup).
+        """
+        return or_(entrants < 2,
+                   and_(per_game > 0, scores >= entrants * per_game))
+
+    def _count_game_score(self):
+        """
+        Count a newly written score against its game, and mark it as scored
+        once it is complete (see _is_complete).
+
+        This is a single update, evaluated against the row as it is in the
+        db, so scores written at the same time are all counted.
+        """
+        # pylint: disable=no-member
+        TournamentGame.query.filter_by(id=self.game.id).update({
+            TournamentGame.scores_entered: TournamentGame.scores_entered + 1,
+            TournamentGame.score_entered: self._is_complete(
+                TournamentGame.scores_entered + 1,
+                self.game.entrants.count(),
+                self._per_game_categories(self.category.tournament_id)),
+        }, synchronize_session=False)
+
+    @staticmethod
+    def recount_games(tournament_id, game_ids=None):
+        """
+        Recount the scores entered for every game in the tournament, e.g.
+        after the score categories have changed, or just those in game_ids.
+        The caller commits.
+        """
+        # pylint: disable=no-member
+        per_game = Score._per_game_categories(tournament_id)
+        scores = db.session.query(func.count(GameScore.score_id)).\
+            filter(GameScore.game_id == TournamentGame.id).\
+            correlate(TournamentGame).scalar_subquery()
+        entrants = db.session.query(func.count(GameEntrant.entrant_id)).\
+            filter(GameEntrant.game_id == TournamentGame.id).\
+            correlate(TournamentGame).scalar_subquery()
+
+        games = TournamentGame.query.filter(
+            TournamentGame.tournament_round_id.in_(
+                db.session.query(TournamentRound.id).\
+                filter_by(tournament_name=tournament_id)))
+        if game_ids is not None:
+            games = games.filter(TournamentGame.id.in_(game_ids))
+        games.update({
+            TournamentGame.scores_entered: scores,
+            TournamentGame.score_entered: Score._is_complete(
+                scores, entrants, per_game),
+        }, synchronize_session=False)
 
 
     def validate(self):
@@ -159,9 +221,12 @@ class Score(object):
             if self.game is not None:
                 db.session.add(
                     GameScore(self.entry.id, self.game.id, score_dao.id))
+                db.session.flush()
+                self._count_game_score()
             else:
                 db.session.add(TournamentScore(self.entry.id, \
                     self.tournament.id, score_dao.id))
+            record_scores([(score_dao, self.category)])
             db.session.commit()
         except IntegrityError as err:
             db.session.rollback()
@@ -171,3 +236,249 @@ class Score(object):
             raise err
 
         return success
+
+
+class ScoreBatch(object):
+    """
+    Many scores entered at once, e.g. a TO keying in a whole round from the
+    score sheets.
+
+    The categories, games, entries and existing scores needed are loaded
+    up front, a query each, and the scores are all validated in memory. They
+    are then written together in a single commit. If any score is invalid
+    nothing is written.
+
+    If round_id is given, per-game scores without a game_id are for the game
+    the entry plays in that round.
+    """
+
+    def __init__(self, tournament_id, round_id=None):
+        # pylint: disable=no-member
+        self.tournament = find_by(Tournament, name=tournament_id)
+        if self.tournament is None:
+            raise ValueError('Tournament {} not found'.format(tournament_id))
+        self.round_id = round_id
+        self.scores = []
+
+    def add(self, entry_id, category, score, game_id=None):
+        """Add a score entered by entry_id. Returns self"""
+        if score is None:
+            raise ValueError(Score.INVALID_SCORE.format(None))
+        if category is None:
+            raise ValueError(Score.INVALID_CATEGORY.format(None))
+        self.scores.append({
+            'entry_id': entry_id,
+            'category': category,
+            'score': score,
+            'game_id': game_id,
+        })
+        return self
+
+    def _categories(self):
+        """The tournament's categories by name"""
+        # pylint: disable=no-member
+        return dict((x.name, x) for x in ScoreCategory.query.\
+            filter_by(tournament_id=self.tournament.name))
+
+    def _games(self):
+        """
+        Find the game for each score. Returns the games entrants, by game id
+        """
+        # pylint: disable=no-member
+        if self.round_id is not None:
+            missing = set(x['entry_id'] for x in self.scores \
+                if x['game_id'] is None and not x['category'].per_tournament)
+            games = dict(db.session.query(
+                GameEntrant.entrant_id, GameEntrant.game_id).join(
+                    TournamentGame).filter(
+                        TournamentGame.tournament_round_id == self.round_id,
+                        GameEntrant.entrant_id.in_(missing))) \
+                if missing else {}
+            for score in self.scores:
+                if score['game_id'] is None \
+                and not score['category'].per_tournament:
+                    score['game_id'] = games.get(score['entry_id'])
+
+        for score in self.scores:
+            if score['game_id'] is None:
+                continue
+            try:
+                score['game_id'] = int(score['game_id'])
+            except (TypeError, ValueError):
+                raise TypeError(Score.GAME_NOT_FOUND.format(
+                    score['score'], score['game_id']))
+
+        entrants = dict((x['game_id'], []) for x in self.scores \
+            if x['game_id'] is not None)
+        if entrants:
+            for game_id, entrant_id in db.session.query(
+                    GameEntrant.game_id, GameEntrant.entrant_id).\
+                    join(TournamentGame).join(TournamentRound).filter(
+                        TournamentRound.tournament_name == \
+                        self.tournament.name,
+                        GameEntrant.game_id.in_(entrants.keys())):
+                entrants[game_id].append(entrant_id)
+
+        for score in self.scores:
+            if score['game_id'] is not None \
+            and not entrants[score['game_id']]:
+                raise TypeError(Score.GAME_NOT_FOUND.format(
+                    score['score'], score['game_id']))
+        return entrants
+
+    def _resolve(self):
+        """Replace names and ids in the scores with the DAOs they refer to"""
+        # pylint: disable=no-member
+        categories = self._categories()
+        for score in self.scores:
+            category = categories.get(score['category'])
+            if category is None:
+                raise ValueError(
+                    Score.INVALID_CATEGORY.format(score['category']))
+            score['category'] = category
+
+        entrants = self._games()
+
+        for score in self.scores:
+            score['target_id'] = score['entry_id']
+            if score['category'].opponent_score \
+            and score['game_id'] is not None:
+                opponents = [x for x in entrants[score['game_id']] \
+                    if x != score['entry_id']]
+                if not opponents:
+                    raise ValueError('{} not entered. Game {} has no '
+                                     'opponent'.format(score['score'],
+                                                       score['game_id']))
+                score['target_id'] = opponents[0]
+
+        ids = set(x['target_id'] for x in self.scores)
+        entries = dict((x.id, x) for x in TournamentEntry.query.filter(
+            TournamentEntry.tournament_id == self.tournament.name,
+            TournamentEntry.id.in_(ids))) if ids else {}
+        for score in self.scores:
+            if score['target_id'] not in entries:
+                raise ValueError(
+                    'Unknown entrant: {}'.format(score['entry_id']))
+            score['entry'] = entries[score['target_id']]
+
+    def _existing(self):
+        """
+        The scores already entered for the entries in the batch, keyed by
+        (game_id, entry_id, category_id). Per-tournament scores have no game.
+        """
+        # pylint: disable=no-member
+        existing = {}
+        game_ids = set(x['game_id'] for x in self.scores) - set([None])
+        if game_ids:
+            for game_id, entry_id, cat_id, value in db.session.query(
+                    GameScore.game_id, GameScore.entry_id,
+                    DAO.score_category_id, DAO.value).join(DAO).\
+                    filter(GameScore.game_id.in_(game_ids)):
+                existing[(game_id, entry_id, cat_id)] = value
+
+        entry_ids = set(x['entry'].id for x in self.scores \
+            if x['game_id'] is None)
+        if entry_ids:
+            for entry_id, cat_id, value in db.session.query(
+                    TournamentScore.entry_id, DAO.score_category_id,
+                    DAO.value).join(DAO).filter(
+                        TournamentScore.tournament_id == self.tournament.id,
+                        TournamentScore.entry_id.in_(entry_ids)):
+                existing[(None, entry_id, cat_id)] = value
+        return existing
+
+    @staticmethod
+    def _validate(score):
+        """Check a single score against its category and game"""
+        invalid_score = ValueError(Score.INVALID_SCORE.format(score['score']))
+        try:
+            score['score'] = int(score['score'])
+        except ValueError:
+            raise invalid_score
+
+        category = score['category']
+        if score['score'] < category.min_val \
+        or score['score'] > category.max_val:
+            raise invalid_score
+
+        if score['game_id'] is None and not category.per_tournament:
+            raise TypeError(Score.GAME_AS_TOURN.format(category.name))
+
+        if score['game_id'] is not None and category.per_tournament:
+            raise TypeError(Score.TOURN_AS_GAME.format(category.name,
+                                                       score['game_id']))
+
+    def validate(self):
+        """
+        Validate every score in the batch. Returns the scores that need to be
+        written, or raises an Exception
+        """
+        self._resolve()
+        existing = self._existing()
+
+        new_scores = OrderedDict()
+        for score in self.scores:
+            self._validate(score)
+            key = (score['game_id'], score['entry'].id, score['category'].id)
+            value = existing.get(key, new_scores.get(key, {}).get('score'))
+            if value is None:
+                new_scores[key] = score
+            elif value != score['score']:
+                raise ValueError('{} not entered. Score is already set'.\
+                    format(score['score']))
+
+        # Zero sum scores for a game can't total more than the max
+        totals = {}
+        for (game_id, _, cat_id), value in existing.items():
+            totals[(game_id, cat_id)] = totals.get((game_id, cat_id), 0) + \
+                value
+        for score in new_scores.values():
+            if score['game_id'] is None or not score['category'].zero_sum:
+                continue
+            total_key = (score['game_id'], score['category'].id)
+            totals[total_key] = totals.get(total_key, 0) + score['score']
+            if totals[total_key] > score['category'].max_val:
+                raise ValueError(Score.INVALID_SCORE.format(score['score']))
+
+        return new_scores.values()
+
+    def write(self, commit=True):
+        """
+        Validate and write every score in the batch in a single commit.
+        Returns a message for each score.
+
+        If commit is False the scores are only flushed, for the caller to
+        commit along with anything else in the transaction.
+        """
+        new_scores = self.validate()
+
+        try:
+            daos = [DAO(x['entry'].id, x['category'].id, x['score']) \
+                for x in new_scores]
+            db.session.add_all(daos)
+            db.session.flush()
+
+            db.session.add_all(
+                [GameScore(x['entry'].id, x['game_id'], dao.id) \
+                 for x, dao in zip(new_scores, daos) \
+                 if x['game_id'] is not None] + \
+                [TournamentScore(x['entry'].id, self.tournament.id, dao.id) \
+                 for x, dao in zip(new_scores, daos) \
+                 if x['game_id'] is None])
+            db.session.flush()
+
+            game_ids = set(x['game_id'] for x in new_scores) - set([None])
+            if game_ids:
+                Score.recount_games(self.tournament.name, game_ids)
+            record_scores([(dao, x['category']) \
+                for x, dao in zip(new_scores, daos)])
+
+            messages = ['Score entered for {}: {}'.format(
+                x['entry'].player_id, x['score']) for x in self.scores]
+            if commit:
+                db.session.commit()
+        except IntegrityError:
+            db.session.rollback()
+            raise
+
+        return messages
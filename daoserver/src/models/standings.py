@@ -0,0 +1,134 @@
+"""
+Tournament standings
+
+Ranking a tournament from its raw scores means loading and summing every
+score. The sums a ranking needs, along with the scores themselves for
+display, are instead kept in the standing table, updated in the same
+transaction as the scores, so the standings are a single read.
+"""
+from collections import defaultdict
+
+from sqlalchemy import func
+from sqlalchemy.dialects.postgresql import aggregate_order_by, insert
+from sqlalchemy.sql.expression import and_
+
+from models.dao.db_connection import db
+from models.dao.score import Score, ScoreCategory
+from models.dao.standing import Standing
+from models.dao.tournament_entry import TournamentEntry
+from models.ranking_strategies import ScoreMatrix
+
+# pylint: disable=no-member
+def record_scores(scores):
+    """
+    Add newly written scores to the standings. The caller commits.
+
+    Expects:
+        - scores - (Score, ScoreCategory) for each score. The Scores must
+        have been flushed, so that they have ids
+    """
+    totals = defaultdict(lambda: [0, 0, [], []])
+    for score, category in sorted(scores, key=lambda x: x[0].id):
+        total = totals[(score.entry_id, category.id)]
+        total[0] += score.value if score.value is not None else 0
+        total[1] += category.max_val
+        total[2].append(score.id)
+        total[3].append(score.value)
+    if not totals:
+        return
+
+    table = Standing.__table__
+    stmt = insert(table).values([
+        {'entry_id': entry_id, 'score_category_id': cat_id,
+         'total': total, 'max_total': max_total,
+         'score_ids': score_ids, 'score_values': score_values} \
+        for (entry_id, cat_id), (total, max_total, score_ids, score_values) \
+        in totals.items()])
+    db.session.execute(stmt.on_conflict_do_update(
+        index_elements=['entry_id', 'score_category_id'],
+        set_={
+            'total': table.c.total + stmt.excluded.total,
+            'max_total': table.c.max_total + stmt.excluded.max_total,
+            'score_ids': func.array_cat(table.c.score_ids,
+                                        stmt.excluded.score_ids),
+            'score_values': func.array_cat(table.c.score_values,
+                                           stmt.excluded.score_values),
+        }))
+
+def rebuild_standings(tournament_id):
+    """
+    Recalculate the standings for a tournament from its scores, e.g. after
+    the score categories have changed. The caller commits.
+    """
+    entry_ids = db.session.query(TournamentEntry.id).\
+        filter_by(tournament_id=tournament_id)
+    Standing.query.filter(Standing.entry_id.in_(entry_ids)).\
+        delete(synchronize_session=False)
+
+    sums = db.session.query(
+        Score.entry_id,
+        Score.score_category_id,
+        func.coalesce(func.sum(Score.value), 0),
+        func.sum(ScoreCategory.max_val),
+        func.array_agg(aggregate_order_by(Score.id, Score.id)),
+        func.array_agg(aggregate_order_by(Score.value, Score.id))).\
+        join(ScoreCategory).\
+        filter(ScoreCategory.tournament_id == tournament_id).\
+        group_by(Score.entry_id, Score.score_category_id)
+    db.session.execute(insert(Standing.__table__).from_select(
+        ['entry_id', 'score_category_id', 'total', 'max_total', 'score_ids',
+         'score_values'], sums))
+
+
+class Standings(object):
+    """
+    The entries in a tournament along with a ScoreMatrix of their scores,
+    read from the standings in a single query. Each entry in entries also has
+    score_info, the scores as a list of dicts in the order they were entered.
+    """
+
+    def __init__(self, tournament_id):
+        self.tournament_id = tournament_id
+        self.categories = []
+        self.entries = []
+        sums = []
+        max_totals = []
+        entered = []
+
+        # A row for every entry and category, in order
+        for entry, category, standing in db.session.query(
+                TournamentEntry, ScoreCategory, Standing).\
+                outerjoin(ScoreCategory, ScoreCategory.tournament_id == \
+                    TournamentEntry.tournament_id).\
+                outerjoin(Standing, and_(
+                    Standing.entry_id == TournamentEntry.id,
+                    Standing.score_category_id == ScoreCategory.id)).\
+                filter(TournamentEntry.tournament_id == tournament_id).\
+                order_by(TournamentEntry.id, ScoreCategory.id):
+            if not self.entries or self.entries[-1] is not entry:
+                self.entries.append(entry)
+                sums.append([])
+                max_totals.append([])
+                entered.append([])
+            if category is None:
+                continue
+            if len(self.entries) == 1:
+                self.categories.append(category)
+            sums[-1].append(standing.total if standing is not None else 0)
+            max_totals[-1].append(
+                standing.max_total if standing is not None else 0)
+            if standing is not None:
+                entered[-1].extend(
+                    (score_id, value, category) for score_id, value in \
+                    zip(standing.score_ids, standing.score_values))
+
+        self.matrix = ScoreMatrix.from_sums(self.entries, self.categories,
+                                            sums, max_totals)
+
+        for entry, scores in zip(self.entries, entered):
+            entry.score_info = [{
+                'score': value,
+                'category': category.name,
+                'min_val': category.min_val,
+                'max_val': category.max_val,
+            } for _, value, category in sorted(scores, key=lambda x: x[0])]
@@ -2,7 +2,7 @@
 Module to contain table allocation strategy
 """
 
-import itertools
+from models.linear_assignment import minimum_cost_assignment
 
 class LayoutProtest(object):
     """
@@ -49,8 +49,8 @@ class Table(object):
 
 class ProtestAvoidanceStrategy(object):
     """
-    Allocate tables by determining all possible options and allocating based on
-    fewest protests.
+    Allocate tables by costing every game on every table and allocating based
+    on fewest protests.
 
     Algorithm:
         Protest:
@@ -62,8 +62,11 @@ class ProtestAvoidanceStrategy(object):
             - A layout is a single possible configuration of entrants on
             tables. Essentially this is one candidate for final configuration.
         Allocation:
-            - For all possible layouts, determine the aggregate protest
-            - The least protested layout is chosen
+            - The protest score of each game on each table is costed
+            - Finding the least protested layout is then an assignment of
+            games to tables, solved with the Hungarian method
+            - Where layouts tie, games stay as close to the order they were
+            drawn in as possible
         Variations:
             - There are four obvious variations:
                 - Avoid double protests - Least Outrage
@@ -72,15 +75,28 @@ class ProtestAvoidanceStrategy(object):
                 real advantage)
                 - Avoid no protests - least variety
                 - Lowest aggregate protest - Utility happiness
+            - Each variation first minimises the count of games it avoids,
+            then the aggregate protest.
         Time-complexity:
             - n3 for n games
         Memory Complexity:
-            - 4 * n3 integers for n games.
+            - n2 integers for n games.
         Potential Trade-off:
             A reasonably complex select to get table history for each player
             could be stored with the entry.
     """
 
+    LEAST_OUTRAGE = 'least_outrage'
+    SPLIT = 'split'
+    LEAST_VARIETY = 'least_variety'
+    UTILITY = 'utility'
+
+    def __init__(self, variation=UTILITY):
+        if variation not in (self.LEAST_OUTRAGE, self.SPLIT,
+                             self.LEAST_VARIETY, self.UTILITY):
+            raise ValueError('Unknown protest variation: {}'.format(variation))
+        self.variation = variation
+
     @staticmethod
     def get_protest_score_for_layout(layout):
         """
@@ -105,7 +121,22 @@ class ProtestAvoidanceStrategy(object):
 
         return protest
 
-    # pylint: disable=R0201
+    def protest_cost(self, protests, num_entries, num_games):
+        """
+        The cost of a game with protests on a table. The games the variation
+        avoids cost more than any layout's aggregate protest can.
+        """
+        avoided = {
+            self.LEAST_OUTRAGE: num_entries,
+            self.SPLIT: 1,
+            self.LEAST_VARIETY: 0,
+        }.get(self.variation)
+
+        cost = protests
+        if protests == avoided:
+            cost += num_entries * num_games + 1
+        return cost
+
     def determine_tables(self, drawn_games):
         """
         The main method that returns a table configuration.
@@ -119,18 +150,48 @@ class ProtestAvoidanceStrategy(object):
         Returns:
             A list of Table
         """
-        permutations = list(itertools.permutations(drawn_games))
-        permutations = [
-            [Table(i+1, list(e)) for i, e in enumerate(x)] \
-            for x in permutations]
+        num_games = len(drawn_games)
+        if num_games == 0:
+            return []
+
+        num_entries = len(drawn_games[0])
+        if any(len(x) != num_entries for x in drawn_games):
+            raise IndexError('Some games have differing numbers of entries')
 
-        protests = [
-            (ProtestAvoidanceStrategy.get_protest_score_for_layout(x), x) \
-            for x in permutations
-        ]
+        # The distance of a game from its drawn position breaks ties, so it
+        # must never outweigh a single protest
+        scale = num_games ** 3 + 1
+        costs = [
+            [self.protest_cost(
+                Table(table + 1, list(game)).protest_score(),
+                num_entries,
+                num_games) * scale + (table - i) ** 2 \
+            for table in range(num_games)] \
+            for i, game in enumerate(drawn_games)]
 
-        protests.sort(cmp=lambda x, y: cmp(
-            x[0].total_protests(),
-            y[0].total_protests()))
+        tables = minimum_cost_assignment(costs)
 
-        return protests[0][1]
+        layout = num_games * [None]
+        for i, game in enumerate(drawn_games):
+            layout[tables[i]] = Table(tables[i] + 1, list(game))
+        return layout
+
+    @staticmethod
+    def greedy_tables(drawn_games):
+        """
+        A quick table configuration, for when determine_tables takes too
+        long. Each game, in order, takes the lowest numbered free table none
+        of its entrants have played on, or failing that the lowest numbered
+        free table. The variation is ignored.
+
+        Returns:
+            A list of Table
+        """
+        free = range(1, len(drawn_games) + 1)
+        layout = []
+        for game in drawn_games:
+            table = next((x for x in free \
+                if not Table(x, list(game)).protest_score()), free[0])
+            free.remove(table)
+            layout.append(Table(table, list(game)))
+        return sorted(layout, key=lambda x: x.table_number)
@@ -6,27 +6,36 @@ It holds a tournament object for housing of scoring strategies, etc.
 from datetime import date, datetime
 from json import dumps
 
+from sqlalchemy import func, select
 from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import aliased
 from sqlalchemy.sql.expression import and_
 
 from models.authentication import PermissionDeniedException
 from models.dao.db_connection import db
 from models.dao.game_entry import GameEntrant
+from models.dao.lookup import find_by
 from models.dao.matching_strategy import MatchingStrategy, \
 TournamentMatchingStrategy
 from models.dao.permissions import AccountProtectedObjectPermission, \
 ProtectedObject, ProtObjPerm
 from models.dao.registration import TournamentRegistration as Reg
 from models.dao.score import ScoreCategory
-from models.dao.table_allocation import TableAllocation
 from models.dao.tournament import Tournament as TournamentDAO
 from models.dao.tournament_entry import TournamentEntry
+from models.dao.tournament_game import TournamentGame
 from models.dao.tournament_round import TournamentRound as TR
 from models.matching_strategy import RoundRobin, SwissChess
+from models.opponent_history import OpponentHistory
 from models.permissions import PermissionsChecker
 from models.ranking_strategies import RankingStrategy
-from models.tournament_draw import TournamentDraw, DEFAULT_STRATEGY
+from models.score import Score
+from models.standings import Standings, rebuild_standings
+from models.tournament_config import CONFIG_CACHE
+from models.tournament_draw import DEFAULT_STRATEGY, DrawWriter, \
+PUBLISHED_DRAWS, TournamentDraw
 from models.tournament_round import TournamentRound
+from models.tournament_snapshot import TournamentSnapshot
 
 def must_exist_in_db(func):
     """ A decorator that requires the tournament exists in the db"""
@@ -34,6 +43,20 @@ def must_exist_in_db(func):
         return func(self.check_exists(), *args, **kwargs)
     return wrapped
 
+def changes_config(func):
+    """
+    A decorator for methods that change the tournament's configuration (see
+    models.tournament_config)
+    """
+    def wrapped(self, *args, **kwargs): # pylint: disable=missing-docstring
+        with CONFIG_CACHE.changing(self.tournament_id):
+            return func(self, *args, **kwargs)
+    return wrapped
+
+# Held while scores are entered, so the draw of a round is written once, by
+# the scores that complete the rounds before it
+DRAW_LOCK = 7468003
+
 PROGRESS_EXCEPTION = ValueError('You cannot perform this action on a '\
                                 'tournament that is in progress')
 def not_in_progress(func):
@@ -55,12 +78,18 @@ class Tournament(object):
 
     def __init__(self, tournament_id=None):
         self.tournament_id = tournament_id
+        # The TournamentConfig, as of the last check_exists
+        self.config = None
         self.ranking_strategy = RankingStrategy(tournament_id,
                                                 self.get_score_categories)
 
     def check_exists(self):
-        """Check that this Tournament has a corresponding DAO"""
-        if self.get_dao() is None:
+        """
+        Check that this Tournament has a corresponding DAO. Methods that
+        require this can then use self.config
+        """
+        self.config = self.get_config()
+        if self.config is None:
             print 'Tournament not found: {}'.format(self.tournament_id)
             raise ValueError('Tournament {} not found in database'.\
                 format(self.tournament_id))
@@ -68,7 +97,14 @@ class Tournament(object):
 
     def get_dao(self):
         """Convenience method to recover TournamentDAO"""
-        return TournamentDAO.query.filter_by(name=self.tournament_id).first()
+        return find_by(TournamentDAO, name=self.tournament_id)
+
+    def get_config(self):
+        """
+        The TournamentConfig, from the cache where it's up to date. None if
+        the tournament doesn't exist
+        """
+        return CONFIG_CACHE.get(self.tournament_id)
 
 
     @not_in_progress
@@ -120,7 +156,10 @@ class Tournament(object):
 
     @staticmethod
     def check_re_match(game):
-        """Check whether game is a re-match"""
+        """
+        Check whether game is a re-match against the db. This is for checking
+        a single game. Draws use an OpponentHistory instead.
+        """
         game = tuple([g for g in game if g['name'] != 'BYE'])
         #check for the bye
         p1_games = game[0]['entry'].game_entries.all()
@@ -163,67 +202,167 @@ class Tournament(object):
         Get details about a tournament. This includes entrants and format
         information
         """
-        details = self.get_dao()
+        config = self.config
 
         return {
-            'name': details.name,
-            'date': details.date,
-            'entries': self.get_dao().entries.count(),
-            'rounds': self.get_dao().rounds.count(),
-            'score_categories': self.get_score_categories(serialized=True)
+            'name': config.name,
+            'date': config.date,
+            'entries': TournamentEntry.query.\
+                filter_by(tournament_id=self.tournament_id).count(),
+            'rounds': config.rounds,
+            'score_categories': [dict(x) for x in config.score_categories]
         }
 
     @must_exist_in_db
     def get_draw(self):
         """Get the tournament draw for this tournament, if it exists"""
-        tourn_match_strat = self.get_dao().matching_strategy.first()
-        if tourn_match_strat is None:
+        strat = self.config.matching_strategy
+        if strat is None:
             self._set_matching_strategy(DEFAULT_STRATEGY)
+            strat = DEFAULT_STRATEGY
 
-        strat = tourn_match_strat.strategy.id
+        entries = self.get_entries()
 
         if strat == 'swiss_chess':
-            match = SwissChess(rank=self.ranking_strategy.total_score,
-                               re_match=self.check_re_match)
+            totals = self.ranking_strategy.total_scores(entries)
+            history = OpponentHistory.for_tournament(self.tournament_id)
+            match = SwissChess(rank=lambda entry: totals[entry.id],
+                               history=history)
             draw = TournamentDraw(matching_strategy=match)
         elif strat == DEFAULT_STRATEGY:
             draw = TournamentDraw(matching_strategy=RoundRobin())
-        return draw.set_entries(self.get_entries())
+        return draw.set_entries(entries)
 
     @must_exist_in_db
-    def get_entries(self):
-        """Get a list of Entry"""
+    def get_published_draw(self, round_num):
+        """
+        The draw and mission for a round:
+            {'draw': [{'table_number': 1, 'entrants': ['homer', 'BYE']}],
+             'mission': 'TBA'}
+
+        The draw is only ever read, never made. Draws are written by
+        set_in_progress and, for swiss chess, by the scores that publish the
+        round (see enter_scores). Once a round is published (see
+        is_published) its draw can't change, so it is read from
+        PUBLISHED_DRAWS without touching the db.
+        """
+        config = self.config
+        round_num = int(round_num)
+        if round_num not in range(1, config.rounds + 1):
+            raise ValueError('Tournament {} does not have a round {}'.format(
+                self.tournament_id, round_num))
+
+        key = (config.id, config.version, round_num)
+        draw = PUBLISHED_DRAWS.get(key)
+        if draw is not None:
+            return draw
+
+        rnd = TournamentRound(self.tournament_id, round_num)
+        published = self.is_published(round_num) \
+            or DrawWriter(rnd.get_dao()).is_locked()
+
+        draw = rnd.read_draw()
+        mission = config.missions[round_num - 1]
+        if not draw and rnd.get_dao().mission is None:
+            raise AttributeError('No draw is available')
+
+        draw = {'draw': draw, 'mission': mission}
+        if published:
+            PUBLISHED_DRAWS.add(key, draw)
+        return draw
+
+    @must_exist_in_db
+    def enter_scores(self, batch):
+        """
+        Write a ScoreBatch. Returns a message for each score.
+
+        For swiss chess, scores that complete the rounds before a round
+        publish it. Its draw is written then, in the same transaction as the
+        scores, and never again. The transaction holds DRAW_LOCK for the
+        tournament, so only one batch can complete a round.
+        """
+        return self._write_scores(batch)
+
+    @must_exist_in_db
+    def set_round_scores(self, round_num, scores):
+        """
+        Enter the scores for many entries in a round at once (see
+        TournamentRound.score_batch and enter_scores). Returns a message for
+        each score, one per line
+        """
+        if int(round_num) not in range(1, self.config.rounds + 1):
+            raise ValueError('Tournament {} does not have a round {}'.format(
+                self.tournament_id, round_num))
+        batch = TournamentRound(self.tournament_id, round_num).\
+            score_batch(scores)
+        return '\n'.join(self._write_scores(batch))
+
+    def _write_scores(self, batch):
+        """See enter_scores"""
+        if self.config.matching_strategy != 'swiss_chess':
+            return batch.write()
+
+        db.session.execute(select([
+            func.pg_advisory_xact_lock(DRAW_LOCK, self.get_dao().id)]))
+        complete = self._complete_rounds()
+        messages = batch.write(commit=False)
+        now_complete = self._complete_rounds()
+
+        published = [x for x in range(2, self.config.rounds + 1) \
+            if now_complete.issuperset(range(1, x)) \
+            and not complete.issuperset(range(1, x))]
+        for round_num in published:
+            rnd = self.get_round(round_num)
+            if not DrawWriter(rnd.get_dao()).is_locked():
+                # Committing would release the lock before the last round
+                self.get_draw().set_round(rnd).make_draw(commit=False)
+        db.session.commit()
+        return messages
 
-        entries = TournamentEntry.query.\
-            filter_by(tournament_id=self.tournament_id).all()
-        for entry in entries:
-            entry.game_history = [x.table_no for x in \
-                TableAllocation.query.filter_by(entry_id=entry.id)]
-            entry.score_info = [
-                {
-                    'score': x.value,
-                    'category': x.score_category.name,
-                    'min_val': x.score_category.min_val,
-                    'max_val': x.score_category.max_val,
-                } for x in entry.scores
-            ]
+    def _complete_rounds(self):
+        """The set of rounds with every game complete"""
+        incomplete = set(x for x, in db.session.query(TR.ordering).\
+            join(TournamentGame).filter(
+                TR.tournament_name == self.tournament_id,
+                TournamentGame.score_entered.isnot(True)).distinct())
+        return set(range(1, self.config.rounds + 1)) - incomplete
 
-        return entries
+    @must_exist_in_db
+    def is_published(self, round_num):
+        """
+        Whether the draw for a round is final. This is once the tournament is
+        in progress and the draw can no longer change:
+            - round robin draws depend only on the entries
+            - swiss chess draws depend on the scores of the earlier rounds so
+            those rounds must be complete
+        """
+        if not self.get_dao().in_progress:
+            return False
+        if self.config.matching_strategy != 'swiss_chess':
+            return True
+        return TournamentGame.query.join(TR).filter(
+            TR.tournament_name == self.tournament_id,
+            TR.ordering < int(round_num),
+            TournamentGame.score_entered.isnot(True)).first() is None
 
+    @must_exist_in_db
+    def get_entries(self):
+        """Get a list of Entry"""
+        return self.get_snapshot().entries
 
     @must_exist_in_db
     def get_missions(self):
         """Get all the missions for the tournament. List ordered by ordering"""
-        if self.get_dao().rounds.count() == 0:
+        missions = self.config.missions
+        if len(missions) == 0:
             raise ValueError('Please set the number of rounds for {} first'.\
                 format(self.tournament_id))
-        return [x.get_mission()
-                for x in self.get_dao().rounds.order_by('ordering')]
+        return list(missions)
 
     @must_exist_in_db
     def get_round(self, round_num):
         """Get the relevant TournamentRound"""
-        if int(round_num) not in range(1, self.get_dao().rounds.count() + 1):
+        if int(round_num) not in range(1, self.config.rounds + 1):
             raise ValueError('Tournament {} does not have a round {}'.format(
                 self.tournament_id, round_num))
 
@@ -239,21 +378,32 @@ class Tournament(object):
         [{ 'name': 'Painting', 'percentage': 20, 'id': 1,
            'per_tournament': False }]
         """
-        cats = ScoreCategory.query.\
-            filter_by(tournament_id=self.tournament_id).all()
-        return [{
-            'id':             x.id,
-            'name':           x.name,
-            'percentage':     x.percentage,
-            'per_tournament': x.per_tournament,
-            'min_val':        x.min_val,
-            'max_val':        x.max_val,
-            'zero_sum':       x.zero_sum,
-            'opponent_score': x.opponent_score
-        } for x in cats] if serialized else cats
+        if serialized:
+            return [dict(x) for x in self.config.score_categories]
+        return self.config.get_score_categories()
 
 
     @must_exist_in_db
+    def get_standings(self):
+        """
+        Get the entries ranked from the Standings, rather than summing their
+        scores
+        """
+        standings = Standings(self.tournament_id)
+        return self.ranking_strategy.overall_ranking(
+            standings.entries, matrix=standings.matrix)
+
+    @must_exist_in_db
+    def get_snapshot(self):
+        """
+        Get a TournamentSnapshot of the entries, table history and scores for
+        the tournament
+        """
+        return TournamentSnapshot(self.tournament_id)
+
+
+    @must_exist_in_db
+    @changes_config
     def _set_details(self, details):
         """
         Set details for the tournament. Exceptions will be thrown when
@@ -325,12 +475,16 @@ class Tournament(object):
         if len(self.get_score_categories()) < 1:
             raise ValueError('You need to set the score categories')
 
+        # Registrations don't redraw so the draws are brought up to date here
+        self.get_draw().make_draws(self)
+
         self.get_dao().in_progress = True
         db.session.add(self.get_dao())
         db.session.commit()
 
     @must_exist_in_db
     @not_in_progress
+    @changes_config
     def _set_matching_strategy(self, strat):
         """
         Set the matching_strategy for entries
@@ -345,6 +499,7 @@ class Tournament(object):
         db.session.commit()
 
     @must_exist_in_db
+    @changes_config
     def _set_missions(self, missions=None):
         """ Set missions for tournament. Must set a mission for each round"""
         rounds = self.get_dao().rounds.count()
@@ -364,6 +519,7 @@ class Tournament(object):
 
     @must_exist_in_db
     @not_in_progress
+    @changes_config
     def _set_rounds(self, num_rounds):
         """Set the number of rounds in a tournament"""
         num_rounds = int(num_rounds)
@@ -382,6 +538,7 @@ class Tournament(object):
 
     @must_exist_in_db
     @not_in_progress
+    @changes_config
     def _set_score_categories(self, new_categories):
         """
         Replace the existing score categories with those from the list. The list
@@ -421,6 +578,8 @@ class Tournament(object):
                     filter_by(tournament_id=self.tournament_id,
                               name=cat['name']).first().clashes()
 
+            Score.recount_games(self.tournament_id)
+            rebuild_standings(self.tournament_id)
             db.session.commit()
         except ValueError:
             db.session.rollback()
@@ -456,17 +615,89 @@ class Tournament(object):
 
 def all_tournaments_with_permission(action, username):
     """Find all tournaments where user has action. Returns list"""
-    all_tournaments = TournamentDAO.query.\
+    all_tournaments = db.session.query(TournamentDAO.name).\
         filter(TournamentDAO.date >= date.today()).\
         order_by(TournamentDAO.date.asc()).all()
+    # The user's grants are loaded once and each check is then in memory
     checker = PermissionsChecker()
     modifiable_tournaments = []
 
-    for tourn in all_tournaments:
+    for (name,) in all_tournaments:
         try:
-            if checker.check_permission(action, username, None, tourn.name):
-                modifiable_tournaments.append(tourn.name)
+            if checker.check_permission(action, username, None, name):
+                modifiable_tournaments.append(name)
         except PermissionDeniedException:
             pass
 
     return modifiable_tournaments
+
+
+# pylint: disable=too-many-arguments,too-many-locals
+def tournament_listing(username=None, page=1, per_page=50, date_from=None,
+                       date_to=None):
+    """
+    A page of tournaments, ordered by name, in a single query. Returns a dict:
+        - tournaments - list of dicts with name, date, rounds, entries and
+        user_entered (whether username has entered)
+        - page, per_page
+        - total - the number of tournaments on all pages
+
+    date_from and date_to are optional inclusive date limits. With a per_page
+    of None every tournament is listed, on one page.
+    """
+    page = int(page)
+    per_page = int(per_page) if per_page is not None else None
+    if page < 1 or (per_page is not None and not 1 <= per_page <= 500):
+        raise ValueError('page must be at least 1 and per_page 1 to 500')
+
+    rounds = db.session.query(
+        TR.tournament_name.label('tournament'),
+        func.count().label('rounds')).\
+        group_by(TR.tournament_name).subquery()
+    entries = db.session.query(
+        TournamentEntry.tournament_id.label('tournament'),
+        func.count().label('entries')).\
+        group_by(TournamentEntry.tournament_id).subquery()
+    user_entry = aliased(TournamentEntry)
+
+    query = db.session.query(
+        TournamentDAO.name,
+        TournamentDAO.date,
+        func.coalesce(rounds.c.rounds, 0),
+        func.coalesce(entries.c.entries, 0),
+        user_entry.id.isnot(None),
+        func.count().over()).\
+        outerjoin(rounds, rounds.c.tournament == TournamentDAO.name).\
+        outerjoin(entries, entries.c.tournament == TournamentDAO.name).\
+        outerjoin(user_entry, and_(user_entry.tournament_id == \
+            TournamentDAO.name, user_entry.player_id == username))
+    if date_from is not None:
+        query = query.filter(TournamentDAO.date >= date_from)
+    if date_to is not None:
+        query = query.filter(TournamentDAO.date <= date_to)
+    rows = query.order_by(TournamentDAO.name)
+    if per_page is not None:
+        rows = rows.limit(per_page).offset((page - 1) * per_page)
+    rows = rows.all()
+
+    if rows:
+        total = rows[0][5]
+    elif page == 1:
+        total = 0
+    else:
+        # Past the last page, so there was no row to count with
+        total = query.count()
+
+    return {
+        'tournaments': [{
+            'name': name,
+            'date': tourn_date,
+            'rounds': num_rounds,
+            'entries': num_entries,
+            'user_entered': user_entered
+        } for name, tourn_date, num_rounds, num_entries, user_entered, _ \
+        in rows],
+        'page': page,
+        'per_page': per_page,
+        'total': total,
+    }
@@ -0,0 +1,168 @@
+"""
+A cache of tournament configuration
+
+A tournament's date, rounds, missions, score categories and matching strategy
+are set before the event and read on nearly every request during it. They
+are kept here, per process, rather than re-queried each time.
+
+Each tournament has a config_version, taken from a sequence. Whatever
+changes the configuration does so inside ConfigCache.changing, which gives
+the tournament a new version before and after the change. Cached
+configuration is only used while its version matches the db, so every
+process sees a change as soon as it is committed. The check is a single
+narrow query.
+
+Configuration read while a change is under way isn't cached, as the change
+may yet be rolled back or carry on after the read.
+"""
+from collections import OrderedDict
+from contextlib import contextmanager
+import os
+import threading
+
+from sqlalchemy import func
+from sqlalchemy.orm import make_transient_to_detached
+
+from models.dao.db_connection import db
+from models.dao.matching_strategy import TournamentMatchingStrategy
+from models.dao.score import ScoreCategory
+from models.dao.tournament import Tournament
+from models.dao.tournament_round import TournamentRound
+
+# The ScoreCategory columns kept for each category
+CATEGORY_FIELDS = ['id', 'name', 'percentage', 'per_tournament', 'min_val',
+                   'max_val', 'zero_sum', 'opponent_score']
+# Session info key for the tournaments being changed, with how deeply nested
+# the changes are
+CHANGING = 'tournament_config_changing'
+
+# pylint: disable=no-member,too-few-public-methods
+class TournamentConfig(object):
+    """
+    The configuration of a tournament as plain values:
+        - id, name, date and version
+        - missions - the mission for each round, in order ('TBA' if unset)
+        - score_categories - a dict of CATEGORY_FIELDS for each category
+        - matching_strategy - the strategy id or None
+    """
+
+    def __init__(self, tournament_dao, version):
+        self.id = tournament_dao.id             # pylint: disable=invalid-name
+        self.name = tournament_dao.name
+        self.date = tournament_dao.date
+        self.version = version
+
+        self.missions = [x.get_mission() for x in TournamentRound.query.\
+            filter_by(tournament_name=self.name).\
+            order_by(TournamentRound.ordering)]
+        self.score_categories = [
+            dict((field, getattr(x, field)) for field in CATEGORY_FIELDS) \
+            for x in ScoreCategory.query.filter_by(tournament_id=self.name).\
+            order_by(ScoreCategory.id)]
+        strategy = db.session.query(
+            TournamentMatchingStrategy.matching_strategy).\
+            filter_by(tournament_id=self.id).first()
+        self.matching_strategy = strategy[0] if strategy else None
+
+    @property
+    def rounds(self):
+        """The number of rounds"""
+        return len(self.missions)
+
+    def get_score_categories(self):
+        """
+        The ScoreCategory DAOs, merged into the current session without
+        querying the db
+        """
+        cats = []
+        for fields in self.score_categories:
+            cat = ScoreCategory(tournament_id=self.name, **fields)
+            cat.id = fields['id']
+            make_transient_to_detached(cat)
+            cats.append(db.session.merge(cat, load=False))
+        return cats
+
+
+class ConfigCache(object):
+    """
+    TournamentConfig for recently used tournaments, by name. The least
+    recently used are dropped once there are more than max_size.
+    """
+
+    def __init__(self, max_size=256):
+        self.max_size = max_size
+        self.configs = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, name):
+        """The TournamentConfig for tournament name, or None if it doesn't
+        exist"""
+        current = db.session.query(Tournament.id, Tournament.config_version).\
+            filter_by(name=name).first()
+        if current is None:
+            return None
+
+        with self.lock:
+            config = self.configs.pop(name, None)
+            if config is not None and (config.id, config.version) == current:
+                self.configs[name] = config
+                return config
+
+        # The version is the one just read. The DAO's may be out of date
+        config = TournamentConfig(Tournament.query.get(current[0]), current[1])
+        if db.session.info.get(CHANGING, {}).get(name):
+            return config
+        with self.lock:
+            self.configs.pop(name, None)
+            self.configs[name] = config
+            while len(self.configs) > self.max_size:
+                self.configs.popitem(last=False)
+        return config
+
+    @contextmanager
+    def changing(self, name):
+        """
+        Change the configuration of tournament name within the block. Blocks
+        can be nested.
+
+        The tournament gets a new version at the start, which is committed
+        with the first part of the change. Nothing is cached until the change
+        is over, at which point the tournament gets a new version again. This
+        is committed if the change succeeded, so that anything read while it
+        was part done isn't mistaken for the result.
+        """
+        changing = db.session.info.setdefault(CHANGING, {})
+        if not changing.get(name):
+            self.invalidate(name)
+        changing[name] = changing.get(name, 0) + 1
+
+        succeeded = False
+        try:
+            yield
+            succeeded = True
+        finally:
+            changing[name] -= 1
+            if not changing[name]:
+                del changing[name]
+                self.invalidate(name)
+                if succeeded:
+                    db.session.commit()
+
+    def invalidate(self, name):
+        """
+        Give tournament name a new version. This is committed along with the
+        rest of the transaction.
+        """
+        Tournament.query.filter_by(name=name).update(
+            {Tournament.config_version: \
+             func.nextval('tournament_config_version_seq')},
+            synchronize_session=False)
+        with self.lock:
+            self.configs.pop(name, None)
+
+    def clear(self):
+        """Forget everything"""
+        with self.lock:
+            self.configs.clear()
+
+CONFIG_CACHE = ConfigCache(int(os.environ.get('TOURNAMENT_CACHE_SIZE', 256)))
@@ -4,13 +4,24 @@ A Tournament Draw
 This is responsible for allocating players and matchups through a tournament.
 """
 
+from collections import defaultdict, OrderedDict
+import hashlib
+import os
+import threading
+
+from sqlalchemy import func, tuple_
+
 from models.dao.game_entry import GameEntrant
+from models.dao.job import report_progress
 from models.dao.db_connection import db
+from models.dao.permissions import AccountProtectedObjectPermission, \
+ProtectedObject, ProtObjAction, ProtObjPerm
 from models.dao.tournament_entry import TournamentEntry
 from models.dao.tournament_game import TournamentGame
 
+from models.draw_pool import DRAW_POOL
 from models.matching_strategy import RoundRobin
-from models.permissions import PermissionsChecker, PERMISSIONS
+from models.permissions import PERMISSIONS
 from models.table_strategy import ProtestAvoidanceStrategy
 
 DEFAULT_STRATEGY = 'round_robin'
@@ -20,6 +31,224 @@ class DrawException(Exception):
     pass
 
 # pylint: disable=no-member
+class DrawWriter(object):
+    """
+    Writes a draw for a round to the db. The draw is compared with the games
+    already in the db and only the differences are written. Each kind of
+    change is a batched statement, rather than one per game, and everything is
+    committed in a single transaction.
+
+    Games with scores entered cannot be changed (a DrawException is raised).
+    """
+
+    def __init__(self, round_dao):
+        self.round_dao = round_dao
+        self.action_id = ProtObjAction.query.\
+            filter_by(description=PERMISSIONS['ENTER_SCORE']).first().id
+
+    def is_locked(self):
+        """Whether any game in the round, other than a bye, has scores"""
+        return db.session.query(GameEntrant.game_id).join(TournamentGame).\
+            filter(TournamentGame.tournament_round_id == self.round_dao.id,
+                   TournamentGame.score_entered).\
+            group_by(GameEntrant.game_id).\
+            having(func.count(GameEntrant.entrant_id) > 1).first() is not None
+
+    def write(self, draw, commit=True):
+        """
+        Make the games for the round match draw, a list of Table.
+
+        If commit is False the games are only flushed, for the caller to
+        commit along with anything else in the transaction.
+        """
+        games = dict((x.table_num, x) for x in TournamentGame.query.\
+            filter_by(tournament_round_id=self.round_dao.id))
+        wanted = dict((t.table_number, [x for x in t.entrants if x != 'BYE']) \
+            for t in draw)
+
+        current = defaultdict(set)
+        if games:
+            for game_entrant in GameEntrant.query.filter(GameEntrant.game_id.\
+                    in_([x.id for x in games.values()])):
+                current[game_entrant.game_id].add(game_entrant.entrant_id)
+
+        stale = [x for num, x in games.items() if num not in wanted]
+        additions = []          # (game, entry) pairs
+        removals = []           # (game, entry_id) pairs
+        changed = []            # (game, has a bye) pairs
+        for table in draw:
+            game = games.get(table.table_number)
+            entrants = wanted[table.table_number]
+            if game is None:
+                additions.extend((table, x) for x in entrants)
+                continue
+
+            wanted_ids = set(x.id for x in entrants)
+            if wanted_ids == current[game.id]:
+                continue
+            changed.append((game, len(entrants) < len(table.entrants)))
+            additions.extend((game, x) for x in entrants \
+                if x.id not in current[game.id])
+            removals.extend((game, x) for x in current[game.id] \
+                if x not in wanted_ids)
+
+        for game in stale + [x for x, _ in changed]:
+            if game.score_entered and len(current[game.id]) > 1:
+                raise DrawException()
+        for game, bye in changed:
+            # The person playing the bye gets no points at the time
+            game.score_entered = bye
+
+        new_games = self._add_games(
+            [t for t in draw if t.table_number not in games])
+        additions = [(new_games.get(id(x), x), entry) \
+            for x, entry in additions]
+
+        self._remove_entrants(removals)
+        self._remove_games(stale)
+        self._add_entrants(additions)
+        if commit:
+            db.session.commit()
+        else:
+            db.session.flush()
+
+    def _add_games(self, tables):
+        """Create games for tables. Returns a dict of id(table) to the game"""
+        if not tables:
+            return {}
+
+        prot_objs = [ProtectedObject() for _ in tables]
+        db.session.add_all(prot_objs)
+        db.session.flush()
+
+        new_games = {}
+        for table, prot_obj in zip(tables, prot_objs):
+            game = TournamentGame(self.round_dao.id, table.table_number,
+                                  prot_obj)
+            # The person playing the bye gets no points at the time
+            game.score_entered = 'BYE' in table.entrants
+            new_games[id(table)] = game
+        db.session.add_all(new_games.values())
+        db.session.add_all(
+            [ProtObjPerm(x.id, self.action_id) for x in prot_objs])
+        db.session.flush()
+        return new_games
+
+    def _permissions(self, games):
+        """The ENTER_SCORE ProtObjPerm of each game, by protected object"""
+        ids = set(x.protected_object_id for x in games)
+        if not ids:
+            return {}
+        return dict((x.protected_object_id, x) for x in ProtObjPerm.query.\
+            filter(ProtObjPerm.protected_object_id.in_(ids),
+                   ProtObjPerm.protected_object_action_id == self.action_id))
+
+    def _add_entrants(self, additions):
+        """Add entries to games, giving them permission to enter scores"""
+        if not additions:
+            return
+
+        perms = self._permissions([game for game, _ in additions])
+        missing = set(game.protected_object_id for game, _ in additions \
+            if game.protected_object_id not in perms)
+        for prot_obj_id in missing:
+            perms[prot_obj_id] = ProtObjPerm(prot_obj_id, self.action_id)
+        db.session.add_all([perms[x] for x in missing])
+        db.session.flush()
+
+        db.session.add_all([GameEntrant(game.id, entry.id) \
+            for game, entry in additions])
+        db.session.add_all([AccountProtectedObjectPermission(
+            entry.player_id, perms[game.protected_object_id].id) \
+            for game, entry in additions])
+        db.session.flush()
+
+    def _remove_entrants(self, removals):
+        """Remove entries from games along with their permissions"""
+        if not removals:
+            return
+
+        usernames = dict(db.session.query(
+            TournamentEntry.id, TournamentEntry.player_id).\
+            filter(TournamentEntry.id.in_(set(x for _, x in removals))))
+        perms = self._permissions([game for game, _ in removals])
+
+        grants = [(usernames[entry_id], perms[game.protected_object_id].id) \
+            for game, entry_id in removals \
+            if game.protected_object_id in perms]
+        if grants:
+            AccountProtectedObjectPermission.query.filter(tuple_(
+                AccountProtectedObjectPermission.account_username,
+                AccountProtectedObjectPermission.\
+                protected_object_permission_id).in_(grants)).\
+                delete(synchronize_session=False)
+        GameEntrant.query.filter(tuple_(
+            GameEntrant.game_id, GameEntrant.entrant_id).in_(
+                [(game.id, entry_id) for game, entry_id in removals])).\
+            delete(synchronize_session=False)
+
+    def _remove_games(self, games):
+        """Remove games along with their entrants and permissions"""
+        if not games:
+            return
+
+        game_ids = [x.id for x in games]
+        prot_obj_ids = [x.protected_object_id for x in games]
+        perm_ids = db.session.query(ProtObjPerm.id).\
+            filter(ProtObjPerm.protected_object_id.in_(prot_obj_ids))
+
+        AccountProtectedObjectPermission.query.filter(
+            AccountProtectedObjectPermission.protected_object_permission_id.\
+            in_(perm_ids)).delete(synchronize_session=False)
+        ProtObjPerm.query.filter(ProtObjPerm.protected_object_id.\
+            in_(prot_obj_ids)).delete(synchronize_session=False)
+        GameEntrant.query.filter(GameEntrant.game_id.in_(game_ids)).\
+            delete(synchronize_session=False)
+        for game in games:
+            db.session.expunge(game)
+        TournamentGame.query.filter(TournamentGame.id.in_(game_ids)).\
+            delete(synchronize_session=False)
+        ProtectedObject.query.filter(ProtectedObject.id.in_(prot_obj_ids)).\
+            delete(synchronize_session=False)
+
+
+class PublishedDraws(object):
+    """
+    The draws of published rounds, as returned by GET, by (tournament id,
+    config version, round). A published draw never changes, and a change to
+    the tournament's configuration (e.g. its missions) changes the key. The
+    least recently used are dropped once there are more than max_size.
+    """
+
+    def __init__(self, max_size=1024):
+        self.max_size = max_size
+        self.draws = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        """The draw for key, or None"""
+        with self.lock:
+            draw = self.draws.pop(key, None)
+            if draw is not None:
+                self.draws[key] = draw
+            return draw
+
+    def add(self, key, draw):
+        """Remember the published draw for key"""
+        with self.lock:
+            self.draws.pop(key, None)
+            self.draws[key] = draw
+            while len(self.draws) > self.max_size:
+                self.draws.popitem(last=False)
+
+    def clear(self):
+        """Forget everything"""
+        with self.lock:
+            self.draws.clear()
+
+PUBLISHED_DRAWS = PublishedDraws(int(os.environ.get('DRAW_CACHE_SIZE', 1024)))
+
+
 class TournamentDraw(object):
     """Matches players and tables throughout the tournament"""
 
@@ -33,103 +262,67 @@ class TournamentDraw(object):
         self.current_round = None
         self.entries = []
 
-    def destroy_draw(self):
-        """
-        Removes the draw for current_round.
+    def make_draws(self, tourn):
         """
-        rd_dao = self.current_round.get_dao()
-
-        for game in TournamentGame.query.\
-                filter_by(tournament_round_id=rd_dao.id).all():
-            if game.score_entered and len(game.entrants.all()) > 1: # not a BYE
-                raise DrawException()
-
-            for game_entrant in game.entrants:
-                PermissionsChecker().remove_permission(
-                    game_entrant.entrant.player_id,
-                    PERMISSIONS['ENTER_SCORE'],
-                    game.protected_object)
-            game.entrants.delete()
+        Makes the draws for all rounds.
 
-        TournamentGame.query.filter_by(tournament_round_id=rd_dao.id).delete()
-        db.session.commit()
+        The draws are redrawn in place. A round is only redrawn if its inputs
+        (see draw_inputs) have changed since it was last drawn, and then only
+        the games that differ from those already in the db are written.
+        Rounds with scores entered are not redrawn at all. Progress is
+        reported a round at a time.
+        """
+        num_rounds = tourn.get_dao().rounds.count()
+        for rnd in range(0, num_rounds):
+            model = tourn.get_round(rnd + 1)
+            self.set_round(model)
+            inputs = self.draw_inputs()
+            unchanged = inputs is not None and \
+                inputs == model.get_dao().draw_inputs
+            if not unchanged and not DrawWriter(model.get_dao()).is_locked():
+                try:
+                    model.draw = self.make_draw()
+                except DrawException:
+                    pass
+            report_progress(rnd + 1, num_rounds)
 
-    def make_draws(self, tourn):
-        """Makes the draws for all rounds"""
-        # If we can we determine all rounds
-        for rnd in range(0, tourn.get_dao().rounds.count()):
-            try:
-                model = tourn.get_round(rnd + 1)
-                self.set_round(model)
-                self.destroy_draw()
-                self.set_entries(self.entries)
-                model.draw = self.make_draw()
-            except DrawException:
-                pass
-
-    def make_draw(self):
-        """Finalise the draw, based on current round number"""
+    def make_draw(self, commit=True):
+        """
+        Finalise the draw, based on current round number. If commit is False
+        the draw is only flushed (see DrawWriter.write). How good the draw is
+        can be read from the matching strategy's report afterwards, if it
+        keeps one (see SwissChess)
+        """
         if self.current_round is None:
             raise ValueError
         rd_dao = self.current_round.get_dao()
 
-        match_ups = self.matching_strategy.match(self.entries)
-        draw = self.table_strategy.determine_tables(match_ups)
-        for match in draw:
-
-            entrants = [None if x == 'BYE' else x for x in match.entrants]
-
-            game = TournamentGame.query.filter_by(
-                tournament_round_id=rd_dao.id,
-                table_num=match.table_number).first()
-            if game is None:
-                game = TournamentGame(rd_dao.id, match.table_number)
-                db.session.add(game)
-                db.session.flush()
-
-            for entrant in entrants:
-                if entrant is not None:
-                    dao = TournamentEntry.query.\
-                        filter_by(id=entrant.id).first()
-                    game_entrant = GameEntrant.query.filter_by(
-                        game_id=game.id, entrant_id=dao.id).first()
-                    if game_entrant is None:
-                        db.session.add(GameEntrant(game.id, dao.id))
-                        PermissionsChecker().add_permission(
-                            dao.player_id,
-                            PERMISSIONS['ENTER_SCORE'],
-                            game.protected_object)
-                else:
-                    # The person playing the bye gets no points at the time
-                    game.score_entered = True
-                    db.session.add(game)
-
-        db.session.commit()
+        draw = DRAW_POOL.make_draw(self.matching_strategy, self.table_strategy,
+                                   self.entries)
+        rd_dao.draw_inputs = self.draw_inputs()
+        DrawWriter(rd_dao).write(draw, commit)
         return draw
 
-    def get_draw(self):
+    def draw_inputs(self):
         """
-        Return the draw for a given round
-        """
-        no_draw = AttributeError('No draw is available')
-        draw = self.make_draw()
-        if draw is None:
-            raise no_draw
-
-        draw_info = [
-            {'table_number': t.table_number,
-             'entrants': [x if isinstance(x, str) else x.player_id \
-                          for x in t.entrants]
-            } for t in draw]
-
-        if not draw_info and self.current_round.get_dao().mission is None:
-            raise no_draw
-
-        return {
-            'draw': draw_info,
-            'mission': self.current_round.get_dao().get_mission()
-        }
+        A hash of everything the current round's draw is made from: the
+        strategies and the matching strategy's inputs, and each entry with
+        the tables it has played on. None if the matching strategy can't say
+        what its inputs are.
 
+        A draw made greedily, because the deadline was missed, is kept until
+        the inputs change like any other.
+        """
+        inputs = self.matching_strategy.draw_inputs(self.entries)
+        if inputs is None:
+            return None
+        return hashlib.sha1(repr((
+            type(self.matching_strategy).__name__,
+            type(self.table_strategy).__name__,
+            getattr(self.table_strategy, 'variation', None),
+            inputs,
+            [(x.id, getattr(x, 'game_history', None)) \
+             for x in self.entries]))).hexdigest()
 
     def set_entries(self, entries):
         """Define players available to play. Returns self"""
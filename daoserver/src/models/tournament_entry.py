@@ -4,8 +4,11 @@ Model of a tournament
 It holds a tournament object for housing of scoring strategies, etc.
 """
 from models.dao.account import Account
+from models.dao.game_entry import GameEntrant
 from models.dao.tournament_entry import TournamentEntry as DAO
-from models.score import Score
+from models.dao.tournament_game import TournamentGame
+from models.dao.tournament_round import TournamentRound
+from models.score import Score, ScoreBatch
 from models.tournament import Tournament
 
 class TournamentEntry(object):
@@ -18,7 +21,8 @@ class TournamentEntry(object):
     def get_dao(self):
         """Convenience method to recover TournamentEntry DAO"""
         # pylint: disable=no-member
-        return DAO.query.filter_by(id=self.entry_id).first()
+        return DAO.query.get(self.entry_id) if self.entry_id is not None \
+            else None
 
     @staticmethod
     def get_entry_id(tourn, username):
@@ -53,19 +57,21 @@ class TournamentEntry(object):
 
     def get_next_game(self):
         """Get the next game for given entry"""
-        games = [gent.game for gent in self.get_dao().game_entries]
-        games = sorted(games, key=lambda game: game.tournament_round.ordering)
+        # pylint: disable=no-member
+        game = TournamentGame.query.join(GameEntrant).join(TournamentRound).\
+            filter(GameEntrant.entrant_id == self.entry_id,
+                   TournamentGame.score_entered.isnot(True)).\
+            order_by(TournamentRound.ordering).first()
 
-        for game in games:
-            if not Score.is_score_entered(game):
-                return {
-                    'game_id': game.id,
-                    'mission': game.tournament_round.get_mission(),
-                    'round': game.tournament_round.ordering,
-                    'opponent': self.get_opponent_id(game),
-                    'table': game.table_num,
-                }
-        raise ValueError("Next game not scheduled. Check with the TO.")
+        if game is None:
+            raise ValueError("Next game not scheduled. Check with the TO.")
+        return {
+            'game_id': game.id,
+            'mission': game.tournament_round.get_mission(),
+            'round': game.tournament_round.ordering,
+            'opponent': self.get_opponent_id(game),
+            'table': game.table_num,
+        }
 
 
     def get_opponent(self, game):
@@ -176,16 +182,16 @@ class TournamentEntry(object):
             - game_id - The id of the game that the score is for
             - category - the category e.g. painting, round_6_battle
             - score - the score. Integer
+
+        The scores are written together. If any is invalid none are written.
         """
         if scores is None or not any(scores):
             raise ValueError(Score.INVALID_SCORE.format(None))
 
-        scores = [Score(entry_id=self.get_dao().id, tournament=self.tournament,
-                        **x) for x in scores]
-
+        batch = ScoreBatch(self.tournament.tournament_id)
         for score in scores:
-            score.validate()
-
-        messages = [s.write() for s in scores]
+            batch.add(self.entry_id, score.get('category'),
+                      score.get('score'), score.get('game_id'))
+        messages = self.tournament.enter_scores(batch)
 
         return messages[0] if len(messages) == 1 else '\n'.join(messages)
@@ -2,15 +2,18 @@
 Model of a Tournament Round
 """
 
+from collections import OrderedDict
+
 from sqlalchemy.sql.expression import and_
 
 from models.dao.db_connection import db
 from models.dao.game_entry import GameEntrant
 from models.dao.permissions import ProtObjAction, ProtObjPerm
+from models.dao.tournament_entry import TournamentEntry
 from models.dao.tournament_game import TournamentGame
 from models.dao.tournament_round import TournamentRound as DAO
 from models.permissions import PermissionsChecker, PERMISSIONS
-from models.score import Score
+from models.score import Score, ScoreBatch
 
 class TournamentRound(object):
     """A Collection of TournamentGame that constitute a round"""
@@ -45,8 +48,7 @@ class TournamentRound(object):
 
     def get_dao(self):
         """Convenience method to get the DAO"""
-        return DAO.query.filter_by(tournament_name=self.tournament_name,
-                                   ordering=self.ordering).first()
+        return DAO.query.get((self.tournament_name, self.ordering))
 
     def get_game_dao(self, table_num):
         """
@@ -60,9 +62,66 @@ class TournamentRound(object):
         """The round number"""
         return self.get_dao().ordering
 
+    def score_batch(self, scores):
+        """
+        A ScoreBatch of scores for many entries in the round at once, e.g.
+        from the score sheets for the round. Tournament.set_round_scores
+        writes it.
+
+        Expects a list of scores. Each should be a dict with keys:
+            - username - the player the score is for
+            - category - the category e.g. painting, round_6_battle
+            - score - the score. Integer
+            - game_id - optional. Per-game scores are for the player's game in
+            this round by default
+
+        The scores are written together. If any is invalid none are written.
+        """
+        if scores is None or not any(scores):
+            raise ValueError(Score.INVALID_SCORE.format(None))
+
+        usernames = set(x.get('username') for x in scores)
+        entries = dict(db.session.query(TournamentEntry.player_id,
+                                        TournamentEntry.id).filter(
+            TournamentEntry.tournament_id == self.tournament_name,
+            TournamentEntry.player_id.in_(usernames)))
+        unknown = [x for x in usernames if x not in entries]
+        if unknown:
+            raise ValueError('Unknown player: {}'.format(unknown[0]))
+
+        batch = ScoreBatch(self.tournament_name, self.get_dao().id)
+        for score in scores:
+            batch.add(entries[score.get('username')], score.get('category'),
+                      score.get('score'), score.get('game_id'))
+        return batch
+
+    def read_draw(self):
+        """
+        The draw already written for the round, in a single query. A list of
+        dicts ordered by table:
+            { 'table_number': 1, 'entrants': ['homer', 'BYE'] }
+        """
+        tables = OrderedDict()
+        query = db.session.query(
+            TournamentGame.table_num, TournamentEntry.player_id).join(DAO).\
+            outerjoin(GameEntrant, GameEntrant.game_id == TournamentGame.id).\
+            outerjoin(TournamentEntry).\
+            filter(DAO.tournament_name == self.tournament_name,
+                   DAO.ordering == self.ordering)
+        for table, player in query.order_by(TournamentGame.table_num,
+                                            TournamentEntry.id):
+            tables.setdefault(table, [])
+            if player is not None:
+                tables[table].append(player)
+
+        return [{
+            'table_number': table,
+            'entrants': players if len(players) > 1 else players + ['BYE']
+        } for table, players in tables.items()]
+
     def is_complete(self):
         """Are all the games for this round complete"""
-        for game in self.get_dao().games.all():
-            if not Score.is_score_entered(game):
-                return False
-        return True
+        return TournamentGame.query.join(DAO).filter(
+            DAO.tournament_name == self.tournament_name,
+            DAO.ordering == self.ordering,
+            TournamentGame.score_entered.isnot(True)).first() is None
@@ -0,0 +1,62 @@
+"""
+A snapshot of a tournament
+
+Rankings, draws and schedules all need every entry along with their table
+history and scores. Loading these entry by entry costs several queries per
+entry, so the snapshot loads each of them for the whole tournament at once.
+"""
+from collections import defaultdict
+
+from sqlalchemy.orm import joinedload
+from sqlalchemy.orm.attributes import set_committed_value
+
+from models.dao.score import Score, ScoreCategory
+from models.dao.table_allocation import TableAllocation
+from models.dao.tournament_entry import TournamentEntry
+
+# pylint: disable=no-member
+class TournamentSnapshot(object):
+    """
+    Entries, table history, scores and score categories for a tournament,
+    loaded in a fixed number of queries regardless of the number of entries.
+
+    Each entry in entries has:
+        - game_history - list of table numbers played on
+        - scores - the Score DAOs, with their categories, already loaded
+        - score_info - the scores as a list of dicts
+    """
+
+    def __init__(self, tournament_id):
+        self.tournament_id = tournament_id
+
+        self.score_categories = ScoreCategory.query.\
+            filter_by(tournament_id=tournament_id).all()
+        self.entries = TournamentEntry.query.\
+            filter_by(tournament_id=tournament_id).\
+            order_by(TournamentEntry.id).all()
+
+        history = defaultdict(list)
+        for alloc in TableAllocation.query.join(TournamentEntry).\
+                filter(TournamentEntry.tournament_id == tournament_id).\
+                order_by(TableAllocation.round_no):
+            history[alloc.entry_id].append(alloc.table_no)
+
+        scores = defaultdict(list)
+        for score in Score.query.join(TournamentEntry).\
+                filter(TournamentEntry.tournament_id == tournament_id).\
+                options(joinedload(Score.score_category)).\
+                order_by(Score.id):
+            scores[score.entry_id].append(score)
+
+        for entry in self.entries:
+            entry.game_history = history[entry.id]
+            # Populate the relationship so it isn't lazy loaded per entry
+            set_committed_value(entry, 'scores', scores[entry.id])
+            entry.score_info = [
+                {
+                    'score': x.value,
+                    'category': x.score_category.name,
+                    'min_val': x.score_category.min_val,
+                    'max_val': x.score_category.max_val,
+                } for x in entry.scores
+            ]
@@ -6,7 +6,7 @@ import datetime
 import re
 from sqlalchemy.sql.expression import and_
 
-from models.authentication import check_auth
+from models.authentication import check_auth, issue_token
 from models.dao.account import db, Account, AccountSecurity
 from models.dao.tournament import Tournament as TournDAO
 from models.dao.tournament_entry import TournamentEntry
@@ -37,7 +37,8 @@ class User(object):
 
     def get_dao(self):
         """Convenience method to recover DAO"""
-        return Account.query.filter_by(username=self.username).first()
+        return Account.query.get(self.username) \
+            if self.username is not None else None
 
     def create(self, details):
         """Add an account"""
@@ -153,9 +154,14 @@ class User(object):
     @must_exist_in_db
     def get_display_name(self):
         """Get the real name of the user"""
-        full_name = '{} {}'.format(self.get_dao().first_name,
-                                   self.get_dao().last_name).strip()
-        return full_name if full_name is not '' else self.username
+        return self.display_name(self.get_dao())
+
+    @staticmethod
+    def display_name(account):
+        """The real name for an Account, or the username if there isn't one"""
+        full_name = '{} {}'.format(account.first_name,
+                                   account.last_name).strip()
+        return full_name if full_name is not '' else account.username
 
     def get_account_actions(self):
         """Basic user actions for viewing and entering tournaments"""
@@ -265,7 +271,11 @@ class User(object):
         }
 
     def login(self, password):
-        """Log the user in"""
+        """
+        Log the user in. Returns a session token if they are enabled, otherwise
+        None
+        """
         if Account.query.filter_by(username=self.username).first() is None or \
         not check_auth(self.username, password):
             raise ValueError('Username or password incorrect')
+        return issue_token(self.username)
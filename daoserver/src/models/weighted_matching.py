@@ -0,0 +1,692 @@
+"""
+Maximum weight matching in general graphs
+
+This is Edmonds' blossom algorithm in its primal-dual form (as described by
+Galil, "Efficient Algorithms for Finding Maximum Matching in Graphs", 1986).
+It runs in O(n3) time for n vertices and is used by the matching strategies
+to pick the best draw without enumerating every possible draw.
+
+Conventions:
+    - Vertices are the integers 0..n-1
+    - An edge is a tuple (i, j, weight). Weights should be integers so that
+      the dual variables stay exact.
+    - Edge k has two endpoints, 2k and 2k+1. endpoint[2k] is i and
+      endpoint[2k+1] is j.
+    - Blossoms are numbered n..2n-1. A vertex is a trivial blossom.
+    - Weights are stored doubled, and dual variables doubled again, so that
+      every dual adjustment remains an integer.
+"""
+# pylint: disable=too-many-instance-attributes,too-many-branches
+
+class WeightedMatching(object):
+    """
+    Find a maximum weight matching for a graph.
+
+    Usage:
+        mate = WeightedMatching(edges).solve(max_cardinality=True)
+        mate = WeightedMatching(edges).perfect_matching()
+
+    mate[i] is the vertex matched to i, or -1 if i is unmatched.
+    """
+
+    def __init__(self, edges, num_vertices=None):
+        self.edges = [(i, j, 2 * wt) for i, j, wt in edges]
+        if num_vertices is None:
+            num_vertices = 1 + max([max(i, j) for i, j, _ in self.edges]) \
+                if self.edges else 0
+        self.num_vertices = num_vertices
+        num = num_vertices
+
+        self.endpoint = [self.edges[p // 2][p % 2] \
+            for p in range(2 * len(self.edges))]
+        self.neighbend = [[] for _ in range(num)]
+        for k, (i, j, _) in enumerate(self.edges):
+            self.neighbend[i].append(2 * k + 1)
+            self.neighbend[j].append(2 * k)
+
+        max_weight = max([0] + [wt for _, _, wt in self.edges])
+
+        self.mate = num * [-1]
+        self.label = 2 * num * [0]
+        self.labelend = 2 * num * [-1]
+        self.inblossom = list(range(num))
+        self.blossomparent = 2 * num * [-1]
+        self.blossomchilds = 2 * num * [None]
+        self.blossombase = list(range(num)) + num * [-1]
+        self.blossomendps = 2 * num * [None]
+        self.bestedge = 2 * num * [-1]
+        self.blossombestedges = 2 * num * [None]
+        self.unusedblossoms = list(range(num, 2 * num))
+        self.dualvar = num * [max_weight] + num * [0]
+        self.allowedge = len(self.edges) * [False]
+        self.queue = []
+        self.ancestors = None
+        self.solved = False
+
+    def slack(self, k):
+        """The (doubled) slack of edge k, ignoring blossom duals"""
+        i, j, weight = self.edges[k]
+        return self.dualvar[i] + self.dualvar[j] - 2 * weight
+
+    def dual(self, vertex):
+        """
+        The dual variable of vertex in the units used by reduced_cost. For
+        any i, j and weight:
+            reduced_cost(i, j, weight) >= dual(i) + dual(j) - 4 * weight
+        """
+        return self.dualvar[vertex]
+
+    def reduced_cost(self, i, j, weight):
+        """
+        The slack of a hypothetical edge (i, j, weight) against the final dual
+        solution, including the duals of blossoms containing both vertices.
+        The value is scaled by four (see the module docstring).
+
+        A negative value means adding the edge could improve the matching; a
+        non-negative value for every edge not in the graph proves the matching
+        is also optimal for the larger graph.
+        """
+        slack = self.dualvar[i] + self.dualvar[j] - 4 * weight
+        if self.ancestors is None:
+            self.ancestors = [self._blossom_ancestors(x) \
+                for x in range(self.num_vertices)]
+        if self.ancestors[i] and self.ancestors[j]:
+            for i_blossom, j_blossom in zip(self.ancestors[i],
+                                            self.ancestors[j]):
+                if i_blossom != j_blossom:
+                    break
+                slack += 2 * self.dualvar[i_blossom]
+        return slack
+
+    def _blossom_ancestors(self, vertex):
+        """The non-trivial blossoms containing vertex, outermost first"""
+        ancestors = []
+        blossom = self.blossomparent[vertex]
+        while blossom != -1:
+            ancestors.append(blossom)
+            blossom = self.blossomparent[blossom]
+        ancestors.reverse()
+        return ancestors
+
+    def _warm_start(self):
+        """
+        Only valid when searching for a perfect matching.
+
+        Give each vertex the dual of its heaviest edge rather than the
+        heaviest edge in the graph, and match any edge that is then tight.
+        Vertices still unmatched have their dual lowered as far as it can go
+        while remaining feasible, and any newly tight edges between them are
+        matched too. Each edge matched here saves a search stage.
+
+        Weights are stored doubled so every dual set here is even; the free
+        vertices therefore share a parity and later adjustments stay integers.
+        """
+        best = self.num_vertices * [None]
+        for k, (i, j, weight) in enumerate(self.edges):
+            for vertex in (i, j):
+                if best[vertex] is None or \
+                weight > self.edges[best[vertex]][2]:
+                    best[vertex] = k
+
+        for vertex, k in enumerate(best):
+            if k is not None:
+                self.dualvar[vertex] = self.edges[k][2]
+        self._match_tight_edges()
+
+        for vertex in range(self.num_vertices):
+            if self.mate[vertex] == -1 and self.neighbend[vertex]:
+                self.dualvar[vertex] = max([
+                    2 * self.edges[p // 2][2] - \
+                    self.dualvar[self.endpoint[p]] \
+                    for p in self.neighbend[vertex]])
+        self._match_tight_edges()
+
+    def _match_tight_edges(self):
+        """Greedily match tight edges between unmatched vertices"""
+        for k, (i, j, _) in enumerate(self.edges):
+            if self.mate[i] == -1 and self.mate[j] == -1 and \
+            self.slack(k) == 0:
+                self.mate[i] = 2 * k + 1
+                self.mate[j] = 2 * k
+
+    def add_edges(self, edges):
+        """
+        Add edges to a graph that has already been solved, keeping the
+        matching, duals and blossoms found so perfect_matching can carry on
+        from them rather than start again.
+
+        Where a new edge has a negative reduced cost the dual of one endpoint
+        is raised to make it feasible. If the endpoint is inside blossoms the
+        raise is moved out of their duals, expanding any that run out. Each
+        raise unmatches one edge, and each unmatched pair of vertices costs a
+        search stage, so adding a few edges is much cheaper than a re-solve.
+        """
+        self.ancestors = None
+        for i, j, weight in edges:
+            k = len(self.edges)
+            self.edges.append((i, j, 2 * weight))
+            self.endpoint.extend([i, j])
+            self.neighbend[i].append(2 * k + 1)
+            self.neighbend[j].append(2 * k)
+            self.allowedge.append(False)
+            self._make_feasible(i, j, weight)
+
+        # Keep the free vertices at an even dual, as _warm_start does
+        for vertex in range(self.num_vertices):
+            while self.mate[vertex] == -1 and self.dualvar[vertex] % 2:
+                self._raise_dual(vertex, None, 1)
+
+    def _make_feasible(self, i, j, weight):
+        """Raise the dual of i until edge (i, j, weight) is not violated"""
+        slack = self._edge_slack(i, j, weight)
+        while slack < 0:
+            # Round up so every dual stays an integer (see _warm_start)
+            self._raise_dual(i, j, -slack + (slack % 2))
+            slack = self._edge_slack(i, j, weight)
+
+    def _edge_slack(self, i, j, weight):
+        """reduced_cost for an edge, without caching the blossom ancestors"""
+        slack = self.dualvar[i] + self.dualvar[j] - 4 * weight
+        for i_blossom, j_blossom in zip(self._blossom_ancestors(i),
+                                        self._blossom_ancestors(j)):
+            if i_blossom != j_blossom:
+                break
+            slack += 2 * self.dualvar[i_blossom]
+        return slack
+
+    def _raise_dual(self, vertex, other, amount):
+        """
+        Raise the dual of vertex, and of every vertex in its top-level
+        blossom, by up to amount at the expense of the blossom's dual, and
+        unmatch the blossom. Only edges leaving the blossom are loosened, so
+        if it also contains other its dual is used up and it is expanded.
+        """
+        blossom = self.inblossom[vertex]
+        base = self.blossombase[blossom]
+        if blossom == vertex:
+            self.dualvar[vertex] += amount
+        else:
+            if other is not None and self.inblossom[other] == blossom:
+                amount = self.dualvar[blossom]
+            else:
+                amount = min(amount, self.dualvar[blossom])
+            for leaf in self.blossom_leaves(blossom):
+                self.dualvar[leaf] += amount
+            self.dualvar[blossom] -= amount
+            if self.dualvar[blossom] == 0:
+                self.expand_blossom(blossom, True)
+        if amount:
+            self._unmatch(base)
+
+    def _unmatch(self, vertex):
+        """Remove the matched edge at vertex, if there is one"""
+        if self.mate[vertex] != -1:
+            self.mate[self.endpoint[self.mate[vertex]]] = -1
+            self.mate[vertex] = -1
+
+    def blossom_leaves(self, blossom):
+        """Generate the vertices contained in blossom"""
+        if blossom < self.num_vertices:
+            yield blossom
+        else:
+            for child in self.blossomchilds[blossom]:
+                if child < self.num_vertices:
+                    yield child
+                else:
+                    for vertex in self.blossom_leaves(child):
+                        yield vertex
+
+    def assign_label(self, vertex, label, endp):
+        """
+        Assign label (1 = S, 2 = T) to the top-level blossom containing
+        vertex, reached through endpoint endp.
+        """
+        blossom = self.inblossom[vertex]
+        self.label[vertex] = self.label[blossom] = label
+        self.labelend[vertex] = self.labelend[blossom] = endp
+        self.bestedge[vertex] = self.bestedge[blossom] = -1
+        if label == 1:
+            self.queue.extend(self.blossom_leaves(blossom))
+        elif label == 2:
+            base = self.blossombase[blossom]
+            self.assign_label(self.endpoint[self.mate[base]], 1,
+                              self.mate[base] ^ 1)
+
+    def scan_blossom(self, vertex, other):
+        """
+        Trace back from vertex and other to discover either a new blossom
+        (returns its base) or an augmenting path (returns -1).
+        """
+        path = []
+        base = -1
+        while vertex != -1 or other != -1:
+            blossom = self.inblossom[vertex]
+            if self.label[blossom] & 4:
+                base = self.blossombase[blossom]
+                break
+            path.append(blossom)
+            self.label[blossom] = 5
+            if self.labelend[blossom] == -1:
+                vertex = -1
+            else:
+                vertex = self.endpoint[self.labelend[blossom]]
+                blossom = self.inblossom[vertex]
+                vertex = self.endpoint[self.labelend[blossom]]
+            if other != -1:
+                vertex, other = other, vertex
+        for blossom in path:
+            self.label[blossom] = 1
+        return base
+
+    # pylint: disable=too-many-locals,too-many-statements
+    def add_blossom(self, base, k):
+        """Construct a new blossom with given base, through S-S edge k"""
+        vertex, other, _ = self.edges[k]
+        base_blossom = self.inblossom[base]
+        v_blossom = self.inblossom[vertex]
+        o_blossom = self.inblossom[other]
+
+        blossom = self.unusedblossoms.pop()
+        self.blossombase[blossom] = base
+        self.blossomparent[blossom] = -1
+        self.blossomparent[base_blossom] = blossom
+        self.blossomchilds[blossom] = path = []
+        self.blossomendps[blossom] = endps = []
+
+        while v_blossom != base_blossom:
+            self.blossomparent[v_blossom] = blossom
+            path.append(v_blossom)
+            endps.append(self.labelend[v_blossom])
+            vertex = self.endpoint[self.labelend[v_blossom]]
+            v_blossom = self.inblossom[vertex]
+        path.append(base_blossom)
+        path.reverse()
+        endps.reverse()
+        endps.append(2 * k)
+
+        while o_blossom != base_blossom:
+            self.blossomparent[o_blossom] = blossom
+            path.append(o_blossom)
+            endps.append(self.labelend[o_blossom] ^ 1)
+            other = self.endpoint[self.labelend[o_blossom]]
+            o_blossom = self.inblossom[other]
+
+        self.label[blossom] = 1
+        self.labelend[blossom] = self.labelend[base_blossom]
+        self.dualvar[blossom] = 0
+
+        for vertex in self.blossom_leaves(blossom):
+            if self.label[self.inblossom[vertex]] == 2:
+                self.queue.append(vertex)
+            self.inblossom[vertex] = blossom
+
+        # Compute the least-slack edges to neighbouring S-blossoms
+        bestedgeto = 2 * self.num_vertices * [-1]
+        for child in path:
+            if self.blossombestedges[child] is None:
+                nblists = [[p // 2 for p in self.neighbend[vertex]] \
+                    for vertex in self.blossom_leaves(child)]
+            else:
+                nblists = [self.blossombestedges[child]]
+            for nblist in nblists:
+                for edge in nblist:
+                    i, j, _ = self.edges[edge]
+                    if self.inblossom[j] == blossom:
+                        i, j = j, i
+                    j_blossom = self.inblossom[j]
+                    if j_blossom != blossom and self.label[j_blossom] == 1 \
+                    and (bestedgeto[j_blossom] == -1 or \
+                    self.slack(edge) < self.slack(bestedgeto[j_blossom])):
+                        bestedgeto[j_blossom] = edge
+            self.blossombestedges[child] = None
+            self.bestedge[child] = -1
+
+        self.blossombestedges[blossom] = [x for x in bestedgeto if x != -1]
+        self.bestedge[blossom] = -1
+        for edge in self.blossombestedges[blossom]:
+            if self.bestedge[blossom] == -1 or \
+            self.slack(edge) < self.slack(self.bestedge[blossom]):
+                self.bestedge[blossom] = edge
+
+    def expand_blossom(self, blossom, endstage):
+        """Expand the given top-level blossom"""
+        for child in self.blossomchilds[blossom]:
+            self.blossomparent[child] = -1
+            if child < self.num_vertices:
+                self.inblossom[child] = child
+            elif endstage and self.dualvar[child] == 0:
+                self.expand_blossom(child, endstage)
+            else:
+                for vertex in self.blossom_leaves(child):
+                    self.inblossom[vertex] = child
+
+        if not endstage and self.label[blossom] == 2:
+            self._relabel_expanded(blossom)
+
+        self.label[blossom] = self.labelend[blossom] = -1
+        self.blossomchilds[blossom] = self.blossomendps[blossom] = None
+        self.blossombase[blossom] = -1
+        self.blossombestedges[blossom] = None
+        self.bestedge[blossom] = -1
+        self.unusedblossoms.append(blossom)
+
+    def _relabel_expanded(self, blossom):
+        """
+        A T-blossom was expanded mid-stage. Relabel the sub-blossoms on the
+        even-length path through it.
+        """
+        childs = self.blossomchilds[blossom]
+        endps = self.blossomendps[blossom]
+        entrychild = self.inblossom[
+            self.endpoint[self.labelend[blossom] ^ 1]]
+        j = childs.index(entrychild)
+        if j & 1:
+            j -= len(childs)
+            jstep = 1
+            endptrick = 0
+        else:
+            jstep = -1
+            endptrick = 1
+
+        endp = self.labelend[blossom]
+        while j != 0:
+            self.label[self.endpoint[endp ^ 1]] = 0
+            self.label[self.endpoint[
+                endps[j - endptrick] ^ endptrick ^ 1]] = 0
+            self.assign_label(self.endpoint[endp ^ 1], 2, endp)
+            self.allowedge[endps[j - endptrick] // 2] = True
+            j += jstep
+            endp = endps[j - endptrick] ^ endptrick
+            self.allowedge[endp // 2] = True
+            j += jstep
+
+        child = childs[j]
+        self.label[self.endpoint[endp ^ 1]] = self.label[child] = 2
+        self.labelend[self.endpoint[endp ^ 1]] = self.labelend[child] = endp
+        self.bestedge[child] = -1
+
+        j += jstep
+        while childs[j] != entrychild:
+            child = childs[j]
+            if self.label[child] == 1:
+                j += jstep
+                continue
+            labelled = None
+            for vertex in self.blossom_leaves(child):
+                if self.label[vertex] != 0:
+                    labelled = vertex
+                    break
+            if labelled is not None:
+                self.label[labelled] = 0
+                self.label[self.endpoint[
+                    self.mate[self.blossombase[child]]]] = 0
+                self.assign_label(labelled, 2, self.labelend[labelled])
+            j += jstep
+
+    def augment_blossom(self, blossom, vertex):
+        """
+        Swap matched/unmatched edges over an alternating path through blossom
+        between vertex and the base vertex.
+        """
+        child = vertex
+        while self.blossomparent[child] != blossom:
+            child = self.blossomparent[child]
+        if child >= self.num_vertices:
+            self.augment_blossom(child, vertex)
+
+        i = j = self.blossomchilds[blossom].index(child)
+        if i & 1:
+            j -= len(self.blossomchilds[blossom])
+            jstep = 1
+            endptrick = 0
+        else:
+            jstep = -1
+            endptrick = 1
+
+        while j != 0:
+            j += jstep
+            child = self.blossomchilds[blossom][j]
+            endp = self.blossomendps[blossom][j - endptrick] ^ endptrick
+            if child >= self.num_vertices:
+                self.augment_blossom(child, self.endpoint[endp])
+            j += jstep
+            child = self.blossomchilds[blossom][j]
+            if child >= self.num_vertices:
+                self.augment_blossom(child, self.endpoint[endp ^ 1])
+            self.mate[self.endpoint[endp]] = endp ^ 1
+            self.mate[self.endpoint[endp ^ 1]] = endp
+
+        self.blossomchilds[blossom] = self.blossomchilds[blossom][i:] + \
+            self.blossomchilds[blossom][:i]
+        self.blossomendps[blossom] = self.blossomendps[blossom][i:] + \
+            self.blossomendps[blossom][:i]
+        self.blossombase[blossom] = \
+            self.blossombase[self.blossomchilds[blossom][0]]
+
+    def augment_matching(self, k):
+        """Augment the matching along the path through S-S edge k"""
+        vertex, other, _ = self.edges[k]
+        for start, endp in ((vertex, 2 * k + 1), (other, 2 * k)):
+            while True:
+                s_blossom = self.inblossom[start]
+                if s_blossom >= self.num_vertices:
+                    self.augment_blossom(s_blossom, start)
+                self.mate[start] = endp
+                if self.labelend[s_blossom] == -1:
+                    break
+                t_vertex = self.endpoint[self.labelend[s_blossom]]
+                t_blossom = self.inblossom[t_vertex]
+                start = self.endpoint[self.labelend[t_blossom]]
+                j = self.endpoint[self.labelend[t_blossom] ^ 1]
+                if t_blossom >= self.num_vertices:
+                    self.augment_blossom(t_blossom, j)
+                self.mate[j] = self.labelend[t_blossom]
+                endp = self.labelend[t_blossom] ^ 1
+
+    def _scan_queue(self):
+        """
+        Grow the alternating forest from the queued S-vertices.
+        Returns True if the matching was augmented.
+
+        This is the innermost loop so the slack is computed inline.
+        """
+        # pylint: disable=too-many-locals
+        edges, dualvar, endpoint = self.edges, self.dualvar, self.endpoint
+        inblossom, label, allowedge = self.inblossom, self.label, \
+            self.allowedge
+        bestedge = self.bestedge
+
+        while self.queue:
+            vertex = self.queue.pop()
+            for endp in self.neighbend[vertex]:
+                k = endp // 2
+                other = endpoint[endp]
+                if inblossom[vertex] == inblossom[other]:
+                    continue
+                if not allowedge[k]:
+                    kslack = dualvar[vertex] + dualvar[other] - \
+                        2 * edges[k][2]
+                    if kslack <= 0:
+                        allowedge[k] = True
+                if allowedge[k]:
+                    if label[inblossom[other]] == 0:
+                        self.assign_label(other, 2, endp ^ 1)
+                    elif label[inblossom[other]] == 1:
+                        base = self.scan_blossom(vertex, other)
+                        if base >= 0:
+                            self.add_blossom(base, k)
+                        else:
+                            self.augment_matching(k)
+                            return True
+                    elif label[other] == 0:
+                        label[other] = 2
+                        self.labelend[other] = endp ^ 1
+                else:
+                    if label[inblossom[other]] == 1:
+                        blossom = inblossom[vertex]
+                    elif label[other] == 0:
+                        blossom = other
+                    else:
+                        continue
+                    best = bestedge[blossom]
+                    if best == -1 or kslack < dualvar[edges[best][0]] + \
+                    dualvar[edges[best][1]] - 2 * edges[best][2]:
+                        bestedge[blossom] = k
+        return False
+
+    def _compute_delta(self, max_cardinality):
+        """
+        Choose the dual adjustment. Returns (type, delta, edge, blossom).
+            1: a vertex dual reaches zero - the stage (and search) ends
+            2: an edge from an S-vertex to a free vertex becomes tight
+            3: an edge between two S-blossoms becomes tight
+            4: a T-blossom dual reaches zero and must be expanded
+
+        This runs after every dual adjustment so the slack is computed inline.
+        """
+        # pylint: disable=too-many-locals
+        num = self.num_vertices
+        label, bestedge, inblossom = self.label, self.bestedge, self.inblossom
+        dualvar, edges = self.dualvar, self.edges
+        blossomparent, blossombase = self.blossomparent, self.blossombase
+        deltatype = -1
+        delta = deltaedge = deltablossom = None
+
+        if not max_cardinality:
+            deltatype = 1
+            delta = min(dualvar[:num])
+
+        for vertex in range(num):
+            best = bestedge[vertex]
+            if best != -1 and label[inblossom[vertex]] == 0:
+                i, j, weight = edges[best]
+                dlt = dualvar[i] + dualvar[j] - 2 * weight
+                if deltatype == -1 or dlt < delta:
+                    delta = dlt
+                    deltatype = 2
+                    deltaedge = best
+
+        for blossom in range(2 * num):
+            best = bestedge[blossom]
+            if best != -1 and label[blossom] == 1 and \
+            blossomparent[blossom] == -1:
+                i, j, weight = edges[best]
+                dlt = (dualvar[i] + dualvar[j] - 2 * weight) // 2
+                if deltatype == -1 or dlt < delta:
+                    delta = dlt
+                    deltatype = 3
+                    deltaedge = best
+
+        for blossom in range(num, 2 * num):
+            if label[blossom] == 2 and blossombase[blossom] >= 0 and \
+            blossomparent[blossom] == -1 and \
+            (deltatype == -1 or dualvar[blossom] < delta):
+                delta = dualvar[blossom]
+                deltatype = 4
+                deltablossom = blossom
+
+        if deltatype == -1:
+            # No further improvement possible; max cardinality reached.
+            deltatype = 1
+            delta = max(0, min(dualvar[:num]))
+
+        return deltatype, delta, deltaedge, deltablossom
+
+    def _update_duals(self, delta):
+        """Apply delta to the dual variables of labelled blossoms"""
+        num = self.num_vertices
+        label, inblossom, dualvar = self.label, self.inblossom, self.dualvar
+        blossomparent, blossombase = self.blossomparent, self.blossombase
+        for vertex in range(num):
+            vertex_label = label[inblossom[vertex]]
+            if vertex_label == 1:
+                dualvar[vertex] -= delta
+            elif vertex_label == 2:
+                dualvar[vertex] += delta
+        for blossom in range(num, 2 * num):
+            if blossombase[blossom] >= 0 and blossomparent[blossom] == -1:
+                if label[blossom] == 1:
+                    dualvar[blossom] += delta
+                elif label[blossom] == 2:
+                    dualvar[blossom] -= delta
+
+    def _stage(self, max_cardinality):
+        """
+        Search for a single augmenting path. Returns True if the matching was
+        augmented, False if it is already optimal.
+        """
+        num = self.num_vertices
+        self.label[:] = 2 * num * [0]
+        self.bestedge[:] = 2 * num * [-1]
+        self.blossombestedges[num:] = num * [None]
+        self.allowedge[:] = len(self.edges) * [False]
+        self.queue[:] = []
+
+        for vertex in range(num):
+            if self.mate[vertex] == -1 and \
+            self.label[self.inblossom[vertex]] == 0:
+                self.assign_label(vertex, 1, -1)
+
+        while True:
+            if self._scan_queue():
+                return True
+
+            deltatype, delta, deltaedge, deltablossom = \
+                self._compute_delta(max_cardinality)
+            self._update_duals(delta)
+
+            if deltatype == 1:
+                return False
+            elif deltatype == 2:
+                self.allowedge[deltaedge] = True
+                i, j, _ = self.edges[deltaedge]
+                if self.label[self.inblossom[i]] == 0:
+                    i, j = j, i
+                self.queue.append(i)
+            elif deltatype == 3:
+                self.allowedge[deltaedge] = True
+                i, j, _ = self.edges[deltaedge]
+                self.queue.append(i)
+            elif deltatype == 4:
+                self.expand_blossom(deltablossom, False)
+
+    def solve(self, max_cardinality=False):
+        """
+        Compute the matching.
+
+        If max_cardinality is True only maximum-cardinality matchings are
+        considered, i.e. the result is the heaviest of the largest matchings.
+
+        Returns a list mate where mate[i] is the vertex matched to i or -1.
+        """
+        num = self.num_vertices
+        self.ancestors = None
+        for _ in range(num):
+            if not self._stage(max_cardinality):
+                break
+            # Expand S-blossoms whose dual reached zero; they are no longer
+            # needed and would otherwise block later stages.
+            for blossom in range(num, 2 * num):
+                if self.blossomparent[blossom] == -1 and \
+                self.blossombase[blossom] >= 0 and \
+                self.label[blossom] == 1 and self.dualvar[blossom] == 0:
+                    self.expand_blossom(blossom, True)
+
+        return [self.endpoint[p] if p >= 0 else -1 for p in self.mate]
+
+    def perfect_matching(self):
+        """
+        Compute the maximum weight perfect matching.
+
+        This starts from a partial matching of the obviously best edges so it
+        is considerably faster than solve(max_cardinality=True). After
+        add_edges it carries on from the previous solution instead.
+
+        Returns a list mate where mate[i] is the vertex matched to i, or None
+        if the graph has no perfect matching.
+        """
+        if not self.solved:
+            self._warm_start()
+        mate = self.solve(max_cardinality=True)
+        self.solved = True
+        return None if -1 in mate else mate
@@ -6,6 +6,7 @@ from flask_testing import TestCase
 from app import create_app
 from models.dao.db_connection import db
 from models.dao.matching_strategy import MatchingStrategy
+from models.dao.query_profiler import PROFILER
 from unit_tests.tournament_injector import TournamentInjector
 
 # pylint: disable=invalid-name,missing-docstring
@@ -28,3 +29,10 @@ class AppSimulatingTest(TestCase):
     def tearDown(self):
         self.injector.delete()
         db.session.remove()
+
+    @staticmethod
+    def count_statements(func):
+        """The number of statements run by func"""
+        with PROFILER.counting() as counted:
+            func()
+        return counted['statements']
@@ -0,0 +1,122 @@
+"""
+Checking usernames and passwords
+"""
+
+import os
+from passlib.hash import sha256_crypt
+from testfixtures import compare, Replacer
+
+from models.authentication import check_auth, issue_token, CredentialCache, \
+CREDENTIAL_CACHE
+from models.dao.account import Account, AccountSecurity
+
+from unit_tests.app_simulating_test import AppSimulatingTest
+
+# pylint: disable=no-member,missing-docstring,too-few-public-methods
+class NoHashes(object):
+    """Stands in for sha256_crypt when passwords mustn't be hashed"""
+
+    @staticmethod
+    def verify(password, stored_hash):  # pylint: disable=unused-argument
+        return False
+
+class AuthenticationTests(AppSimulatingTest):
+
+    def setUp(self):
+        super(AuthenticationTests, self).setUp()
+        self.player = 'auth_player'
+        self.db.session.add(Account(self.player, 'auth@bar.com'))
+        self.db.session.add(AccountSecurity(self.player, 'secret'))
+        self.db.session.commit()
+        self.injector.accounts.add(self.player)
+        CREDENTIAL_CACHE.clear()
+
+    def tearDown(self):
+        CREDENTIAL_CACHE.clear()
+        os.environ.pop('AUTH_TOKEN_SECRET', None)
+        super(AuthenticationTests, self).tearDown()
+
+    def set_password(self, password):
+        security = AccountSecurity.query.filter_by(id=self.player).first()
+        security.password = sha256_crypt.encrypt(password)
+        self.db.session.commit()
+
+    def test_check_auth(self):
+        self.assertTrue(check_auth(self.player, 'secret'))
+        self.assertFalse(check_auth(self.player, 'wrong'))
+        self.assertFalse(check_auth(self.player, None))
+        self.assertFalse(check_auth(None, 'secret'))
+        self.assertFalse(check_auth('not_a_player', 'secret'))
+
+    def test_cached(self):
+        """The hash is only checked once"""
+        self.assertTrue(check_auth(self.player, 'secret'))
+        with Replacer() as replace:
+            replace('models.authentication.sha256_crypt', NoHashes)
+            self.assertTrue(check_auth(self.player, 'secret'))
+            self.assertFalse(check_auth(self.player, 'wrong'))
+
+            # Checked against another hash, e.g. after the password has
+            # changed, the credential is dropped
+            self.assertFalse(
+                CREDENTIAL_CACHE.check(self.player, 'secret', 'new_hash'))
+            self.assertFalse(check_auth(self.player, 'secret'))
+
+    def test_password_change(self):
+        self.assertTrue(check_auth(self.player, 'secret'))
+        self.set_password('new_secret')
+        self.assertFalse(check_auth(self.player, 'secret'))
+        self.assertTrue(check_auth(self.player, 'new_secret'))
+
+    def test_tokens(self):
+        compare(issue_token(self.player), None)
+
+        os.environ['AUTH_TOKEN_SECRET'] = 'some key'
+        token = issue_token(self.player)
+        compare(issue_token('not_a_player'), None)
+
+        with Replacer() as replace:
+            replace('models.authentication.sha256_crypt', NoHashes)
+            self.assertTrue(check_auth(self.player, token))
+            self.assertFalse(check_auth('not_a_player', token))
+            self.assertFalse(check_auth(self.player, token + 'x'))
+
+        os.environ['AUTH_TOKEN_SECRET'] = 'another key'
+        self.assertFalse(check_auth(self.player, token))
+
+        os.environ['AUTH_TOKEN_SECRET'] = 'some key'
+        self.set_password('new_secret')
+        self.assertFalse(check_auth(self.player, token))
+
+
+class CredentialCacheTests(AppSimulatingTest):
+
+    def test_expiry(self):
+        cache = CredentialCache(ttl=-1)
+        cache.add('user', 'pass', 'hash')
+        self.assertFalse(cache.check('user', 'pass', 'hash'))
+
+        cache = CredentialCache(ttl=60)
+        cache.add('user', 'pass', 'hash')
+        self.assertTrue(cache.check('user', 'pass', 'hash'))
+        self.assertFalse(cache.check('user', 'pass', 'other hash'))
+        self.assertFalse(cache.check('user', 'pass', 'hash'))
+
+    def test_bounded(self):
+        cache = CredentialCache(max_size=2)
+        cache.add('user_1', 'pass', 'hash')
+        cache.add('user_2', 'pass', 'hash')
+        self.assertTrue(cache.check('user_1', 'pass', 'hash'))
+        cache.add('user_3', 'pass', 'hash')
+
+        compare(len(cache.credentials), 2)
+        self.assertTrue(cache.check('user_1', 'pass', 'hash'))
+        self.assertFalse(cache.check('user_2', 'pass', 'hash'))
+        self.assertTrue(cache.check('user_3', 'pass', 'hash'))
+
+    def test_no_passwords_kept(self):
+        cache = CredentialCache()
+        cache.add('user', 'pass', 'hash')
+        self.assertFalse(any('pass' in key for key in cache.credentials))
+        self.assertFalse(any(u'pass' == x for key in cache.credentials \
+            for x in key))
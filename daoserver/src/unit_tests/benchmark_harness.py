@@ -0,0 +1,76 @@
+"""
+The benchmark harness and its synthetic tournaments
+"""
+
+from StringIO import StringIO
+import unittest
+
+from testfixtures import compare
+
+from benchmarks import run
+from benchmarks.generators import SyntheticTournament
+
+# pylint: disable=missing-docstring
+class SyntheticTournamentTests(unittest.TestCase):  # pylint: disable=R0904
+
+    def test_history(self):
+        tourn = SyntheticTournament(9, rounds_played=3)
+        compare(len(tourn.entries), 9)
+        for entry in tourn.entries:
+            compare(len(entry.game_history), 3)
+            compare(len(entry.scores), 3 * len(tourn.categories))
+            self.assertTrue(all(0 < x <= 5 for x in entry.game_history))
+        # 4 games and a bye each round
+        compare(sum(len(x) for x in tourn.history.opponents.values()) \
+            <= 3 * 8, True)
+        compare(len(tourn.history.byes) <= 3, True)
+
+    def test_seeded(self):
+        first = SyntheticTournament(16, seed=3)
+        second = SyntheticTournament(16, seed=3)
+        compare([x.game_history for x in first.entries],
+                [x.game_history for x in second.entries])
+        compare(first.totals(), second.totals())
+
+    def test_re_match(self):
+        tourn = SyntheticTournament(8, rounds_played=1)
+        entry = tourn.entries[0]
+        opponents = tourn.history.opponents[entry.id]
+        opponent = [x for x in tourn.entries if x.id in opponents][0]
+        other = [x for x in tourn.entries \
+            if x.id not in opponents and x is not entry][0]
+
+        def game(*entries):
+            return [{'name': x.player_id, 'entry': x} for x in entries]
+        self.assertTrue(tourn.re_match(game(entry, opponent)))
+        self.assertFalse(tourn.re_match(game(entry, other)))
+        self.assertFalse(tourn.re_match(
+            game(entry) + [{'name': 'BYE', 'entry': 'BYE'}]))
+
+
+class RunTests(unittest.TestCase):                  # pylint: disable=R0904
+
+    def test_run(self):
+        out = StringIO()
+        report = run.run(['swiss_chess', 'overall_ranking'], [8], out)
+        compare(sorted(report.keys()), ['overall_ranking', 'swiss_chess'])
+        for result in [x['8'] for x in report.values()]:
+            self.assertTrue(result['time'] >= 0)
+            self.assertTrue(result['runs'] >= 1)
+        compare(len(out.getvalue().splitlines()), 2)
+
+    def test_regressions(self):
+        baseline = {'swiss_chess': {
+            '8': {'time': 0.1, 'memory': 2048},
+            '16': {'time': 0.0001, 'memory': 10},
+        }}
+        report = {'swiss_chess': {
+            '8': {'time': 0.2, 'memory': 4096},
+            '16': {'time': 0.0009, 'memory': 1000},
+            '32': {'time': 5, 'memory': 5000},
+        }}
+        compare(run.regressions(report, baseline, 0.5), [
+            'swiss_chess 8: 0.2000s, was 0.1000s',
+            'swiss_chess 8: 4096KB, was 2048KB',
+        ])
+        compare(run.regressions(report, baseline, 1.5), [])
@@ -0,0 +1,135 @@
+"""
+Making draws in worker processes
+"""
+
+import time
+import unittest
+
+from testfixtures import compare
+
+from models.dao.tournament_entry import TournamentEntry
+from models.draw_pool import DrawJob, DrawPool, DrawTimeout
+from models.matching_strategy import RoundRobin, SwissChess
+from models.opponent_history import OpponentHistory
+from models.table_strategy import ProtestAvoidanceStrategy
+
+# pylint: disable=missing-docstring
+class SlowJob(DrawJob):
+
+    def __init__(self, seconds):              # pylint: disable=W0231
+        self.seconds = seconds
+
+    def run(self):
+        time.sleep(self.seconds)
+        return self.seconds
+
+
+class BadJob(DrawJob):
+
+    def __init__(self):                       # pylint: disable=W0231
+        pass
+
+    def run(self):
+        raise ValueError('Bad job')
+
+
+class LatePool(DrawPool):
+    """A pool where every draw misses its deadline"""
+
+    def run(self, job, deadline=None):
+        raise DrawTimeout('Too late')
+
+
+def layout(draw):
+    return [(t.table_number,
+             [getattr(x, 'player_id', x) for x in t.entrants]) for t in draw]
+
+
+class DrawPoolTests(unittest.TestCase):             # pylint: disable=R0904
+
+    def setUp(self):
+        self.pool = DrawPool(size=1, deadline=10, min_entries=0)
+        self.entries = []
+        for i in range(1, 42):
+            entry = TournamentEntry('player_{}'.format(i), 'foo',
+                                    game_history=[i % 7 + 1, i % 5 + 1])
+            entry.id = i
+            self.entries.append(entry)
+        self.scores = dict((x.id, (x.id * 37) % 23) for x in self.entries)
+        self.history = OpponentHistory(
+            [[x.id, x.id + 1] for x in self.entries[:-1:2]] + [[41]])
+
+    def tearDown(self):
+        self.pool.close()
+
+    def swiss(self):
+        return SwissChess(rank=lambda x: self.scores[x.id],
+                          history=self.history)
+
+    def test_same_draw(self):
+        """Draws made in a worker match those made in the request"""
+        for strategy in [self.swiss(), RoundRobin().set_round(3)]:
+            tables = ProtestAvoidanceStrategy(ProtestAvoidanceStrategy.SPLIT)
+            expected = tables.determine_tables(strategy.match(self.entries))
+            draw = self.pool.make_draw(strategy, tables, self.entries)
+            compare(layout(draw), layout(expected))
+            self.assertTrue(draw[0].entrants[0] in self.entries)
+        compare(len(self.pool.idle), 1)
+
+    def test_report(self):
+        """The step budget is sent to the worker and the report comes back"""
+        strategy = SwissChess(rank=lambda x: self.scores[x.id],
+                              history=self.history, step_budget=500)
+        tables = ProtestAvoidanceStrategy()
+        draw = self.pool.make_draw(strategy, tables, self.entries)
+        compare(len(draw), 21)
+        compare(strategy.report['re_matches'], 0)
+        self.assertTrue(0 < strategy.report['steps'] <= 500)
+        self.assertTrue(strategy.report['objective'] >=
+                        strategy.report['lower_bound'])
+
+    def test_not_offloaded(self):
+        """Small draws and ones that can't be sent to a worker are made here"""
+        tables = ProtestAvoidanceStrategy()
+        self.pool.min_entries = 50
+        self.pool.make_draw(self.swiss(), tables, self.entries)
+        self.pool.min_entries = 0
+        strategy = SwissChess(rank=lambda x: self.scores[x.id],
+                              re_match=lambda x: False)
+        self.assertFalse(DrawJob.can_run(strategy, tables))
+        self.pool.make_draw(strategy, tables, self.entries)
+        compare(len(self.pool.idle), 0)
+
+    def test_deadline(self):
+        """The worker is killed and replaced when the deadline passes"""
+        start = time.time()
+        self.assertRaises(DrawTimeout, self.pool.run, SlowJob(30), 0.5)
+        self.assertTrue(time.time() - start < 5)
+        compare(self.pool.idle, [])
+        compare(self.pool.busy, 0)
+
+        compare(self.pool.run(SlowJob(0)), 0)
+        compare(len(self.pool.idle), 1)
+
+    def test_job_error(self):
+        """Errors in a job are raised and the worker is kept"""
+        self.assertRaises(ValueError, self.pool.run, BadJob())
+        compare(len(self.pool.idle), 1)
+        self.assertTrue(self.pool.idle[0].process.is_alive())
+
+    def test_dead_worker(self):
+        """Workers that have died are replaced"""
+        self.pool.run(SlowJob(0))
+        self.pool.idle[0].kill()
+        compare(self.pool.run(SlowJob(0)), 0)
+
+    def test_greedy_fallback(self):
+        """A greedy draw is made if the draw misses its deadline"""
+        pool = LatePool(size=1, min_entries=0)
+        tables = ProtestAvoidanceStrategy()
+        draw = pool.make_draw(self.swiss(), tables, self.entries)
+        expected = tables.greedy_tables(
+            self.swiss().greedy_match(self.entries))
+        compare(layout(draw), layout(expected))
+        compare(len(draw), 21)
+        compare(sorted(t.table_number for t in draw), range(1, 22))
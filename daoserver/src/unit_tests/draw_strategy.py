@@ -3,9 +3,13 @@ Draw strategy unit tests
 """
 # pylint: disable=invalid-name,missing-docstring
 
+from itertools import combinations
+import unittest
 from testfixtures import compare
 
-from models.matching_strategy import RoundRobin, SwissChess
+from models.dao.tournament_entry import TournamentEntry as TournamentEntryDAO
+from models.matching_strategy import RoundRobin, RoundRobinSchedule, \
+SwissChess
 from models.tournament_entry import TournamentEntry
 
 from unit_tests.app_simulating_test import AppSimulatingTest
@@ -67,6 +71,43 @@ class RoundRobinTests(AppSimulatingTest):
         compare(draw[2][0].player_id, 'dst_player_3')
         compare(draw[2][1], 'BYE')
 
+class RoundRobinScheduleTests(unittest.TestCase):
+
+    def test_everyone_meets_once(self):
+        for num in range(2, 12):
+            schedule = RoundRobinSchedule(num)
+            compare(schedule.rounds_in_cycle, num - 1 + num % 2)
+
+            games = [frozenset(x) for rnd in \
+                schedule.rounds(schedule.rounds_in_cycle) for x in rnd \
+                if None not in x]
+            compare(len(games), len(set(games)))
+            compare(set(games),
+                    set(frozenset(x) for x in combinations(range(num), 2)))
+
+    def test_even(self):
+        schedule = RoundRobinSchedule(4)
+        compare(schedule.rounds(4), [
+            [(0, 3), (1, 2)],
+            [(2, 3), (0, 1)],
+            [(1, 3), (2, 0)],
+            [(0, 3), (1, 2)],
+        ])
+
+    def test_single_entry(self):
+        """Without materialising the round"""
+        for num in [1, 2, 7, 10]:
+            schedule = RoundRobinSchedule(num)
+            for rnd in range(1, 2 * num):
+                for game, (entry, opp) in enumerate(schedule.round(rnd)):
+                    compare(schedule.opponent(entry, rnd), opp)
+                    compare(schedule.game(entry, rnd), game)
+                    if opp is not None:
+                        compare(schedule.opponent(opp, rnd), entry)
+                        compare(schedule.game(opp, rnd), game)
+
+        compare(RoundRobinSchedule(0).round(1), [])
+
 def contains(draw, ent_1, ent_2):
     """check that ent_1 and ent_2 are playing each other in draw"""
     names = [(x[0].player_id, x[1].player_id) for x in draw]
@@ -123,23 +164,6 @@ class SwissChessTests(AppSimulatingTest):
         self.assertTrue(contains(draw, 'dst_player_1', 'dst_player_5'))
         self.assertTrue(contains(draw, 'dst_player_2', 'dst_player_3'))
 
-    # pylint: disable=protected-access
-    def test_legal_draws(self):
-        legal = [
-            ({'name': 'one'}, {'name': 'two'}),
-            ({'name': 'three'}, {'name': 'five'}),
-            ({'name': 'four'}, {'name': 'BYE'}),
-        ]
-        self.assertTrue(SwissChess(rank=self.round_1, re_match=self.re_match)\
-            ._check_legal_draw(legal))
-
-        illegal = [
-            ({'name': 'one'}, {'name': 'two'}),
-            ({'name': 'three'}, {'name': 'one'}),
-        ]
-        self.assertFalse(SwissChess(rank=self.round_1, re_match=self.re_match)\
-            ._check_legal_draw(illegal))
-
 class SwissChessFitnessTests(AppSimulatingTest):
     # pylint: disable=too-many-instance-attributes
     """Checking for re-matches and scores"""
@@ -272,3 +296,175 @@ class SwissChessTestByes(AppSimulatingTest):
 
 
         self.assertFalse(bye_player == bye_player_r2)
+
+
+class SwissChessLargeFieldTests(unittest.TestCase):
+    """Fields far too large to check every possible draw"""
+
+    def setUp(self):
+        self.entries = [TournamentEntryDAO('player_{}'.format(i), 'foo') \
+            for i in range(1, 41)]
+        self.scores = dict((x.player_id, (i * 37) % 23) \
+            for i, x in enumerate(self.entries))
+
+    def rank(self, entry):
+        return self.scores[entry.player_id]
+
+    def cost(self, draw):
+        return sum((self.rank(x) - self.rank(y)) ** 2 for x, y in draw)
+
+    def test_optimal_draw(self):
+        """With no re-matches adjacent entries by score should be drawn"""
+        draw = SwissChess(rank=self.rank, re_match=lambda x: False).\
+            match(self.entries)
+        compare(len(draw), 20)
+
+        ranked = sorted(self.rank(x) for x in self.entries)
+        compare(self.cost(draw),
+                sum((x - y) ** 2 for x, y in zip(ranked[::2], ranked[1::2])))
+
+    def test_re_matches_avoided(self):
+        """Nobody plays their round 1 opponent again"""
+        round_1 = SwissChess(rank=self.rank, re_match=lambda x: False).\
+            match(self.entries)
+        played = set(frozenset([x.player_id, y.player_id]) for x, y in round_1)
+
+        def re_match(game):
+            return frozenset([game[0]['name'], game[1]['name']]) in played
+
+        draw = SwissChess(rank=self.rank, re_match=re_match).\
+            match(self.entries)
+        compare(len(draw), 20)
+        compare(len(set([x for game in draw for x in game])), 40)
+        for x, y in draw:
+            self.assertFalse(frozenset([x.player_id, y.player_id]) in played)
+        self.assertTrue(self.cost(draw) >= self.cost(round_1))
+
+    def test_report(self):
+        strategy = SwissChess(rank=self.rank, re_match=lambda x: False)
+        draw = strategy.match(self.entries)
+        ranked = sorted(self.rank(x) for x in self.entries)
+        lower_bound = sum((x - y) ** 2 \
+            for x, y in zip(ranked[::2], ranked[1::2]))
+        compare(strategy.report['objective'], self.cost(draw))
+        compare(strategy.report['lower_bound'], lower_bound)
+        compare(strategy.report['gap'], self.cost(draw) - lower_bound)
+        compare(strategy.report['re_matches'], 0)
+        self.assertTrue(strategy.report['optimal'])
+
+    def test_anytime(self):
+        """Anytime draws are legal and no better than the optimal draw"""
+        round_1 = SwissChess(rank=self.rank, re_match=lambda x: False).\
+            match(self.entries)
+        played = set(frozenset([x.player_id, y.player_id]) for x, y in round_1)
+        def re_match(game):
+            return frozenset([game[0]['name'], game[1]['name']]) in played
+
+        optimal = SwissChess(rank=self.rank, re_match=re_match)
+        optimal.match(self.entries)
+        greedy = SwissChess(rank=self.rank, re_match=re_match)
+        greedy.greedy_match(self.entries)
+
+        strategy = SwissChess(rank=self.rank, re_match=re_match,
+                              step_budget=10 ** 6)
+        draw = strategy.match(self.entries)
+        compare(len(draw), 20)
+        compare(len(set([x for game in draw for x in game])), 40)
+        for x, y in draw:
+            self.assertFalse(frozenset([x.player_id, y.player_id]) in played)
+
+        report = strategy.report
+        compare(report['objective'], self.cost(draw))
+        compare(report['re_matches'], 0)
+        compare(report['lower_bound'], optimal.report['lower_bound'])
+        self.assertTrue(report['objective'] >= optimal.report['objective'])
+        self.assertTrue(report['objective'] <= greedy.report['objective'])
+        self.assertTrue(report['steps'] < 10 ** 6)
+
+    def test_anytime_budget(self):
+        """
+        The best draw so far is returned when the steps are used up, and the
+        same entries always get the same draw
+        """
+        entries = [TournamentEntryDAO('player_{}'.format(i), 'foo') \
+            for i in range(1, 402)]
+        scores = dict((x.player_id, (i * 7919) % 97) \
+            for i, x in enumerate(entries))
+        def re_match(game):
+            return (hash(game[0]['name']) + hash(game[1]['name'])) % 3 == 0
+
+        strategy = SwissChess(rank=lambda x: scores[x.player_id],
+                              re_match=re_match, step_budget=20000)
+        draw = strategy.match(entries)
+        compare(len(draw), 201)
+        compare(len(set([x for game in draw for x in game])), 402)
+        compare([y for _, y in draw if y == 'BYE'], ['BYE'])
+        self.assertTrue(strategy.report['gap'] >= 0)
+        self.assertFalse(strategy.report['optimal'])
+        # The last redraw may overrun the budget a little
+        self.assertTrue(20000 <= strategy.report['steps'] < 21000)
+
+        again = SwissChess(rank=lambda x: scores[x.player_id],
+                           re_match=re_match, step_budget=20000)
+        compare(again.match(entries), draw)
+        compare(again.report['objective'], strategy.report['objective'])
+
+        draw = SwissChess(rank=lambda x: scores[x.player_id],
+                          re_match=re_match, step_budget=0).match(entries)
+        compare(len(set([x for game in draw for x in game])), 402)
+
+    def test_anytime_re_matches(self):
+        """
+        When every draw has a re-match exact mode gives no draw, but anytime
+        mode gives one with the re-match in it
+        """
+        entries = self.entries[:4]
+        first = entries[0].player_id
+        def re_match(game):
+            return first in (game[0]['name'], game[1]['name'])
+
+        compare(SwissChess(rank=self.rank, re_match=re_match).match(entries),
+                [])
+
+        strategy = SwissChess(rank=self.rank, re_match=re_match,
+                              step_budget=1000)
+        draw = strategy.match(entries)
+        compare(len(draw), 2)
+        compare(len(set([x for game in draw for x in game])), 4)
+        compare(strategy.report['re_matches'], 1)
+
+    def test_greedy_match(self):
+        """Greedy draws pair neighbours by points, avoiding re-matches"""
+        round_1 = SwissChess(rank=self.rank, re_match=lambda x: False).\
+            greedy_match(self.entries)
+        compare(len(round_1), 20)
+        compare(len(set([x for game in round_1 for x in game])), 40)
+        ranked = sorted((self.rank(x) for x in self.entries), reverse=True)
+        compare(self.cost(round_1),
+                sum((x - y) ** 2 for x, y in zip(ranked[::2], ranked[1::2])))
+
+        played = set(frozenset([x.player_id, y.player_id]) for x, y in round_1)
+        def re_match(game):
+            return frozenset([game[0]['name'], game[1]['name']]) in played
+
+        draw = SwissChess(rank=self.rank, re_match=re_match).\
+            greedy_match(self.entries)
+        compare(len(set([x for game in draw for x in game])), 40)
+        self.assertTrue(
+            len([x for x in draw \
+                 if frozenset([x[0].player_id, x[1].player_id]) in played]) \
+            <= 1)
+
+    def test_greedy_empty(self):
+        """No entries means no games"""
+        compare(SwissChess(rank=self.rank, re_match=lambda x: False).\
+            greedy_match([]), [])
+
+    def test_greedy_bye(self):
+        """The entry with the fewest points has the BYE"""
+        draw = SwissChess(rank=self.rank, re_match=lambda x: False).\
+            greedy_match(self.entries[:-1])
+        compare(len(draw), 20)
+        compare(draw[-1][1], 'BYE')
+        compare(self.rank(draw[-1][0]), min(
+            self.rank(x) for x in self.entries[:-1]))
@@ -0,0 +1,162 @@
+"""
+Running long tournament operations as background jobs
+"""
+from base64 import b64encode
+from datetime import timedelta
+import json
+
+from sqlalchemy import func
+from testfixtures import compare
+
+from models.dao.account import Account, AccountSecurity
+from models.dao.job import Job
+from models.jobs import enqueue, JobRunner
+from models.tournament import Tournament
+
+from unit_tests.app_simulating_test import AppSimulatingTest
+
+# pylint: disable=no-member,missing-docstring
+class JobTests(AppSimulatingTest):
+
+    t_name = 'jobs_tournament'
+    superuser = 'jobs_superuser'
+    other_user = 'jobs_other_user'
+
+    def setUp(self):
+        super(JobTests, self).setUp()
+        Job.query.delete()
+        for username in [self.superuser, self.other_user]:
+            self.db.session.add(Account(username, 'foo@bar.com'))
+            self.db.session.flush()
+            self.db.session.add(AccountSecurity(username, 'password'))
+            self.injector.accounts.add(username)
+        Account.query.filter_by(username=self.superuser).first().\
+            is_superuser = True
+        self.db.session.commit()
+
+        self.injector.inject(self.t_name, num_players=5)
+        self.runner = JobRunner(poll_interval=0)
+
+    def tearDown(self):
+        Job.query.delete()
+        self.db.session.commit()
+        super(JobTests, self).tearDown()
+
+    def headers(self, username=None, prefer='respond-async'):
+        headers = {'Authorization': 'Basic {}'.format(
+            b64encode('{}:password'.format(username or self.superuser)))}
+        if prefer:
+            headers['Prefer'] = prefer
+        return headers
+
+    def post(self, details, **args):
+        return self.client.post('/tournament/{}'.format(self.t_name),
+                                data=json.dumps(details),
+                                content_type='application/json',
+                                headers=self.headers(**args))
+
+    def status(self, job_id, username=None):
+        response = self.client.get('/jobs/{}'.format(job_id),
+                                   headers=self.headers(username))
+        compare(response.status_code, 200)
+        return json.loads(response.data)
+
+    def test_update(self):
+        response = self.post({'rounds': 3})
+        compare(response.status_code, 202)
+        job = json.loads(response.data)
+        compare(response.headers['Location'].endswith(
+            '/jobs/{}'.format(job['id'])), True)
+        compare(job['status'], 'queued')
+        compare(job['kind'], 'update_tournament')
+        compare(job['tournament'], self.t_name)
+        compare(Tournament(self.t_name).get_dao().rounds.count(), 0)
+
+        response = self.client.get('/jobs/{}'.format(job['id']),
+                                   headers=self.headers(self.other_user))
+        compare(response.status_code, 403)
+
+        self.assertTrue(self.runner.run_next())
+        self.assertFalse(self.runner.run_next())
+        job = self.status(job['id'])
+        compare(job['status'], 'done')
+        compare(job['progress'], {'done': 3, 'total': 3})
+        compare(job['result'], 'Tournament {} updated'.format(self.t_name))
+        compare(job['error'], None)
+        self.assertTrue(job['started'] <= job['finished'])
+
+        tourn = Tournament(self.t_name)
+        compare(tourn.get_dao().rounds.count(), 3)
+        compare(len(tourn.get_round(1).read_draw()), 3)
+
+        response = self.client.get('/tournament/{}/jobs'.format(self.t_name),
+                                   headers=self.headers())
+        compare([x['id'] for x in json.loads(response.data)], [job['id']])
+
+    def test_sync(self):
+        """Without Prefer: respond-async the update is done in the request"""
+        response = self.post({'rounds': 2}, prefer='return=minimal')
+        compare(response.status_code, 200)
+        compare(Tournament(self.t_name).get_dao().rounds.count(), 2)
+        compare(Job.query.count(), 0)
+
+    def test_failure(self):
+        job = json.loads(self.post({'rounds': 'x'}).data)
+        self.runner.run_next()
+        job = self.status(job['id'])
+        compare(job['status'], 'failed')
+        compare(job['error'], 'ValueError: Natural number required')
+
+        self.assertRaises(ValueError, enqueue, 'foo', self.superuser)
+
+    def test_in_progress(self):
+        tourn = Tournament(self.t_name)
+        tourn.update({
+            'rounds': 1,
+            'missions': ['mission_1'],
+            'score_categories': [{
+                'name': 'cat', 'percentage': 100, 'per_tournament': False,
+                'min_val': 0, 'max_val': 10, 'zero_sum': False,
+                'opponent_score': False}]
+        })
+        tourn.set_in_progress()
+        compare(self.post({'rounds': 2}).status_code, 400)
+        compare(Job.query.count(), 0)
+
+    def test_one_at_a_time(self):
+        """A tournament's jobs run in order, one at a time"""
+        first = enqueue('update_tournament', self.superuser, self.t_name,
+                        details={'rounds': 1})
+        second = enqueue('update_tournament', self.superuser, self.t_name,
+                         details={'rounds': 2})
+        other = enqueue('update_tournament', self.superuser, 'jobs_other',
+                        details={'rounds': 2})
+
+        compare(self.runner.claim().id, first.id)
+        compare(self.runner.claim().id, other.id)
+        compare(self.runner.claim(), None)
+
+        self.runner.run(Job.query.get(first.id))
+        compare(self.runner.claim().id, second.id)
+
+    def test_stale(self):
+        """Jobs whose worker has stopped are failed"""
+        job = enqueue('update_tournament', self.superuser, self.t_name,
+                      details={'rounds': 1})
+        self.runner.claim()
+        job = Job.query.get(job.id)
+        job.heartbeat = func.now() - timedelta(hours=1)
+        self.db.session.commit()
+
+        compare(self.runner.claim(), None)
+        job = self.status(job.id)
+        compare(job['status'], 'failed')
+        compare(job['error'], 'The job stopped unexpectedly')
+
+    def test_delete(self):
+        job = enqueue('delete_tournament', self.superuser, self.t_name)
+        self.runner.run_next()
+        compare(self.status(job.id)['status'], 'done')
+        self.assertTrue(Tournament(self.t_name).get_dao() is None)
+        self.injector.tournaments = set()
+        self.injector.accounts.add('{}_creator'.format(self.t_name))
@@ -0,0 +1,49 @@
+"""
+Minimum cost assignment used by the table strategies
+"""
+
+import itertools
+import unittest
+from testfixtures import compare
+
+from models.linear_assignment import minimum_cost_assignment
+
+def brute_force(costs):
+    """The cost of the cheapest assignment"""
+    return min(sum(costs[i][j] for i, j in enumerate(perm)) \
+        for perm in itertools.permutations(range(len(costs))))
+
+class LinearAssignmentTests(unittest.TestCase):         # pylint: disable=R0904
+    """Tests for `linear_assignment.py`."""
+
+    def test_simple(self):
+        """Small matrices with obvious answers"""
+        compare(minimum_cost_assignment([]), [])
+        compare(minimum_cost_assignment([[5]]), [0])
+        compare(minimum_cost_assignment([[1, 2], [3, 4]]), [0, 1])
+        compare(minimum_cost_assignment([[4, 1], [1, 4]]), [1, 0])
+        compare(minimum_cost_assignment([[4, 1, 3], [2, 0, 5], [3, 2, 2]]),
+                [1, 0, 2])
+
+    def test_not_square(self):
+        """Every row needs its own column"""
+        self.assertRaises(ValueError, minimum_cost_assignment, [[1, 2]])
+        self.assertRaises(ValueError, minimum_cost_assignment, [[1], [2]])
+
+    def test_against_brute_force(self):
+        """Every assignment of some matrices is checked"""
+        for size in range(1, 8):
+            costs = [[(i * 7 + j * 13 + size) % 11 for j in range(size)] \
+                for i in range(size)]
+            assignment = minimum_cost_assignment(costs)
+            compare(sorted(assignment), list(range(size)))
+            compare(sum(costs[i][j] for i, j in enumerate(assignment)),
+                    brute_force(costs))
+
+    def test_large(self):
+        """A hundred tables are assigned"""
+        costs = [[abs((j * 37) % 100 - i) for j in range(100)] \
+            for i in range(100)]
+        assignment = minimum_cost_assignment(costs)
+        compare(sorted(assignment), list(range(100)))
+        compare(sum(costs[i][j] for i, j in enumerate(assignment)), 0)
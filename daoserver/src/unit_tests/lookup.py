@@ -0,0 +1,59 @@
+"""
+Finding DAOs at most once per request
+"""
+
+from testfixtures import compare
+
+from models.dao.lookup import find_by
+from models.dao.tournament import Tournament as TournamentDAO
+from models.tournament import Tournament
+from models.tournament_entry import TournamentEntry
+from models.tournament_round import TournamentRound
+from models.user import User
+
+from unit_tests.app_simulating_test import AppSimulatingTest
+
+# pylint: disable=no-member,missing-docstring
+class LookupTests(AppSimulatingTest):
+
+    tourn_1 = 'test_lookup'
+
+    def test_loaded_once(self):
+        self.injector.inject(self.tourn_1, num_players=2)
+        tourn = Tournament(self.tourn_1)
+        tourn.update({'rounds': 1})
+        player = '{}_player_1'.format(self.tourn_1)
+        daos = [tourn.get_dao, TournamentRound(self.tourn_1, 1).get_dao,
+                TournamentEntry(self.tourn_1, player).get_dao,
+                User(player).get_dao]
+
+        for get_dao in daos:
+            dao = get_dao()
+            self.assertTrue(dao is not None)
+            compare(self.count_statements(
+                lambda: self.assertTrue(get_dao() is dao)), 0)
+
+        # Different models of the same tournament share the DAO
+        self.assertTrue(Tournament(self.tourn_1).get_dao() is tourn.get_dao())
+
+    def test_refreshed_after_writes(self):
+        tourn = self.injector.inject(self.tourn_1)
+        self.assertFalse(tourn.get_dao().in_progress)
+
+        TournamentDAO.query.filter_by(name=self.tourn_1).\
+            update({'in_progress': True}, synchronize_session=False)
+        self.db.session.commit()
+        self.assertTrue(tourn.get_dao().in_progress)
+
+    def test_deleted(self):
+        compare(find_by(TournamentDAO, name=self.tourn_1), None)
+
+        tourn = self.injector.inject(self.tourn_1)
+        old_id = tourn.get_dao().id
+        compare(find_by(TournamentDAO, name=self.tourn_1).id, old_id)
+
+        self.injector.delete()
+        compare(tourn.get_dao(), None)
+
+        tourn = self.injector.inject(self.tourn_1)
+        self.assertTrue(tourn.get_dao().id != old_id)
@@ -0,0 +1,113 @@
+"""
+The opponent history used to avoid re-matches
+"""
+
+from itertools import combinations
+import unittest
+
+from testfixtures import compare
+
+from models.dao.query_profiler import PROFILER
+from models.opponent_history import OpponentHistory
+from models.tournament import Tournament
+
+from unit_tests.app_simulating_test import AppSimulatingTest
+from unit_tests.tournament_injector import score_cat_args as cat
+
+# pylint: disable=missing-docstring
+class Entry(object):                  # pylint: disable=too-few-public-methods
+    def __init__(self, entry_id):
+        self.id = entry_id                  # pylint: disable=invalid-name
+
+def game(*entries):
+    return [{'name': 'BYE', 'entry': 'BYE'} if x == 'BYE' else \
+        {'name': x.id, 'entry': x} for x in entries]
+
+class OpponentHistoryTests(unittest.TestCase):      # pylint: disable=R0904
+
+    def test_re_match(self):
+        one, two, three, four = [Entry(x) for x in range(1, 5)]
+        history = OpponentHistory([[1, 2], [3], [2, 4]])
+
+        self.assertTrue(history.re_match(game(one, two)))
+        self.assertTrue(history.re_match(game(two, one)))
+        self.assertTrue(history.re_match(game(four, two)))
+        self.assertFalse(history.re_match(game(one, three)))
+        self.assertFalse(history.re_match(game(one, four)))
+
+        self.assertTrue(history.re_match(game(three, 'BYE')))
+        self.assertTrue(history.re_match(game('BYE', three)))
+        self.assertFalse(history.re_match(game(one, 'BYE')))
+
+        history.add_game([1, 3])
+        self.assertTrue(history.re_match(game(three, one)))
+        compare(history.opponents[3], set([1]))
+
+    def test_before(self):
+        one, two, three = [Entry(x) for x in range(1, 4)]
+        history = OpponentHistory()
+        history.add_game([1, 2], 1)
+        history.add_game([3], 1)
+        history.add_game([1, 3], 2)
+        history.add_game([2, 3])
+
+        first = history.before(1)
+        self.assertFalse(first.re_match(game(one, two)))
+        self.assertFalse(first.re_match(game(three, 'BYE')))
+        self.assertTrue(first.re_match(game(two, three)))
+
+        second = history.before(2)
+        self.assertTrue(second.re_match(game(one, two)))
+        self.assertTrue(second.re_match(game(three, 'BYE')))
+        self.assertFalse(second.re_match(game(one, three)))
+        compare(len(history.before(3).games), 4)
+
+
+class OpponentHistoryDbTests(AppSimulatingTest):
+
+    tourn_id = 'opponent_history_test'
+
+    def test_for_tournament(self):
+        """The history agrees with the db, and takes a single query"""
+        tourn = self.injector.inject(self.tourn_id, num_players=5)
+        tourn.update({
+            'rounds': 2,
+            'score_categories': [cat('c_1', 100, False, 0, 100)]
+        })
+        self.injector.inject('{}_other'.format(self.tourn_id), num_players=4).\
+            update({'rounds': 1})
+        tourn.get_draw().make_draws(Tournament(self.tourn_id))
+
+        with PROFILER.counting() as counted:
+            history = OpponentHistory.for_tournament(self.tourn_id)
+        compare(counted['statements'], 1)
+
+        entries = [{'name': x.player_id, 'entry': x} \
+            for x in tourn.get_entries()]
+        entries.append({'name': 'BYE', 'entry': 'BYE'})
+        self.assertTrue(len(history.byes) > 0)
+        self.assertTrue(len(history.opponents) > len(history.byes))
+        for pair in combinations(entries, 2):
+            compare(history.re_match(pair), Tournament.check_re_match(pair))
+        compare(sorted(set(x[0] for x in history.games)), [1, 2])
+
+    def test_redraw_swiss(self):
+        """A swiss round that is drawn again gets the same draw"""
+        tourn = self.injector.inject(self.tourn_id, num_players=6)
+        tourn.update({
+            'rounds': 2,
+            'matching_strategy': 'swiss_chess',
+            'score_categories': [cat('c_1', 100, False, 0, 100)]
+        })
+
+        def pairings(round_num):
+            return sorted(sorted(x.entrant_id for x in game.entrants) \
+                for game in Tournament(self.tourn_id).get_round(round_num).\
+                get_dao().games)
+
+        tourn.get_draw().make_draws(Tournament(self.tourn_id))
+        first = [pairings(1), pairings(2)]
+        tourn.get_draw().make_draws(Tournament(self.tourn_id))
+        compare([pairings(1), pairings(2)], first)
+        self.assertFalse(set(tuple(x) for x in first[0]) & \
+            set(tuple(x) for x in first[1]))
@@ -0,0 +1,90 @@
+"""
+Connection pool settings and instrumentation
+"""
+
+from base64 import b64encode
+import json
+import unittest
+
+from testfixtures import compare
+
+from models.dao.account import Account, AccountSecurity
+from models.dao.pool_monitor import engine_options, MonitoredQueuePool, \
+MONITOR, PoolMonitor, pool_settings
+
+from unit_tests.app_simulating_test import AppSimulatingTest
+
+# pylint: disable=missing-docstring
+class PoolSettingsTests(unittest.TestCase):         # pylint: disable=R0904
+
+    def test_settings(self):
+        compare(pool_settings({}), {})
+        compare(pool_settings({
+            'DB_POOL_SIZE': '20',
+            'DB_MAX_OVERFLOW': '5',
+            'DB_POOL_TIMEOUT': '2.5',
+            'DB_POOL_RECYCLE': '',
+            'DB_POOL_PRE_PING': 'true',
+        }), {
+            'pool_size': 20,
+            'max_overflow': 5,
+            'pool_timeout': 2.5,
+            'pool_pre_ping': True,
+        })
+        compare(pool_settings({'DB_POOL_PRE_PING': 'no'}),
+                {'pool_pre_ping': False})
+        compare(engine_options({'DB_POOL_SIZE': '3'}),
+                {'pool_size': 3, 'poolclass': MonitoredQueuePool})
+        self.assertRaises(ValueError, pool_settings, {'DB_POOL_SIZE': 'x'})
+
+    def test_monitor(self):
+        monitor = PoolMonitor()
+        monitor.checkout()
+        monitor.checkout()
+        monitor.checkin()
+        monitor.waited(0.5)
+        monitor.waited(1.5)
+
+        monitor.request_done(2)
+        monitor.request_done(0)
+
+        compare(monitor.report(), {
+            'connections': {'checkouts': 2, 'checked_out': 1,
+                            'max_checked_out': 2, 'opened': 0},
+            'wait': {'count': 2, 'total': 2.0, 'max': 1.5, 'mean': 1.0},
+            'requests': {'count': 2, 'queries': 2, 'max_queries': 2,
+                         'mean_queries': 1.0},
+        })
+
+
+class InstrumentationTests(AppSimulatingTest):
+
+    superuser = 'pool_monitor_superuser'
+
+    def test_instrumentation(self):
+        self.db.session.add(Account(self.superuser, 'foo@bar.com'))
+        self.db.session.flush()
+        Account.query.filter_by(username=self.superuser).first().\
+            is_superuser = True
+        self.db.session.add(AccountSecurity(self.superuser, 'password'))
+        self.db.session.commit()
+        self.injector.accounts.add(self.superuser)
+
+        compare(self.client.get('/instrumentation').status_code, 401)
+
+        MONITOR.reset()
+        self.client.get('/tournament/')
+        response = self.client.get('/instrumentation', headers={
+            'Authorization': 'Basic {}'.format(
+                b64encode('{}:password'.format(self.superuser)))})
+        compare(response.status_code, 200)
+
+        report = json.loads(response.data)
+        compare(sorted(report.keys()),
+                ['connections', 'pool', 'requests', 'settings', 'wait'])
+        # The request for tournaments has been counted. The request for the
+        # report is still running
+        compare(report['requests']['count'], 1)
+        self.assertTrue(report['requests']['queries'] >= 1)
+        self.assertTrue(report['connections']['checkouts'] >= 1)
+        self.assertTrue(report['pool']['size'] > 0)
@@ -0,0 +1,146 @@
+"""
+Profiling the queries run by each endpoint, and keeping them within budget
+"""
+
+from base64 import b64encode
+import json
+import unittest
+
+from testfixtures import compare
+
+from app import create_app
+from models.dao.account import Account, AccountSecurity
+from models.dao.query_profiler import PROFILER, QueryBudgetExceeded, \
+QueryProfiler
+from models.tournament import Tournament
+
+from unit_tests.app_simulating_test import AppSimulatingTest
+from unit_tests.tournament_injector import score_cat_args as cat
+
+# The most statements each endpoint may run, however big the tournament
+QUERY_BUDGETS = {
+    'ENTRY.list_entries': 3,
+    'ENTRY.next_game': 8,
+    'ENTRY.schedule': 25,
+    'TOURNAMENT.list_missions': 5,
+    'TOURNAMENT.list_score_categories': 3,
+    'TOURNAMENT.rank_entries': 5,
+    'TOURNAMENT.tournament_details': 10,
+}
+
+# pylint: disable=missing-docstring
+class QueryProfilerTests(unittest.TestCase):        # pylint: disable=R0904
+
+    def test_profile(self):
+        profiler = QueryProfiler(slowest=2)
+        profiler.executed('SELECT 0', 1)
+
+        profiler.start_request()
+        profiler.executed('SELECT 1', 0.5)
+        profiler.executed('SELECT 2', 0.25)
+        profiler.executed('SELECT 3', 1.0)
+        compare(profiler.end_request('one')['statements'], 3)
+
+        profiler.start_request()
+        profiler.executed('SELECT 4', 0.75)
+        profiler.end_request('one')
+        profiler.start_request()
+        profiler.end_request(None)
+        compare(profiler.end_request('one'), None)
+
+        compare(profiler.report(), {
+            'one': {
+                'requests': 2,
+                'statements': 4,
+                'mean_statements': 2.0,
+                'max_statements': 3,
+                'time': 2.5,
+                'mean_time': 1.25,
+                'slowest': [{'time': 1.0, 'statement': 'SELECT 3'},
+                            {'time': 0.75, 'statement': 'SELECT 4'}],
+            },
+            'unknown': {
+                'requests': 1,
+                'statements': 0,
+                'mean_statements': 0.0,
+                'max_statements': 0,
+                'time': 0.0,
+                'mean_time': 0.0,
+                'slowest': [],
+            },
+        })
+
+    def test_budget(self):
+        profiler = QueryProfiler()
+        with profiler.counting() as tracker:
+            profiler.executed('SELECT 1', 0.5)
+        profiler.executed('SELECT 2', 0.5)
+        compare(tracker, {'statements': 1, 'time': 0.5})
+
+        with profiler.budget(2) as tracker:
+            profiler.executed('SELECT 1', 0)
+            profiler.executed('SELECT 2', 0)
+        compare(tracker['statements'], 2)
+
+        def over_budget():
+            with profiler.budget(1):
+                profiler.executed('SELECT 1', 0)
+                profiler.executed('SELECT 2', 0)
+        self.assertRaises(QueryBudgetExceeded, over_budget)
+
+
+class QueryBudgetTests(AppSimulatingTest):
+
+    tourn_1 = 'query_budget_tournament'
+    superuser = 'query_budget_superuser'
+
+    def create_app(self):
+        app = create_app()
+        app.config['QUERY_BUDGETS'] = QUERY_BUDGETS
+        return app
+
+    def test_endpoints_within_budget(self):
+        """Endpoints don't run more queries for bigger tournaments"""
+        tourn = self.injector.inject(self.tourn_1, num_players=16)
+        tourn.update({
+            'rounds': 3,
+            'score_categories': [cat('battle', 100, False, 0, 20)]
+        })
+        tourn.get_draw().make_draws(Tournament(self.tourn_1))
+        player = '{}_player_1'.format(self.tourn_1)
+
+        for url in ['', '/rankings', '/entry/', '/missions',
+                    '/score_categories', '/entry/{}/nextgame'.format(player),
+                    '/entry/{}/schedule'.format(player)]:
+            response = self.client.get('/tournament/{}{}'.format(
+                self.tourn_1, url))
+            compare(response.status_code, 200)
+
+    def test_over_budget(self):
+        self.app.config['QUERY_BUDGETS'] = {'TOURNAMENT.rank_entries': 1}
+        self.injector.inject(self.tourn_1, num_players=2)
+        self.assertRaises(QueryBudgetExceeded, self.client.get,
+                          '/tournament/{}/rankings'.format(self.tourn_1))
+
+    def test_report(self):
+        self.app.config['QUERY_BUDGETS'] = {}
+        self.db.session.add(Account(self.superuser, 'foo@bar.com'))
+        self.db.session.flush()
+        Account.query.filter_by(username=self.superuser).first().\
+            is_superuser = True
+        self.db.session.add(AccountSecurity(self.superuser, 'password'))
+        self.db.session.commit()
+        self.injector.accounts.add(self.superuser)
+        self.injector.inject(self.tourn_1, num_players=2)
+
+        PROFILER.reset()
+        self.client.get('/tournament/{}/rankings'.format(self.tourn_1))
+        response = self.client.get('/instrumentation/queries', headers={
+            'Authorization': 'Basic {}'.format(
+                b64encode('{}:password'.format(self.superuser)))})
+        compare(response.status_code, 200)
+
+        report = json.loads(response.data)['TOURNAMENT.rank_entries']
+        compare(report['requests'], 1)
+        self.assertTrue(report['statements'] > 0)
+        self.assertTrue(len(report['slowest']) > 0)
@@ -0,0 +1,84 @@
+"""
+Ranking entries by their scores
+"""
+
+from collections import namedtuple
+import unittest
+from testfixtures import compare
+
+from models.ranking_strategies import RankingStrategy, ScoreMatrix
+
+Category = namedtuple('Category', ['name', 'percentage', 'max_val'])
+Score = namedtuple('Score', ['value', 'score_category'])
+
+# pylint: disable=too-few-public-methods
+class Entry(object):
+    """Just enough of a TournamentEntry to be ranked"""
+
+    def __init__(self, entry_id, scores):
+        self.id = entry_id              # pylint: disable=invalid-name
+        self.scores = scores
+
+BATTLE = Category('battle', 60, 20)
+SPORTS = Category('sports', 30, 5)
+PAINT = Category('paint', 10, 10)
+OTHER = Category('other_tournament', 100, 10)
+
+class RankingStrategyTests(unittest.TestCase):          # pylint: disable=R0904
+    """Tests for `ranking_strategies.py`."""
+
+    def setUp(self):
+        self.entries = [
+            Entry(1, [Score(10, BATTLE), Score(20, BATTLE), Score(5, SPORTS),
+                      Score(None, SPORTS), Score(10, OTHER)]),
+            Entry(2, [Score(20, BATTLE), Score(10, BATTLE), Score(0, SPORTS),
+                      Score(5, PAINT)]),
+            Entry(3, []),
+            Entry(4, [Score(15, BATTLE), Score(15, BATTLE), Score(5, SPORTS),
+                      Score(5, SPORTS)]),
+        ]
+        self.strategy = RankingStrategy('a_tournament',
+                                        lambda: [BATTLE, SPORTS, PAINT])
+
+    def test_matrix(self):
+        matrix = ScoreMatrix(self.entries, [BATTLE, SPORTS, PAINT])
+        compare(matrix.sums, [[30, 5, 0], [30, 0, 5], [0, 0, 0], [30, 10, 0]])
+        compare(matrix.max_totals,
+                [[40, 10, 0], [40, 5, 10], [0, 0, 0], [40, 10, 0]])
+        compare(matrix.column('sports'), [5, 0, 0, 10])
+        compare(matrix.percentages()[0], [45.0, 15.0, 0])
+        compare(matrix.totals(), [60.0, 50.0, 0, 75.0])
+
+        compare(ScoreMatrix([], [BATTLE]).totals(), [])
+        compare(ScoreMatrix(self.entries, []).totals(), [0, 0, 0, 0])
+
+    def test_total_score(self):
+        compare(self.strategy.total_score(self.entries[0]), 60.0)
+        compare(self.strategy.total_score(self.entries[2]), 0)
+        compare(self.strategy.total_scores(self.entries),
+                {1: 60.0, 2: 50.0, 3: 0, 4: 75.0})
+
+    def test_overall_ranking(self):
+        ranked = self.strategy.overall_ranking(self.entries)
+        compare([x.id for x in ranked], [4, 1, 2, 3])
+        compare([x.ranking for x in ranked], [1, 2, 3, 4])
+        compare([x.total_score for x in ranked], [75.0, 60.0, 50.0, 0])
+
+    def test_ties(self):
+        """Ties keep their order unless a tie-break separates them"""
+        battle = Category('battle', 50, 10)
+        paint = Category('paint', 50, 10)
+        entries = [
+            Entry(1, [Score(10, battle), Score(0, paint)]),
+            Entry(2, [Score(5, battle), Score(5, paint)]),
+            Entry(3, [Score(0, battle), Score(10, paint)]),
+        ]
+        categories = lambda: [battle, paint]
+        ranked = RankingStrategy('a_tournament', categories).\
+            overall_ranking(list(entries))
+        compare([x.id for x in ranked], [1, 2, 3])
+
+        ranked = RankingStrategy('a_tournament', categories, ['paint']).\
+            overall_ranking(list(entries))
+        compare([x.id for x in ranked], [3, 2, 1])
+        compare([x.ranking for x in ranked], [1, 2, 3])
@@ -0,0 +1,142 @@
+"""
+Entering many scores at once
+"""
+
+from testfixtures import compare
+
+from models.dao.query_profiler import PROFILER
+from models.dao.score import Score as ScoreDAO
+from models.dao.tournament_entry import TournamentEntry
+from models.dao.tournament_game import TournamentGame
+from models.dao.tournament_round import TournamentRound
+from models.score import ScoreBatch
+from models.tournament_entry import TournamentEntry as EntryModel
+from models.tournament_round import TournamentRound as RoundModel
+
+from unit_tests.app_simulating_test import AppSimulatingTest
+from unit_tests.tournament_injector import score_cat_args as cat
+
+# pylint: disable=no-member,missing-docstring
+class TestScoreBatch(AppSimulatingTest):
+
+    tourn_1 = 'score_batch_tournament'
+
+    def setUp(self):
+        super(TestScoreBatch, self).setUp()
+        self.tourn = self.injector.inject(self.tourn_1, num_players=4)
+        self.tourn.update({
+            'rounds': 1,
+            'score_categories': [
+                cat('battle', 40, False, 0, 20),
+                cat('sports', 20, False, 0, 10, zero_sum=True),
+                cat('painting', 20, True, 0, 10),
+                cat('opponent', 20, False, 1, 5, opponent=True),
+            ]
+        })
+        self.rnd = RoundModel(self.tourn_1, 1)
+        # Round 1 is player_1 v player_4 and player_2 v player_3
+        self.players = ['{}_player_{}'.format(self.tourn_1, x) \
+            for x in range(1, 5)]
+
+    def score(self, player, category, value):
+        return {'username': self.players[player - 1], 'category': category,
+                'score': value}
+
+    def scores_written(self):
+        return ScoreDAO.query.join(TournamentEntry).\
+            filter(TournamentEntry.tournament_id == self.tourn_1).count()
+
+    def test_round(self):
+        """A whole round can be entered in a single commit"""
+        scores = [self.score(x, 'battle', x * 5) for x in range(1, 5)] + \
+            [self.score(x, 'sports', 5) for x in range(1, 5)] + \
+            [self.score(x, 'painting', x) for x in range(1, 5)] + \
+            [self.score(x, 'opponent', x) for x in range(1, 5)]
+
+        # A fixed number of queries, however many scores there are. The
+        # config is loaded before, as a request would. The budget includes
+        # checking the round exists
+        self.tourn.check_exists()
+        with PROFILER.budget(16):
+            messages = self.tourn.set_round_scores(1, scores).split('\n')
+
+        compare(len(messages), 16)
+        compare(messages[0], 'Score entered for {}: 5'.format(self.players[0]))
+        # The opponent score is for the opponent
+        compare(messages[12],
+                'Score entered for {}: 1'.format(self.players[3]))
+        compare(self.scores_written(), 16)
+
+        self.assertTrue(self.rnd.is_complete())
+        compare([x.scores_entered for x in TournamentGame.query.\
+            join(TournamentRound).\
+            filter(TournamentRound.tournament_name == self.tourn_1)], [6, 6])
+
+        scores = EntryModel(self.tourn_1, self.players[3]).get_scores_entered()
+        compare(scores['per_tournament'], {'painting': 4})
+        # Opponent scores are listed against the opponent
+        compare(scores['per_game'][0]['opponent'], 4)
+        compare(scores['per_game'][0]['battle'], 20)
+
+    def test_all_or_nothing(self):
+        """Nothing is written if any score is invalid"""
+        good = [self.score(1, 'battle', 5), self.score(2, 'painting', 5)]
+
+        for bad in [self.score(1, 'battle', 21),
+                    self.score(1, 'battle', 'a'),
+                    self.score(1, 'not_a_category', 1),
+                    {'category': 'battle', 'score': 1, 'username': 'lisa'},
+                    {'category': 'battle', 'score': None,
+                     'username': self.players[0]},
+                    dict(self.score(1, 'battle', 1), game_id='foo'),
+                    dict(self.score(1, 'battle', 1), game_id=-1),
+                    dict(self.score(1, 'painting', 1), game_id=-1)]:
+            self.assertRaises((ValueError, TypeError),
+                              self.tourn.set_round_scores, 1, good + [bad])
+            compare(self.scores_written(), 0)
+
+        # Zero sum scores are checked together
+        self.assertRaises(ValueError, self.tourn.set_round_scores, 1,
+                          [self.score(1, 'sports', 6),
+                           self.score(4, 'sports', 5)])
+        compare(self.scores_written(), 0)
+
+        self.tourn.set_round_scores(1, good)
+        compare(self.scores_written(), 2)
+
+    def test_already_entered(self):
+        self.tourn.set_round_scores(1, [self.score(1, 'battle', 5),
+                                        self.score(1, 'sports', 6)])
+
+        # The same score again is fine, and isn't written twice
+        self.tourn.set_round_scores(1, [self.score(1, 'battle', 5),
+                                        self.score(1, 'battle', 5)])
+        compare(self.scores_written(), 2)
+
+        self.assertRaises(ValueError, self.tourn.set_round_scores, 1,
+                          [self.score(1, 'battle', 6)])
+        self.assertRaises(ValueError, self.tourn.set_round_scores, 1,
+                          [self.score(2, 'battle', 5),
+                           self.score(2, 'battle', 6)])
+        # The opponent's zero sum score is checked against the entered one
+        self.assertRaises(ValueError, self.tourn.set_round_scores, 1,
+                          [self.score(4, 'sports', 5)])
+        compare(self.scores_written(), 2)
+
+    def test_entry_batch(self):
+        """An entry's scores are entered as a batch too"""
+        entry = EntryModel(self.tourn_1, self.players[0])
+        game_id = entry.get_next_game()['game_id']
+
+        batch = ScoreBatch(self.tourn_1)
+        batch.add(entry.entry_id, 'battle', 5, game_id)
+        batch.add(entry.entry_id, 'painting', 5)
+        compare(batch.write(), [
+            'Score entered for {}: 5'.format(self.players[0]),
+            'Score entered for {}: 5'.format(self.players[0]),
+        ])
+
+        self.assertRaises(TypeError, entry.set_scores,
+                          [{'category': 'battle', 'score': 5}])
+        self.assertRaises(TypeError, ScoreBatch(self.tourn_1).add(
+            entry.entry_id, 'painting', 5, game_id).write)
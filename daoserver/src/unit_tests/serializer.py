@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+"""
+Encoding responses as JSON
+"""
+
+from collections import OrderedDict
+import datetime
+from decimal import Decimal
+import types
+import unittest
+
+import jsonpickle
+from testfixtures import compare
+
+from controllers import serializer
+
+# pylint: disable=too-few-public-methods
+class Entry(object):
+    """Something jsonpickle has to look inside"""
+
+    def __init__(self, name):
+        self.name = name
+        self.tables = (1, 2)
+
+PAYLOADS = [
+    None, True, 0, -3, 2 ** 70, 1.5, 0.1, 1e300, '', 'text', u'text',
+    u'caf\xe9', 'caf\xc3\xa9', u'"quoted" \\ \n ☃', [], {}, (), set(),
+    [1, 'two', 3.0, None, [False]],
+    (1, (2, 3)),
+    set(['a']),
+    {'b': 1, 'a': {'d': [1, 2], 'c': None}, u'\xe9': 'x', 'A': 2},
+    {'date': datetime.datetime(2017, 3, 4, 5, 6, 7, 8),
+     'day': datetime.date(2017, 3, 4),
+     'time': datetime.time(5, 6)},
+    [{'username': 'homer', 'entry_id': 1, 'tournament_id': 'springfield',
+      'scores': [{'score': 5, 'category': 'battle', 'min_val': 0,
+                  'max_val': 20}],
+      'total_score': '23.50', 'ranking': 3}],
+    {'draw': [{'table_number': 1, 'entrants': ['homer', 'BYE']}],
+     'mission': 'TBA'},
+    # Things the fast path leaves to jsonpickle
+    Entry('homer'),
+    [Entry('homer'), Entry('marge')],
+    {'entry': Entry('homer')},
+    {1: 'one', 'two': 2},
+    {None: 'none'},
+    {True: 'yes'},
+    OrderedDict([('b', 1), ('a', 2)]),
+    {'py/object': 'reserved'},
+    {'func': len, 'value': 1},
+    'not utf-8 \xff',
+    Decimal('1.50'),
+]
+
+class SerializerTests(unittest.TestCase):           # pylint: disable=R0904
+    """Tests for `serializer.py`."""
+
+    def test_same_as_jsonpickle(self):
+        for payload in PAYLOADS:
+            compare(serializer.encode(payload),
+                    jsonpickle.encode(payload, unpicklable=False))
+
+    def test_fast_path(self):
+        self.assertTrue(serializer.is_plain(PAYLOADS[23]))
+        self.assertTrue(serializer.is_plain(PAYLOADS[24]))
+        self.assertFalse(serializer.is_plain(PAYLOADS[-1]))
+        self.assertFalse(serializer.is_plain([1, [2, {'a': Entry('x')}]]))
+
+    def test_streaming(self):
+        short = [{'name': 'player_{}'.format(i)} for i in range(10)]
+        self.assertTrue(isinstance(serializer.encode_response(short),
+                                   basestring))
+
+        size = serializer.STREAM_THRESHOLD + 1
+        long_list = [{'name': 'player_{}'.format(i), 'tables': (i, i + 1)} \
+            for i in range(size)]
+        chunks = serializer.encode_response(long_list)
+        self.assertTrue(isinstance(chunks, types.GeneratorType))
+        compare(''.join(chunks),
+                jsonpickle.encode(long_list, unpicklable=False))
+
+        # Lists of objects have to be encoded as a whole
+        objects = [Entry('player') for _ in range(size)]
+        compare(serializer.encode_response(objects),
+                jsonpickle.encode(objects, unpicklable=False))
@@ -0,0 +1,51 @@
+"""
+Serving the app with a pool of workers
+"""
+
+import unittest
+
+from testfixtures import compare
+
+from app import set_up
+from gunicorn_conf import worker_count, worker_settings
+from models.dao.permissions import ProtObjAction
+from models.permissions import PERMISSIONS, set_up_permissions
+
+from unit_tests.app_simulating_test import AppSimulatingTest
+
+# pylint: disable=missing-docstring
+class WorkerConfigTests(unittest.TestCase):         # pylint: disable=R0904
+
+    def test_worker_count(self):
+        compare(worker_count({}, cpus=1), 3)
+        compare(worker_count({}, cpus=4), 9)
+        compare(worker_count({'WEB_CONCURRENCY': '2'}, cpus=4), 2)
+        compare(worker_count({'WEB_CONCURRENCY': '0'}, cpus=4), 1)
+        compare(worker_count({'WEB_CONCURRENCY': ''}, cpus=2), 5)
+        self.assertTrue(worker_count({}) >= 3)
+        self.assertRaises(ValueError, worker_count, {'WEB_CONCURRENCY': 'x'})
+
+    def test_worker_settings(self):
+        compare(worker_settings({}),
+                {'worker_class': 'gthread', 'threads': 4})
+        compare(worker_settings({'WORKER_THREADS': '8'}),
+                {'worker_class': 'gthread', 'threads': 8})
+        compare(worker_settings({'WORKER_CLASS': 'gthread'}),
+                {'worker_class': 'gthread', 'threads': 4})
+        self.assertRaises(ValueError, worker_settings,
+                          {'WORKER_CLASS': 'gevent'})
+        self.assertRaises(ValueError, worker_settings,
+                          {'WORKER_CLASS': 'sync'})
+
+
+class SetUpTests(AppSimulatingTest):
+
+    def test_set_up_once(self):
+        """Setting up again, as each worker might, adds nothing"""
+        set_up(self.app)
+        set_up(self.app)
+        set_up_permissions()
+        for action in PERMISSIONS.values():
+            # pylint: disable=no-member
+            compare(ProtObjAction.query.filter_by(description=action).count(),
+                    1)
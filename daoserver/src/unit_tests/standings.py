@@ -0,0 +1,105 @@
+"""
+Standings kept up to date as scores are entered
+"""
+
+from testfixtures import compare
+
+from models.dao.standing import Standing
+from models.dao.tournament_entry import TournamentEntry as EntryDAO
+from models.score import ScoreBatch
+from models.standings import Standings
+from models.tournament import Tournament
+from models.tournament_entry import TournamentEntry
+
+from unit_tests.app_simulating_test import AppSimulatingTest
+from unit_tests.tournament_injector import score_cat_args as cat
+
+# pylint: disable=no-member,missing-docstring
+class TestStandings(AppSimulatingTest):
+
+    tourn_1 = 'standings_tournament'
+    categories = [
+        cat('battle', 60, False, 0, 20),
+        cat('painting', 40, True, 0, 10),
+    ]
+
+    def setUp(self):
+        super(TestStandings, self).setUp()
+        self.tourn = self.injector.inject(self.tourn_1, num_players=4)
+        self.tourn.update({'rounds': 2, 'score_categories': self.categories})
+        self.players = ['{}_player_{}'.format(self.tourn_1, x) \
+            for x in range(1, 5)]
+
+    def enter_scores(self):
+        self.tourn.set_round_scores(1, \
+            [{'username': x, 'category': 'battle', 'score': i * 5} \
+             for i, x in enumerate(self.players)] + \
+            [{'username': x, 'category': 'painting', 'score': 10 - i} \
+             for i, x in enumerate(self.players)])
+        entry = TournamentEntry(self.tourn_1, self.players[0])
+        entry.set_scores([{'category': 'battle', 'score': 20,
+                           'game_id': entry.get_next_game()['game_id']}])
+
+    def standings(self):
+        return [(x.player_id, x.total_score, x.ranking) \
+            for x in Tournament(self.tourn_1).get_standings()]
+
+    def from_scores(self):
+        tourn = Tournament(self.tourn_1)
+        return [(x.player_id, x.total_score, x.ranking) for x in \
+            tourn.ranking_strategy.overall_ranking(tourn.get_entries())]
+
+    def test_standings(self):
+        """The standings agree with ranking the scores themselves"""
+        compare([x[2] for x in self.standings()], [1, 2, 3, 4])
+        self.enter_scores()
+        compare(self.standings(), self.from_scores())
+
+        entry_id = EntryDAO.query.filter_by(player_id=self.players[0]).\
+            first().id
+        compare(sorted((x.score_category.name, x.total, x.max_total) \
+            for x in Standing.query.filter_by(entry_id=entry_id)),
+                [('battle', 20, 40), ('painting', 10, 10)])
+
+        standings = Standings(self.tourn_1)
+        compare([x.score_info for x in standings.entries],
+                [x.score_info for x in Tournament(self.tourn_1).get_entries()])
+
+    def test_single_read(self):
+        self.enter_scores()
+        compare(self.count_statements(lambda: Standings(self.tourn_1)), 1)
+
+    def test_categories_changed(self):
+        """The standings are rebuilt when the categories change"""
+        self.enter_scores()
+        self.tourn.update({'score_categories': [
+            cat('battle', 60, False, 0, 40),
+            cat('painting', 40, True, 0, 10),
+        ]})
+        compare(self.standings(), self.from_scores())
+        entry_id = EntryDAO.query.filter_by(player_id=self.players[0]).\
+            first().id
+        compare(sorted((x.score_category.name, x.total, x.max_total) \
+            for x in Standing.query.filter_by(entry_id=entry_id)),
+                [('battle', 20, 80), ('painting', 10, 10)])
+        compare([x.score_info for x in Standings(self.tourn_1).entries],
+                [x.score_info for x in Tournament(self.tourn_1).get_entries()])
+
+        self.tourn.update({'score_categories': [
+            cat('painting', 40, True, 0, 10),
+        ]})
+        compare(self.standings(), self.from_scores())
+        compare([x.score_category.name for x in \
+            Standing.query.filter_by(entry_id=entry_id)], ['painting'])
+
+    def test_batch_and_single(self):
+        """Scores written singly and in batches both count"""
+        entry_id = EntryDAO.query.filter_by(player_id=self.players[1]).\
+            first().id
+        ScoreBatch(self.tourn_1).add(entry_id, 'painting', 3).write()
+        TournamentEntry(self.tourn_1, self.players[2]).set_scores(
+            [{'category': 'painting', 'score': 4}])
+        compare(self.standings()[:2], [
+            (self.players[2], 16.0, 1),
+            (self.players[1], 12.0, 2),
+        ])
@@ -112,3 +112,71 @@ class TableStrategyTests(unittest.TestCase):             # pylint: disable=R0904
         compare(draw[0].entrants, [entry1, entry2])
         compare(draw[2].entrants, [entry3, entry4])
         compare(draw[1].entrants, [entry5, entry6])
+
+    def test_variations(self):
+        """Each variation avoids a different kind of protest"""
+        entry1 = TournamentEntry('entry1', 'foo', game_history=[1, 2])
+        entry2 = TournamentEntry('entry2', 'foo', game_history=[1])
+        entry3 = TournamentEntry('entry3', 'foo', game_history=[1])
+        entry4 = TournamentEntry('entry4', 'foo', game_history=[])
+        games = [(entry1, entry2), (entry3, entry4)]
+
+        # Either a double protest or two single protests
+        draw = ProtestAvoidanceStrategy().determine_tables(games)
+        compare(draw[0].entrants, [entry1, entry2])
+        compare(draw[1].entrants, [entry3, entry4])
+
+        draw = ProtestAvoidanceStrategy(ProtestAvoidanceStrategy.SPLIT).\
+            determine_tables(games)
+        compare(draw[0].entrants, [entry1, entry2])
+        compare(draw[1].entrants, [entry3, entry4])
+
+        draw = ProtestAvoidanceStrategy(
+            ProtestAvoidanceStrategy.LEAST_OUTRAGE).determine_tables(games)
+        compare(draw[0].entrants, [entry3, entry4])
+        compare(draw[1].entrants, [entry1, entry2])
+
+        draw = ProtestAvoidanceStrategy(
+            ProtestAvoidanceStrategy.LEAST_VARIETY).determine_tables(games)
+        compare(draw[0].entrants, [entry3, entry4])
+        compare(draw[1].entrants, [entry1, entry2])
+
+        self.assertRaises(ValueError, ProtestAvoidanceStrategy, 'foo')
+
+    def test_many_tables(self):
+        """Far too many tables to try every layout"""
+        entries = [
+            TournamentEntry('entry{}'.format(i), 'foo',
+                            game_history=[(i // 2 + 1) % 100 + 1])
+            for i in range(200)]
+        games = list(zip(entries[::2], entries[1::2]))
+
+        draw = ProtestAvoidanceStrategy().determine_tables(games)
+        compare([x.table_number for x in draw], list(range(1, 101)))
+        compare(
+            ProtestAvoidanceStrategy.get_protest_score_for_layout(draw).\
+                total_protests(),
+            0)
+        self.assertRaises(IndexError,
+                          ProtestAvoidanceStrategy().determine_tables,
+                          [(entries[0], entries[1]), (entries[2],)])
+
+
+    def test_greedy_tables(self):
+        """Games take the first free table nobody in them has played on"""
+        entry1 = TournamentEntry('entry1', 'foo', game_history=[1, 2])
+        entry2 = TournamentEntry('entry2', 'foo', game_history=[])
+        entry3 = TournamentEntry('entry3', 'foo', game_history=[2])
+        entry4 = TournamentEntry('entry4', 'foo', game_history=[3])
+        entry5 = TournamentEntry('entry5', 'foo', game_history=[1, 2, 3])
+        entry6 = TournamentEntry('entry6', 'foo', game_history=[])
+        games = [(entry1, entry2), (entry3, entry4), (entry5, entry6)]
+
+        draw = ProtestAvoidanceStrategy.greedy_tables(games)
+        compare([x.table_number for x in draw], [1, 2, 3])
+        compare(draw[0].entrants, [entry3, entry4])
+        compare(draw[1].entrants, [entry5, entry6])
+        compare(draw[2].entrants, [entry1, entry2])
+        compare(ProtestAvoidanceStrategy.get_protest_score_for_layout(draw).\
+            total_protests(), 1)
+        compare(ProtestAvoidanceStrategy.greedy_tables([]), [])
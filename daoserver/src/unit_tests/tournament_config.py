@@ -0,0 +1,98 @@
+"""
+Caching a tournament's configuration between requests
+"""
+
+from testfixtures import compare
+
+from models.dao.tournament_round import TournamentRound
+from models.tournament import Tournament
+from models.tournament_config import CONFIG_CACHE
+
+from unit_tests.app_simulating_test import AppSimulatingTest
+from unit_tests.tournament_injector import score_cat_args as cat
+
+# pylint: disable=no-member,missing-docstring
+class TournamentConfigTests(AppSimulatingTest):
+
+    tourn_1 = 'test_tournament_config'
+
+    def setUp(self):
+        super(TournamentConfigTests, self).setUp()
+
+        self.injector.inject(self.tourn_1, num_players=4)
+        self.tourn = Tournament(self.tourn_1)
+        self.tourn.update({
+            'rounds': 2,
+            'missions': ['foo', 'bar'],
+            'score_categories': [cat('battle', 90, False, 0, 20),
+                                 cat('sports', 10, True, 1, 5)]
+        })
+
+    def test_reads_cached(self):
+        """Once cached, reads only check the version"""
+        self.tourn.details()
+
+        compare(self.count_statements(self.tourn.get_missions), 1)
+        compare(self.count_statements(
+            lambda: self.tourn.get_score_categories(serialized=True)), 1)
+        compare(self.count_statements(self.tourn.get_score_categories), 1)
+        compare(self.count_statements(self.tourn.check_exists), 1)
+        # The number of entries isn't configuration
+        compare(self.count_statements(self.tourn.details), 2)
+
+        cats = self.tourn.get_score_categories()
+        compare([(x.name, x.percentage) for x in cats],
+                [('battle', 90), ('sports', 10)])
+        self.assertTrue(all(x in self.db.session for x in cats))
+
+    def test_changes_seen(self):
+        self.tourn.details()
+
+        self.tourn.update({'rounds': 3})
+        compare(self.tourn.get_missions(), ['foo', 'bar', 'TBA'])
+        compare(self.tourn.details()['rounds'], 3)
+
+        self.tourn.update({'missions': ['a', 'b', 'c']})
+        compare(self.tourn.get_missions(), ['a', 'b', 'c'])
+
+        self.tourn.update({
+            'score_categories': [cat('battle', 100, False, 0, 20)]
+        })
+        compare([x['name'] for x in self.tourn.details()['score_categories']],
+                ['battle'])
+
+    def test_changed_elsewhere(self):
+        """Changes committed by another process are seen"""
+        self.tourn.get_missions()
+        CONFIG_CACHE.clear()
+        self.tourn.get_missions()
+
+        dao = TournamentRound.query.filter_by(tournament_name=self.tourn_1,
+                                              ordering=1).first()
+        dao.mission = 'baz'
+        self.db.session.commit()
+        # Not yet told
+        compare(self.tourn.get_missions(), ['foo', 'bar'])
+
+        CONFIG_CACHE.invalidate(self.tourn_1)
+        self.db.session.commit()
+        compare(self.tourn.get_missions(), ['baz', 'bar'])
+
+    def test_rolled_back(self):
+        """Nothing read part way through a failed change is kept"""
+        def fail():
+            with CONFIG_CACHE.changing(self.tourn_1):
+                TournamentRound.query.filter_by(
+                    tournament_name=self.tourn_1, ordering=1).first().\
+                    mission = 'baz'
+                compare(self.tourn.get_missions(), ['baz', 'bar'])
+                raise ValueError()
+        self.assertRaises(ValueError, fail)
+        self.db.session.rollback()
+
+        compare(self.tourn.get_missions(), ['foo', 'bar'])
+
+    def test_deleted(self):
+        self.tourn.details()
+        self.injector.delete()
+        self.assertRaises(ValueError, self.tourn.details)
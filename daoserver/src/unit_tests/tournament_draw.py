@@ -0,0 +1,313 @@
+"""
+Writing a draw to the db
+"""
+import json
+
+from sqlalchemy import event
+from testfixtures import compare
+
+from models.dao.game_entry import GameEntrant
+from models.dao.permissions import AccountProtectedObjectPermission, \
+ProtectedObject, ProtObjAction, ProtObjPerm
+from models.dao.query_profiler import PROFILER
+from models.dao.tournament_game import TournamentGame
+from models.table_strategy import Table
+from models.tournament_config import CONFIG_CACHE
+from models.tournament_draw import DrawException, DrawWriter, \
+PUBLISHED_DRAWS
+from models.tournament_entry import TournamentEntry as EntryModel
+
+from unit_tests.app_simulating_test import AppSimulatingTest
+from unit_tests.tournament_injector import score_cat_args as cat
+
+# pylint: disable=no-member,missing-docstring
+class TestDrawWriter(AppSimulatingTest):
+
+    t_name = 'draw_writer_tournament'
+
+    def setUp(self):
+        super(TestDrawWriter, self).setUp()
+        self.tourn = self.injector.inject(self.t_name, num_players=5)
+        self.tourn.update({
+            'rounds': 1,
+            'score_categories': [cat('per_g_cat', 100, False, 0, 10)]
+        })
+        self.entries = dict((int(x.player_id.split('_')[-1]), x) \
+            for x in self.tourn.get_entries())
+        self.round_dao = self.tourn.get_round(1).get_dao()
+
+    def write(self, *tables):
+        DrawWriter(self.round_dao).write(
+            [Table(i + 1, [self.entries.get(x, 'BYE') for x in table]) \
+            for i, table in enumerate(tables)])
+
+    def stored_draw(self):
+        """The draw in the db as {table: set(player_nums)}"""
+        games = TournamentGame.query.\
+            filter_by(tournament_round_id=self.round_dao.id).all()
+        return dict(
+            (x.table_num, set(int(y.entrant.player_id.split('_')[-1]) \
+                for y in x.entrants)) \
+            for x in games)
+
+    def can_enter_score(self, player, table):
+        game = TournamentGame.query.filter_by(
+            tournament_round_id=self.round_dao.id, table_num=table).first()
+        return ProtObjPerm.query.join(ProtObjAction).\
+            join(AccountProtectedObjectPermission,
+                 AccountProtectedObjectPermission.\
+                 protected_object_permission_id == ProtObjPerm.id).\
+            filter(ProtObjPerm.protected_object_id == \
+                       game.protected_object_id,
+                   ProtObjAction.description == 'enter_score',
+                   AccountProtectedObjectPermission.account_username == \
+                       self.entries[player].player_id).count() > 0
+
+    def test_write(self):
+        self.write((1, 2), (3, 4), (5, 0))
+        compare(self.stored_draw(), {1: set([1, 2]), 2: set([3, 4]),
+                                     3: set([5])})
+        self.assertTrue(self.can_enter_score(1, 1))
+        self.assertTrue(self.can_enter_score(5, 3))
+        self.assertFalse(self.can_enter_score(1, 2))
+        compare([x.score_entered for x in TournamentGame.query.filter_by(
+            tournament_round_id=self.round_dao.id).order_by('table_num')],
+                [False, False, True])
+
+        # Writing it again changes nothing
+        games = dict((x.table_num, x.id) for x in TournamentGame.query.\
+            filter_by(tournament_round_id=self.round_dao.id))
+        self.write((1, 2), (3, 4), (5, 0))
+        compare(dict((x.table_num, x.id) for x in TournamentGame.query.\
+            filter_by(tournament_round_id=self.round_dao.id)), games)
+
+    def test_changes(self):
+        self.write((1, 2), (3, 4), (5, 0))
+        prot_objs = ProtectedObject.query.count()
+
+        # Entrants swap tables and the bye moves
+        self.write((1, 3), (2, 5), (4, 0))
+        compare(self.stored_draw(), {1: set([1, 3]), 2: set([2, 5]),
+                                     3: set([4])})
+        self.assertTrue(self.can_enter_score(3, 1))
+        self.assertTrue(self.can_enter_score(2, 2))
+        self.assertFalse(self.can_enter_score(2, 1))
+        self.assertFalse(self.can_enter_score(3, 2))
+        self.assertFalse(self.can_enter_score(5, 3))
+        compare(ProtectedObject.query.count(), prot_objs)
+
+        # A table is no longer needed
+        del self.entries[5]
+        self.write((1, 2), (3, 4))
+        compare(self.stored_draw(), {1: set([1, 2]), 2: set([3, 4])})
+        compare(ProtectedObject.query.count(), prot_objs - 1)
+        compare(TournamentGame.query.filter_by(
+            tournament_round_id=self.round_dao.id, table_num=2).first().\
+            score_entered, False)
+
+    def test_scores_entered(self):
+        """Games with scores can't be redrawn"""
+        self.write((1, 2), (3, 4), (5, 0))
+        game = TournamentGame.query.filter_by(
+            tournament_round_id=self.round_dao.id, table_num=1).first()
+        game.score_entered = True
+        self.db.session.commit()
+
+        self.assertRaises(DrawException, self.write, (1, 3), (2, 4), (5, 0))
+        self.assertRaises(DrawException, self.write, (3, 4), (1, 2), (5, 0))
+        self.write((1, 2), (3, 5), (4, 0))
+        compare(self.stored_draw(), {1: set([1, 2]), 2: set([3, 5]),
+                                     3: set([4])})
+        compare(GameEntrant.query.filter_by(game_id=game.id).count(), 2)
+
+
+class TestMakeDraws(AppSimulatingTest):
+
+    t_name = 'make_draws_tournament'
+
+    def setUp(self):
+        super(TestMakeDraws, self).setUp()
+        self.tourn = self.injector.inject(self.t_name, num_players=4)
+        self.tourn.update({
+            'rounds': 2,
+            'missions': ['mission_1', 'mission_2'],
+            'score_categories': [cat('per_g_cat', 100, False, 0, 10)]
+        })
+
+    def games(self, rnd):
+        return dict((x.table_num, (x.id, sorted(y.entrant.player_id \
+            for y in x.entrants))) for x in TournamentGame.query.\
+            filter_by(tournament_round_id=self.tourn.get_round(rnd).\
+                get_dao().id))
+
+    def test_redraw_in_place(self):
+        """Redrawing with the same entries leaves the games alone"""
+        before = [self.games(1), self.games(2)]
+        self.tourn.get_draw().make_draws(self.tourn)
+        compare([self.games(1), self.games(2)], before)
+
+    def test_unchanged_rounds_skipped(self):
+        """Only rounds whose inputs have changed are drawn again"""
+        def make_draws():
+            draw = self.tourn.get_draw()
+            made = []
+            make_draw = draw.make_draw
+            draw.make_draw = lambda: made.append(draw.current_round.ordering) \
+                or make_draw()
+            draw.make_draws(self.tourn)
+            return made
+
+        compare(make_draws(), [])
+        self.injector.add_player(self.t_name, '{}_late'.format(self.t_name))
+        compare(make_draws(), [1, 2])
+        compare(make_draws(), [])
+
+    def test_registration_deferred(self):
+        """A late entry is drawn when the tournament starts"""
+        late = '{}_late'.format(self.t_name)
+        self.injector.add_player(self.t_name, late)
+        self.assertFalse(any(late in x for _, x in self.games(1).values()))
+
+        self.tourn.set_in_progress()
+        for rnd in [1, 2]:
+            games = self.games(rnd).values()
+            compare(sum(len(x) for _, x in games), 5)
+            self.assertTrue(any(late in x for _, x in games))
+
+    def test_scored_rounds_kept(self):
+        """Rounds with scores entered are not redrawn"""
+        player = EntryModel(self.t_name, '{}_player_1'.format(self.t_name))
+        game_id = player.get_next_game()['game_id']
+        player.set_scores([{'game_id': game_id, 'category': 'per_g_cat',
+                            'score': 5}])
+        game = TournamentGame.query.filter_by(id=game_id).first()
+        game.score_entered = True
+        self.db.session.commit()
+        before = self.games(1)
+
+        self.injector.add_player(self.t_name, '{}_late'.format(self.t_name))
+        self.tourn.get_draw().make_draws(self.tourn)
+        compare(self.games(1), before)
+        compare(sum(len(x) for _, x in self.games(2).values()), 5)
+
+
+class TestPublishedDraw(AppSimulatingTest):
+
+    t_name = 'published_draw_tournament'
+
+    def setUp(self):
+        super(TestPublishedDraw, self).setUp()
+        PUBLISHED_DRAWS.clear()
+        self.tourn = self.injector.inject(self.t_name, num_players=5)
+        self.tourn.update({
+            'rounds': 2,
+            'missions': ['mission_1', 'mission_2'],
+            'score_categories': [cat('per_g_cat', 100, False, 0, 10)]
+        })
+        self.url = '/tournament/{}/rounds/1'.format(self.t_name)
+
+    def get(self, url, etag=None):
+        """GET url, returning the response and the statements run"""
+        with PROFILER.counting() as counted:
+            response = self.client.get(
+                url, headers={'If-None-Match': etag} if etag else {})
+        return response, counted['statements']
+
+    def test_published(self):
+        response, _ = self.get(self.url)
+        compare(response.status_code, 200)
+        draw = json.loads(response.data)
+        compare(draw['mission'], 'mission_1')
+        compare([len(x['entrants']) for x in draw['draw']], [2, 2, 2])
+        compare(sorted(y for x in draw['draw'] for y in x['entrants']),
+                ['BYE'] + ['{}_player_{}'.format(self.t_name, x) \
+                for x in range(1, 6)])
+        # Not published until the tournament starts. A GET only reads the
+        # draw, so a late entry isn't drawn until then
+        self.assertFalse(self.tourn.is_published(1))
+        self.injector.add_player(self.t_name, '{}_late'.format(self.t_name))
+        self.db.session.commit()
+        compare(json.loads(self.get(self.url)[0].data), draw)
+
+        self.tourn.set_in_progress()
+        self.assertTrue(self.tourn.is_published(2))
+        response, _ = self.get(self.url)
+        draw = json.loads(response.data)
+        compare([len(x['entrants']) for x in draw['draw']], [2, 2, 2])
+        self.assertTrue('{}_late'.format(self.t_name) in \
+            [y for x in draw['draw'] for y in x['entrants']])
+
+        # Once published a GET only checks the tournament
+        response, statements = self.get(self.url)
+        compare(statements, 2)
+        compare(json.loads(response.data), draw)
+        compare(self.get(self.url, response.headers['ETag'])[0].status_code,
+                304)
+
+    def test_config_change(self):
+        response, _ = self.get(self.url)
+        self.tourn.update({'missions': ['mission_3', 'mission_2']})
+        response, _ = self.get(self.url, response.headers['ETag'])
+        compare(response.status_code, 200)
+        compare(json.loads(response.data)['mission'], 'mission_3')
+
+        # A new config version misses the cache but gives the same draw
+        self.tourn.set_in_progress()
+        response, _ = self.get(self.url)
+        CONFIG_CACHE.invalidate(self.t_name)
+        self.db.session.commit()
+        again, statements = self.get(self.url)
+        self.assertTrue(statements > 2)
+        compare(json.loads(again.data), json.loads(response.data))
+
+    def test_swiss_chess(self):
+        """A round is published once the rounds before it are complete"""
+        self.tourn.update({'matching_strategy': 'swiss_chess'})
+        self.tourn.set_in_progress()
+        self.assertTrue(self.tourn.is_published(1))
+        self.assertFalse(self.tourn.is_published(2))
+
+        for game in self.tourn.get_round(1).get_dao().games:
+            game.score_entered = True
+        self.db.session.commit()
+        self.assertTrue(self.tourn.is_published(2))
+
+    def test_swiss_chess_scores(self):
+        """A swiss round is drawn by the scores that publish it"""
+        self.tourn.update({'matching_strategy': 'swiss_chess'})
+        self.tourn.set_in_progress()
+        url = '/tournament/{}/rounds/2'.format(self.t_name)
+        provisional = json.loads(self.get(url)[0].data)
+
+        first = json.loads(self.get(self.url)[0].data)['draw']
+        players = [y for x in first for y in x['entrants'] if y != 'BYE']
+        scores = [{'username': x, 'category': 'per_g_cat', 'score': i * 2} \
+            for i, x in enumerate(players)]
+        self.tourn.set_round_scores(1, scores[1:])
+        self.assertFalse(self.tourn.is_published(2))
+        compare(json.loads(self.get(url)[0].data), provisional)
+
+        # The draw is written in the scores' transaction, which holds the
+        # draw lock until its only commit
+        commits = []
+        session = self.db.session()
+        count = lambda _: commits.append(1)
+        event.listen(session, 'after_commit', count)
+        try:
+            self.tourn.set_round_scores(1, scores[:1])
+        finally:
+            event.remove(session, 'after_commit', count)
+        compare(len(commits), 1)
+        self.assertTrue(self.tourn.is_published(2))
+        # Drawn with the scores, avoiding the round 1 opponents, and then
+        # only read from the cache
+        draw = json.loads(self.get(url)[0].data)
+        pairs = lambda x: set(frozenset(y['entrants']) for y in x)
+        self.assertFalse(pairs(draw['draw']) & pairs(first))
+        compare(self.get(url)[1], 2)
+        compare(json.loads(self.get(url)[0].data), draw)
+
+    def test_no_round(self):
+        self.assertRaises(ValueError, self.tourn.get_published_draw, 3)
+        self.assertRaises(ValueError, self.tourn.get_published_draw, 0)
+        self.assertRaises(ValueError, self.tourn.get_published_draw, 'a')
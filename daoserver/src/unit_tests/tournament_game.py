@@ -136,6 +136,71 @@ class TestGames(AppSimulatingTest):
               entry_id=entry_5_id, score=5).write()
         self.assertTrue(Score.is_score_entered(game))
 
+    def test_scores_counted(self):
+        """Completeness is kept as scores are written and categories change"""
+        tourn = Tournament(self.tourn_1)
+        tourn.update({
+            'score_categories': [cat('per_round', 50, False, 0, 100)]
+        })
+
+        entry_2_id = TournamentEntry.query.filter_by(
+            player_id='{}_player_{}'.format(self.tourn_1, 2),
+            tournament_id=self.tourn_1).first().id
+        entry_4_id = TournamentEntry.query.filter_by(
+            player_id='{}_player_{}'.format(self.tourn_1, 4),
+            tournament_id=self.tourn_1).first().id
+        game = self.get_game_by_round(entry_4_id, 1)
+
+        Score(category='per_round', game_id=game.id, tournament=tourn,
+              entry_id=entry_2_id, score=2).write()
+        compare((game.scores_entered, game.score_entered), (1, False))
+        # Writing the same score again doesn't count
+        Score(category='per_round', game_id=game.id, tournament=tourn,
+              entry_id=entry_2_id, score=2).write()
+        compare((game.scores_entered, game.score_entered), (1, False))
+        Score(category='per_round', game_id=game.id, tournament=tourn,
+              entry_id=entry_4_id, score=4).write()
+        compare((game.scores_entered, game.score_entered), (2, True))
+
+        # A new category needs scores too
+        tourn.update({'score_categories': [
+            cat('per_round', 50, False, 0, 100),
+            cat('another', 50, False, 0, 100),
+        ]})
+        compare((game.scores_entered, game.score_entered), (2, False))
+        self.assertFalse(Score.is_score_entered(game))
+
+        tourn.update({'score_categories': [
+            cat('another', 50, False, 0, 100),
+        ]})
+        compare((game.scores_entered, game.score_entered), (0, False))
+        # The bye is still complete
+        compare(len([x for x in TournamentGame.query.join(TournamentRound).\
+            filter(TournamentRound.tournament_name == self.tourn_1,
+                   TournamentGame.score_entered)]), 2)
+
+    def test_bye_counted(self):
+        """A bye is complete however its scores were counted"""
+        tourn = Tournament(self.tourn_1)
+        tourn.update({'score_categories': [
+            cat('per_round', 50, False, 0, 100),
+            cat('another', 50, False, 0, 100),
+        ]})
+        bye = [x for x in TournamentGame.query.join(TournamentRound).\
+            filter(TournamentRound.tournament_name == self.tourn_1) \
+            if x.entrants.count() == 1][0]
+        entry_id = bye.entrants.first().entrant_id
+        bye.score_entered = False
+        self.db.session.commit()
+
+        Score(category='per_round', game_id=bye.id, tournament=tourn,
+              entry_id=entry_id, score=0).write()
+        compare((bye.scores_entered, bye.score_entered), (1, True))
+
+        Score.recount_games(self.tourn_1, [bye.id])
+        self.db.session.commit()
+        compare((bye.scores_entered, bye.score_entered), (1, True))
+
     @staticmethod
     def get_game_by_round(entry_id, round_num):
         """Get the game an entry played in during a round"""
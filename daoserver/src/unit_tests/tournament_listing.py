@@ -0,0 +1,102 @@
+"""
+Listing tournaments a page at a time
+"""
+from datetime import date, datetime
+import json
+
+from testfixtures import compare
+
+from models.dao.query_profiler import PROFILER
+from models.tournament import tournament_listing
+
+from unit_tests.app_simulating_test import AppSimulatingTest
+
+# pylint: disable=no-member,missing-docstring
+class TournamentListingTests(AppSimulatingTest):
+
+    tourn_1 = 'test_listing'
+    # Far enough ahead that no other tournament is in range
+    dates = [datetime(2200, 1, x) for x in range(1, 6)]
+    limits = {'date_from': date(2200, 1, 1), 'date_to': date(2200, 1, 31)}
+
+    def setUp(self):
+        super(TournamentListingTests, self).setUp()
+        for i, tourn_date in enumerate(self.dates):
+            tourn = self.injector.inject('{}_{}'.format(self.tourn_1, i),
+                                         num_players=i, date=tourn_date)
+            tourn.update({'rounds': i % 3})
+        self.player = '{}_3_player_1'.format(self.tourn_1)
+
+    def test_listing(self):
+        with PROFILER.counting() as counted:
+            listing = tournament_listing(self.player, **self.limits)
+        compare(counted['statements'], 1)
+
+        compare(listing, {
+            'tournaments': [{
+                'name': '{}_{}'.format(self.tourn_1, i),
+                'date': self.dates[i].date(),
+                'rounds': i % 3,
+                'entries': i,
+                'user_entered': i == 3
+            } for i in range(0, 5)],
+            'page': 1,
+            'per_page': 50,
+            'total': 5,
+        })
+        self.assertFalse(any(x['user_entered'] for x in \
+            tournament_listing(None, **self.limits)['tournaments']))
+
+    def test_pages(self):
+        def names(**args):                  # pylint: disable=missing-docstring
+            limits = dict(self.limits)
+            limits.update(args)
+            listing = tournament_listing(**limits)
+            return [x['name'][-1] for x in listing['tournaments']], \
+                listing['total']
+
+        compare(names(per_page=2), (['0', '1'], 5))
+        compare(names(per_page=2, page=3), (['4'], 5))
+        compare(names(per_page=2, page=4), ([], 5))
+        compare(names(date_from=date(2200, 1, 2), date_to=date(2200, 1, 3)),
+                (['1', '2'], 2))
+        compare(names(date_from=date(2201, 1, 1)), ([], 0))
+        compare(names(per_page=None), (['0', '1', '2', '3', '4'], 5))
+
+        self.assertRaises(ValueError, tournament_listing, page=0)
+        self.assertRaises(ValueError, tournament_listing, per_page=501)
+        self.assertRaises(ValueError, tournament_listing, page='x')
+
+    def test_endpoint(self):
+        url = '/tournament/?from=2200-01-02&to=2200-01-31&per_page=3'
+        response = self.client.get(url)
+        compare(response.status_code, 200)
+        listing = json.loads(response.data)
+        compare([x['name'] for x in listing['tournaments']],
+                ['{}_{}'.format(self.tourn_1, x) for x in range(1, 4)])
+        compare(listing['tournaments'][0]['date'], '2200-01-02')
+        compare(listing['total'], 4)
+        self.assertTrue('Authorization' in response.headers['Vary'])
+
+        etag = response.headers['ETag']
+        response = self.client.get(url, headers={'If-None-Match': etag})
+        compare(response.status_code, 304)
+        compare(response.data, '')
+
+        self.injector.add_player('{}_1'.format(self.tourn_1), 'listing_user')
+        self.db.session.commit()
+        response = self.client.get(url, headers={'If-None-Match': etag})
+        compare(response.status_code, 200)
+        self.assertTrue(response.headers['ETag'] != etag)
+
+        # Without paging every tournament is listed, as the web client expects
+        listing = json.loads(self.client.get(
+            '/tournament/?from=2200-01-02&to=2200-01-31').data)
+        compare(len(listing['tournaments']), 4)
+        compare(listing['per_page'], None)
+        compare(json.loads(self.client.get(
+            '/tournament/?from=2200-01-02&to=2200-01-31&page=1').data)[
+                'per_page'], 50)
+
+        compare(self.client.get('/tournament/?from=tomorrow').status_code, 400)
+        compare(self.client.get('/tournament/?page=0').status_code, 400)
@@ -3,6 +3,7 @@ Setting the number of rounds in a tournament
 """
 from testfixtures import compare
 
+from models.dao.query_profiler import PROFILER
 from models.dao.tournament_round import TournamentRound
 from models.tournament import Tournament
 from models.tournament_entry import TournamentEntry
@@ -114,6 +115,22 @@ class SetRounds(AppSimulatingTest):
         self.assertTrue(TRoundModel(name, 1).is_complete())
         self.assertFalse(TRoundModel(name, 2).is_complete())
 
+    def test_is_complete_queries(self):
+        """Completeness is a single read however many games there are"""
+        name = 'test_complete_queries'
+        self.injector.inject(name, num_players=20).update({
+            'rounds': 1,
+            'score_categories': [cat('per_round', 100, False, 0, 100)]
+        })
+        model = TournamentEntry(name, '{}_player_1'.format(name))
+        rnd = TRoundModel(name, 1)
+
+        compare(self.count_statements(
+            lambda: self.assertFalse(rnd.is_complete())), 1)
+        # Reading the game, plus its mission and opponent
+        with PROFILER.budget(7):
+            compare(model.get_next_game()['round'], 1)
+
     def test_get_ordering(self):
         name = 'test_ordering'
         self.injector.inject(name).update({'rounds': 5})
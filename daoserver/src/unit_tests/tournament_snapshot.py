@@ -0,0 +1,91 @@
+"""
+Loading a whole tournament at once
+"""
+
+from testfixtures import compare
+
+from models.dao.table_allocation import TableAllocation
+from models.dao.tournament_entry import TournamentEntry
+from models.tournament_entry import TournamentEntry as EntryModel
+from models.tournament_snapshot import TournamentSnapshot
+
+from unit_tests.app_simulating_test import AppSimulatingTest
+from unit_tests.tournament_injector import score_cat_args as cat
+
+# pylint: disable=no-member,missing-docstring
+class TestTournamentSnapshot(AppSimulatingTest):
+
+    def tearDown(self):
+        TableAllocation.query.filter(TableAllocation.entry_id.in_(
+            self.db.session.query(TournamentEntry.id).filter(
+                TournamentEntry.tournament_id.like(
+                    'snapshot_tournament_%')))).\
+            delete(synchronize_session=False)
+        self.db.session.commit()
+        super(TestTournamentSnapshot, self).tearDown()
+
+    def inject(self, name, num_players):
+        tourn = self.injector.inject(name, num_players=num_players)
+        tourn.update({
+            'score_categories': [cat('per_t_cat_1', 50, True, 0, 10),
+                                 cat('per_t_cat_2', 50, True, 0, 20)]
+        })
+
+        for i, ent in enumerate(tourn.get_dao().entries.all()):
+            self.db.session.add(TableAllocation(ent.id, i % 3 + 1, 1))
+            self.db.session.add(TableAllocation(ent.id, i % 2 + 1, 2))
+            self.db.session.commit()
+            EntryModel(name, ent.player_id).set_scores([
+                {'category': 'per_t_cat_1', 'score': i},
+                {'category': 'per_t_cat_2', 'score': i * 2}
+            ])
+        self.db.session.expire_all()
+        return tourn
+
+    def test_contents(self):
+        name = 'snapshot_tournament_1'
+        self.inject(name, 4)
+        snapshot = TournamentSnapshot(name)
+
+        compare([x.player_id for x in snapshot.entries],
+                ['{}_player_{}'.format(name, i) for i in range(1, 5)])
+        compare(sorted(x.name for x in snapshot.score_categories),
+                ['per_t_cat_1', 'per_t_cat_2'])
+
+        for i, entry in enumerate(snapshot.entries):
+            compare(entry.game_history, [i % 3 + 1, i % 2 + 1])
+            compare(sorted([(x['category'], x['score'], x['max_val']) \
+                for x in entry.score_info]),
+                    [('per_t_cat_1', i, 10), ('per_t_cat_2', i * 2, 20)])
+
+        # An entry without scores or tables
+        self.injector.add_player(name, 'snapshot_tournament_1_late')
+        entry = TournamentSnapshot(name).entries[-1]
+        compare(entry.player_id, 'snapshot_tournament_1_late')
+        compare(entry.game_history, [])
+        compare(entry.score_info, [])
+
+    def test_query_count(self):
+        """The number of queries doesn't grow with the number of entries"""
+        self.inject('snapshot_tournament_2', 2)
+        self.inject('snapshot_tournament_3', 10)
+
+        snapshots = {}
+        def load(name):
+            def func():
+                snapshots[name] = TournamentSnapshot(name)
+                for entry in snapshots[name].entries:
+                    _ = [x.score_category.name for x in entry.scores]
+            return func
+
+        small_queries = self.count_statements(load('snapshot_tournament_2'))
+        large_queries = self.count_statements(load('snapshot_tournament_3'))
+
+        compare(len(snapshots['snapshot_tournament_2'].entries), 2)
+        compare(len(snapshots['snapshot_tournament_3'].entries), 10)
+        compare(small_queries, large_queries)
+        self.assertTrue(large_queries <= 4)
+
+        entries = TournamentEntry.query.\
+            filter_by(tournament_id='snapshot_tournament_3').count()
+        compare(entries, 10)
@@ -8,7 +8,9 @@ from models.authentication import PermissionDeniedException
 from models.dao.account import Account, AccountSecurity
 from models.dao.permissions import ProtectedObject, ProtObjAction, \
 ProtObjPerm, AccountProtectedObjectPermission as AccountProtectedObjectPerm
-from models.permissions import PermissionsChecker
+from models.dao.query_profiler import PROFILER
+from models.permissions import PermissionsChecker, PERMISSIONS
+from models.tournament import all_tournaments_with_permission
 
 from unit_tests.app_simulating_test import AppSimulatingTest
 
@@ -138,3 +140,39 @@ class UserPermissions(AppSimulatingTest):
         compare(prot_obj_perms, ProtObjPerm.query.count())
         # the one account should now have lost it's permissions
         compare(acc_perms - 1, AccountProtectedObjectPerm.query.count())
+
+    def test_grants_loaded_once(self):
+        """Checking many tournaments doesn't query each of them"""
+        for i in range(1, 6):
+            self.injector.inject('{}_{}'.format(self.tourn_1, i))
+        creator = '{}_3_creator'.format(self.tourn_1)
+
+        with PROFILER.budget(5):
+            compare(all_tournaments_with_permission(
+                PERMISSIONS['MODIFY_TOURNAMENT'], creator),
+                    ['{}_3'.format(self.tourn_1)])
+
+        checker = PermissionsChecker()
+        self.assertTrue(checker.check_permission(
+            'modify_tournament', creator, None, '{}_3'.format(self.tourn_1)))
+        self.assertRaises(PermissionDeniedException,
+                          checker.check_permission,
+                          'modify_tournament',
+                          creator,
+                          None,
+                          '{}_1'.format(self.tourn_1))
+
+    def test_grants_loaded_lazily(self):
+        """A single check only queries what it needs"""
+        self.injector.inject(self.tourn_1)
+        creator = '{}_creator'.format(self.tourn_1)
+        Account.query.filter_by(username=self.acc_1).first().\
+            is_superuser = True
+        self.db.session.commit()
+
+        with PROFILER.budget(1):
+            self.assertTrue(PermissionsChecker().check_permission(
+                'modify_tournament', self.acc_1, None, self.tourn_1))
+        with PROFILER.budget(2):
+            self.assertTrue(PermissionsChecker().check_permission(
+                'modify_tournament', creator, None, self.tourn_1))
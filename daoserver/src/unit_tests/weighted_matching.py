@@ -0,0 +1,110 @@
+"""
+Maximum weight matching used by the matching strategies
+"""
+
+import itertools
+import unittest
+from testfixtures import compare
+
+from models.weighted_matching import WeightedMatching
+
+def brute_force_perfect(num_vertices, edges):
+    """The weight of the heaviest perfect matching, or None"""
+    weights = dict(((i, j), wt) for i, j, wt in edges)
+    weights.update(dict(((j, i), wt) for i, j, wt in edges))
+    best = None
+    for perm in itertools.permutations(range(num_vertices)):
+        pairs = zip(perm[::2], perm[1::2])
+        if all(pair in weights for pair in pairs):
+            total = sum(weights[pair] for pair in pairs)
+            best = total if best is None else max(best, total)
+    return best
+
+def matched_weight(mate, edges):
+    """Total weight of the edges in mate"""
+    weights = dict(((i, j), wt) for i, j, wt in edges)
+    return sum(weights.get((i, j), weights.get((j, i))) \
+        for i, j in enumerate(mate) if i < j)
+
+class WeightedMatchingTests(unittest.TestCase):         # pylint: disable=R0904
+    """Tests for `weighted_matching.py`."""
+
+    def test_simple(self):
+        """Small graphs with obvious answers"""
+        compare(WeightedMatching([]).solve(), [])
+        compare(WeightedMatching([(0, 1, 1)]).solve(), [1, 0])
+        compare(WeightedMatching([(1, 2, 10), (2, 3, 11)]).solve(),
+                [-1, -1, 3, 2])
+        compare(WeightedMatching([(1, 2, 5), (2, 3, 11), (3, 4, 5)]).solve(),
+                [-1, -1, 3, 2, -1])
+
+    def test_max_cardinality(self):
+        """A lighter matching is preferred when it contains more edges"""
+        edges = [(1, 2, 5), (2, 3, 11), (3, 4, 5)]
+        compare(WeightedMatching(edges).solve(max_cardinality=True),
+                [-1, 2, 1, 4, 3])
+
+    def test_blossom(self):
+        """An odd cycle has to be shrunk to find the answer"""
+        edges = [(1, 2, 8), (1, 3, 9), (2, 3, 10), (3, 4, 7)]
+        compare(WeightedMatching(edges).solve(), [-1, 2, 1, 4, 3])
+
+        edges = [(1, 2, 8), (1, 3, 9), (2, 3, 10), (3, 4, 7), (1, 6, 5),
+                 (4, 5, 6)]
+        compare(WeightedMatching(edges).solve(), [-1, 6, 3, 2, 5, 4, 1])
+
+    def test_perfect_matching(self):
+        """No perfect matching exists for some graphs"""
+        self.assertTrue(WeightedMatching([(0, 1, 1), (0, 2, 1)], 3).\
+            perfect_matching() is None)
+        self.assertTrue(WeightedMatching([(0, 1, 1), (0, 2, 1), (0, 3, 1)]).\
+            perfect_matching() is None)
+
+        edges = [(0, 1, 9), (1, 2, 10), (2, 3, 9), (0, 3, 1)]
+        compare(WeightedMatching(edges).perfect_matching(), [1, 0, 3, 2])
+
+    def test_against_brute_force(self):
+        """Every perfect matching of some dense graphs is checked"""
+        edges = [(i, j, (i * 7 + j * 13) % 11) \
+            for i, j in itertools.combinations(range(8), 2) \
+            if (i + j) % 5 != 0]
+
+        mate = WeightedMatching(edges).perfect_matching()
+        compare(matched_weight(mate, edges), brute_force_perfect(8, edges))
+
+        mate = WeightedMatching(edges).solve(max_cardinality=True)
+        compare(matched_weight(mate, edges), brute_force_perfect(8, edges))
+
+    def test_reduced_cost(self):
+        """Edges left out of the graph can be priced against the solution"""
+        edges = [(0, 1, 10), (2, 3, 10), (0, 3, 1)]
+        matching = WeightedMatching(edges)
+        compare(matching.perfect_matching(), [1, 0, 3, 2])
+
+        # A heavy edge would have changed the result
+        self.assertTrue(matching.reduced_cost(1, 2, 30) < 0)
+        # A light one would not
+        self.assertTrue(matching.reduced_cost(1, 2, 1) >= 0)
+
+    def test_add_edges(self):
+        """Edges added to a solved graph give the answer for the whole graph"""
+        edges = [(i, j, (i * 7 + j * 13) % 11) \
+            for i, j in itertools.combinations(range(8), 2) \
+            if (i + j) % 5 != 0]
+        for split in range(8, len(edges), 3):
+            matching = WeightedMatching(edges[:split], 8)
+            if matching.perfect_matching() is None:
+                continue
+            matching.add_edges(edges[split:split + 3])
+            matching.add_edges(edges[split + 3:])
+            mate = matching.perfect_matching()
+            compare(matched_weight(mate, edges),
+                    brute_force_perfect(8, edges))
+
+        # A heavy edge can change every pair
+        edges = [(0, 1, 8), (1, 2, 9), (0, 2, 10), (2, 3, 7), (3, 4, 1),
+                 (4, 5, 1)]
+        matching = WeightedMatching(edges)
+        compare(matching.perfect_matching(), [1, 0, 3, 2, 5, 4])
+        matching.add_edges([(1, 3, 30), (0, 5, 1)])
+        compare(matching.perfect_matching(), [2, 3, 0, 1, 5, 4])
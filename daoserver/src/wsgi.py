@@ -0,0 +1,13 @@
+"""
+The WSGI entry point for the production server. e.g.
+
+    gunicorn -c gunicorn_conf.py wsgi:application
+
+Each worker imports this and creates its own app. The one off start up work
+(app.set_up) is done by the master, see gunicorn_conf.py.
+"""
+
+from app import create_app, register_handlers
+
+register_handlers()
+application = create_app()          # pylint: disable=invalid-name
@@ -79,13 +79,47 @@ BEGIN
 END $$;
 
 
--- Enter score for player
+-- Add a score to the standings, as the daoserver does when a score is written
+CREATE OR REPLACE FUNCTION record_standing(ent_id int, category int, score_id int, score int) RETURNS int LANGUAGE plpgsql AS $$
+DECLARE
+    max_score int := 0;
+BEGIN
+    SELECT COALESCE(max_val, 0) INTO max_score FROM score_category WHERE id = category;
+
+    UPDATE standing SET total = total + COALESCE(score, 0),
+        max_total = max_total + max_score,
+        score_ids = score_ids || record_standing.score_id,
+        score_values = score_values || record_standing.score
+        WHERE entry_id = ent_id AND score_category_id = category;
+    IF NOT FOUND THEN
+        INSERT INTO standing VALUES(ent_id, category, COALESCE(score, 0), max_score,
+            ARRAY[record_standing.score_id], ARRAY[record_standing.score]);
+    END IF;
+
+    RETURN 0;
+END $$;
+
+-- Enter score for player. The game is counted as the daoserver would, and
+-- marked as scored once every entrant has every per-game score. Byes need no
+-- scores
 CREATE OR REPLACE FUNCTION enter_score(game_id int, ent_id int, category int, score int) RETURNS int LANGUAGE plpgsql AS $$
 DECLARE
     score_id int := 0;
+    entrants int := 0;
+    per_game int := 0;
 BEGIN
     INSERT INTO score VALUES(DEFAULT, ent_id, category, score) RETURNING id INTO score_id;
     INSERT INTO game_score VALUES(ent_id, game_id, score_id);
+    PERFORM record_standing(ent_id, category, score_id, score);
+
+    SELECT count(*) INTO entrants FROM game_entrant ge WHERE ge.game_id = enter_score.game_id;
+    SELECT count(*) INTO per_game FROM score_category sc
+        WHERE sc.tournament_id = (SELECT tournament_id FROM score_category WHERE id = category)
+        AND NOT sc.per_tournament;
+    UPDATE game SET scores_entered = scores_entered + 1,
+        score_entered = entrants < 2
+            OR (per_game > 0 AND scores_entered + 1 >= entrants * per_game)
+        WHERE id = enter_score.game_id;
 
     RETURN 0;
 END $$;
@@ -240,6 +274,7 @@ BEGIN
     -- Give stevemcqueen a score
     INSERT INTO score VALUES(DEFAULT, ent_id, score_cat, 6) RETURNING id INTO score_id;
     INSERT INTO tournament_score VALUES(ent_id, tourn_id, score_id);
+    PERFORM record_standing(ent_id, score_cat, score_id, 6);
 
     RETURN 0;
 END $$;
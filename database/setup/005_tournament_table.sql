@@ -1,8 +1,15 @@
+-- Bumped whenever a tournament's configuration changes. Cached configuration
+-- is only used while its version matches. A sequence, rather than a counter,
+-- so a version is never reused, even after a rollback.
+CREATE SEQUENCE tournament_config_version_seq;
+
 CREATE TABLE tournament(
     id                  SERIAL PRIMARY KEY,
     name                VARCHAR NOT NULL UNIQUE,
     date                DATE NOT NULL,
     protected_object_id INTEGER NOT NULL REFERENCES protected_object(id),
     to_username         VARCHAR NOT NULL REFERENCES account(username),
-    in_progress         BOOLEAN NOT NULL DEFAULT FALSE
+    in_progress         BOOLEAN NOT NULL DEFAULT FALSE,
+    config_version      BIGINT NOT NULL
+        DEFAULT nextval('tournament_config_version_seq')
 );
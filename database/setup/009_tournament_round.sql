@@ -6,6 +6,9 @@ CREATE TABLE tournament_round(
     tournament_name     VARCHAR REFERENCES tournament(name),
     ordering            INTEGER DEFAULT 1,
     mission             VARCHAR,
+    -- A hash of what the round's draw was made from. Skips redrawing it
+    -- while nothing it depends on has changed
+    draw_inputs         VARCHAR,
     PRIMARY KEY(tournament_name, ordering)
 );
 COMMENT ON TABLE tournament_round IS 'The higher the order number the later the round.';
@@ -4,6 +4,7 @@ create table game(
     table_num           integer,
     protected_object_id integer references protected_object(id),
     score_entered       boolean DEFAULT False,
+    scores_entered      integer NOT NULL DEFAULT 0,
     PRIMARY KEY (tournament_round_id, table_num)
 );
 
@@ -12,3 +13,5 @@ CREATE TABLE game_entrant(
     entrant_id INTEGER REFERENCES entry(id),
     PRIMARY KEY(game_id, entrant_id)
 );
+
+CREATE INDEX ix_game_entrant_entrant_id ON game_entrant(entrant_id);
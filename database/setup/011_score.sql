@@ -39,3 +39,48 @@ CREATE TABLE tournament_score (
     PRIMARY KEY (entry_id, tournament_id, score_id)
 );
 COMMENT ON TABLE tournament_score IS 'A one-off score for a tournament';
+
+-- Count the scores already entered for each game, e.g. in a database from
+-- before game.scores_entered was kept. A game is complete once every entrant
+-- has a score in every per-game category. Byes need no scores. This is the
+-- same rule as Score._is_complete.
+UPDATE game SET
+    scores_entered = counts.scores,
+    score_entered = counts.entrants < 2
+        OR (counts.per_game > 0
+            AND counts.scores >= counts.entrants * counts.per_game)
+FROM (
+    SELECT g.id,
+        (SELECT count(*) FROM game_score gs WHERE gs.game_id = g.id) AS scores,
+        (SELECT count(*) FROM game_entrant ge WHERE ge.game_id = g.id)
+            AS entrants,
+        (SELECT count(*) FROM score_category sc
+            WHERE sc.tournament_id = r.tournament_name
+            AND NOT sc.per_tournament) AS per_game
+    FROM game g JOIN tournament_round r ON r.id = g.tournament_round_id
+) AS counts
+WHERE game.id = counts.id;
+
+CREATE TABLE standing (
+    entry_id            INTEGER REFERENCES entry(id) ON DELETE CASCADE,
+    score_category_id   INTEGER REFERENCES score_category(id) ON DELETE CASCADE,
+    total               INTEGER NOT NULL DEFAULT 0,
+    max_total           INTEGER NOT NULL DEFAULT 0,
+    score_ids           INTEGER[] NOT NULL DEFAULT '{}',
+    score_values        INTEGER[] NOT NULL DEFAULT '{}',
+    PRIMARY KEY (entry_id, score_category_id)
+);
+COMMENT ON TABLE standing IS 'Running totals of the scores for each entry and category';
+COMMENT ON COLUMN standing.score_values IS 'The scores counted, in the order of score_ids.';
+
+-- The standings for the scores already entered, e.g. in a database from
+-- before the standings were kept.
+INSERT INTO standing
+SELECT s.entry_id, s.score_category_id,
+    COALESCE(SUM(s.value), 0), COALESCE(SUM(c.max_val), 0),
+    array_agg(s.id ORDER BY s.id), array_agg(s.value ORDER BY s.id)
+FROM score s JOIN score_category c ON c.id = s.score_category_id
+WHERE NOT EXISTS (SELECT 1 FROM standing st
+    WHERE st.entry_id = s.entry_id
+    AND st.score_category_id = s.score_category_id)
+GROUP BY s.entry_id, s.score_category_id;
@@ -0,0 +1,22 @@
+-- Long running operations, queued by the web tier and run by a job worker.
+-- See models.jobs
+CREATE TABLE job(
+    id              SERIAL PRIMARY KEY,
+    kind            VARCHAR NOT NULL,
+    tournament_name VARCHAR,
+    args            TEXT NOT NULL DEFAULT '{}',
+    username        VARCHAR NOT NULL,
+    status          VARCHAR NOT NULL DEFAULT 'queued',
+    done            INTEGER,
+    total           INTEGER,
+    result          VARCHAR,
+    error           VARCHAR,
+    worker          VARCHAR,
+    created         TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT NOW(),
+    started         TIMESTAMP WITH TIME ZONE,
+    finished        TIMESTAMP WITH TIME ZONE,
+    heartbeat       TIMESTAMP WITH TIME ZONE
+);
+
+CREATE INDEX job_status_idx ON job(status, id);
+CREATE INDEX job_tournament_name_idx ON job(tournament_name, id);
@@ -0,0 +1,42 @@
+var frisby = require("frisby"),
+    injector = require("./data_injector");
+
+describe("Enter scores for a round", function () {
+    "use strict";
+
+    var tourn = "round_scores_test",
+        p1 = tourn + "_p_1",
+        p2 = tourn + "_p_2",
+        cat = tourn + "_per_tourn",
+        API = process.env.API_ADDR + "tournament/" + tourn + "/rounds/1/scores",
+        post = function(user, msg, scores, code, resp) {
+            var req = frisby.create("POST round scores: " + msg)
+                .post(API, {scores: scores},
+                    {json: true, inspectOnFailure: true})
+                .expectStatus(code)
+                .expectBodyContains(resp);
+
+            if (user) {
+                req.addHeader("Authorization", injector.auth(user));
+            }
+            req.toss();
+        };
+
+    injector.createTournament(tourn, "2095-10-10", 1, null,
+        [[cat, 1, true, 1, 10]], [p1, p2]);
+
+    post(null, "No auth", [], 401, "Could not verify your access level");
+    post(p1, "Player", [{username: p1, category: cat, score: 5}], 403,
+        "Permission denied");
+    post(tourn + "_to", "Unknown category",
+        [{username: p1, category: cat, score: 5},
+         {username: p2, category: "not_a_category", score: 5}], 400,
+        "Unknown category: not_a_category");
+    post(tourn + "_to", "Unknown player",
+        [{username: "not_a_player", category: cat, score: 5}], 400,
+        "Unknown player: not_a_player");
+    post(tourn + "_to", "TO",
+        [{username: p1, category: cat, score: 5},
+         {username: p2, category: cat, score: 6}], 200,
+        "Score entered for " + p1 + ": 5\nScore entered for " + p2 + ": 6");
+});